@@ -0,0 +1,61 @@
+"""
+Counting for the reports with one scan of the frames per report (a state mask and
+a value_counts for every airline report, separate counts for terminals, gates,
+belts and airlines) against the single aggregate_flight_frame pass per frame.
+
+Usage: PYTHONPATH=. python benchmarks/bench_aggregation.py [sizes...]
+"""
+
+import sys
+import time
+
+from testing.synthetic import generate_flights
+from modules.data_processing import (
+    aggregate_flight_frame,
+    build_flight_frames,
+    optimize_flight_frame,
+)
+
+STATES = (("LND", "DIV"), ("DEL", "CNX"))
+
+
+def per_report(df_arrivals, df_departures):
+    # Former behaviour: every report filters and counts the frames again
+    for df, states in zip((df_arrivals, df_departures), STATES):
+        for state in states:
+            df[df["state"] == state]["airline"].value_counts().nlargest(5)
+        df["terminal"].value_counts()
+        df[df["airline"] != ""]["airline"].value_counts()
+    df_departures["gate"].value_counts()
+    df_arrivals["baggageClaimBelts"].list.flatten().value_counts()
+
+
+def single_pass(df_arrivals, df_departures):
+    aggregate_flight_frame(df_arrivals)
+    aggregate_flight_frame(df_departures)
+
+
+def best_of(function, frames, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*frames)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(sizes: list):
+    print(f"{'flights':>9} {'per report':>11} {'single pass':>12} {'speedup':>8}")
+    for size in sizes:
+        df_arrivals, _, df_departures, _ = build_flight_frames(generate_flights(size))
+        frames = (
+            optimize_flight_frame(df_arrivals),
+            optimize_flight_frame(df_departures),
+        )
+        old = best_of(per_report, frames)
+        new = best_of(single_pass, frames)
+        print(f"{size:>9} {old:>10.3f}s {new:>11.3f}s {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,77 @@
+"""
+Decoding the `/flights` pages of a window: stdlib json into full dicts (former
+behaviour) against the decode_flights_response path (orjson when installed,
+flights projected to FlightRecords page by page). Reports the decode throughput,
+the memory held by the decoded window and the time to build the frames from it.
+
+Usage: PYTHONPATH=. python benchmarks/bench_decoding.py [sizes...]
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from testing.synthetic import iter_flight_pages
+from modules.data_processing import build_flight_frames
+from modules.flight_records import decode_flights_response, orjson
+
+PAGE_SIZE = 20
+
+
+def stdlib_dicts(pages: list) -> list:
+    return [flight for page in pages for flight in json.loads(page)["flights"]]
+
+
+def compact_records(pages: list) -> list:
+    return [
+        flight for page in pages for flight in decode_flights_response(page)["flights"]
+    ]
+
+
+def best_of(function, pages: list, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(pages)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def retained_mb(function, pages: list) -> tuple[float, list]:
+    gc.collect()
+    tracemalloc.start()
+    flights = function(pages)
+    retained = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+    return retained, flights
+
+
+def main(sizes: list):
+    print(f"orjson {'installed' if orjson is not None else 'not installed'}")
+    print(
+        f"{'flights':>9} {'MB':>7} {'decoder':>8} {'decode':>8} {'MB/s':>7} "
+        f"{'held MB':>8} {'frames':>8}"
+    )
+    for size in sizes:
+        pages = [
+            json.dumps({"flights": page}).encode()
+            for page in iter_flight_pages(size, PAGE_SIZE)
+        ]
+        payload_mb = sum(len(page) for page in pages) / 1e6
+        for name, function in (("dicts", stdlib_dicts), ("records", compact_records)):
+            seconds = best_of(function, pages)
+            held, flights = retained_mb(function, pages)
+            start = time.perf_counter()
+            build_flight_frames(flights)
+            frames = time.perf_counter() - start
+            print(
+                f"{size:>9} {payload_mb:>7.1f} {name:>8} {seconds:>7.3f}s "
+                f"{payload_mb / seconds:>7.1f} {held:>8.1f} {frames:>7.3f}s"
+            )
+            del flights
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,67 @@
+"""
+Memory and groupby speed of the plain (object columns) versus the compact
+(categorical / datetime64 / Arrow list) arrivals and departures frames.
+
+Usage: PYTHONPATH=. python benchmarks/bench_dtypes.py [flights]
+"""
+
+import sys
+import time
+
+from testing.synthetic import generate_flights
+from modules.data_processing import (
+    build_flight_frames,
+    find_busiest_facilities,
+    optimize_flight_frame,
+)
+
+LOOKUP = {"airlines": {}, "destinations": {}}
+
+
+def best_of(function, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def groupby_time(df) -> float:
+    # The groupings the reports are built from
+    def run():
+        df.groupby(["airline", "state"], observed=True).size()
+        df["terminal"].value_counts()
+        if "gate" in df:
+            df["gate"].value_counts()
+
+    return best_of(run)
+
+
+def main(count: int):
+    df_arrivals, _, df_departures, _ = build_flight_frames(generate_flights(count))
+    print(f"{count} flights")
+    for name, plain in (("arrivals", df_arrivals), ("departures", df_departures)):
+        compact = optimize_flight_frame(plain)
+        plain_mb = plain.memory_usage(deep=True).sum() / 2**20
+        compact_mb = compact.memory_usage(deep=True).sum() / 2**20
+        plain_s, compact_s = groupby_time(plain), groupby_time(compact)
+        print(
+            f"{name:>10}: memory {plain_mb:8.1f}MB -> {compact_mb:7.1f}MB "
+            f"({plain_mb / compact_mb:4.1f}x), groupby {plain_s * 1e3:7.1f}ms -> "
+            f"{compact_s * 1e3:6.1f}ms ({plain_s / compact_s:4.1f}x)"
+        )
+
+    compact = (optimize_flight_frame(df_arrivals), optimize_flight_frame(df_departures))
+    plain_s = best_of(
+        lambda: find_busiest_facilities(df_arrivals, df_departures, 10, "w", LOOKUP)
+    )
+    compact_s = best_of(lambda: find_busiest_facilities(*compact, 10, "w", LOOKUP))
+    print(
+        f"find_busiest_facilities: {plain_s * 1e3:.1f}ms -> {compact_s * 1e3:.1f}ms "
+        f"({plain_s / compact_s:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,61 @@
+"""
+Benchmark of serial versus concurrent page fetching against a local stub server,
+with the thread pool fetcher and the asyncio one (when aiohttp is installed).
+
+Usage: PYTHONPATH=. python benchmarks/bench_fetching.py [latency] [pages]
+"""
+
+import asyncio
+import sys
+import time
+
+from testing.stub_server import StubSchipholServer
+from modules.data_fetching import SchipholDataFetcher
+from modules import async_fetching
+
+
+def time_fetch(base_url: str, concurrency: int) -> tuple[float, int]:
+    fetcher = SchipholDataFetcher(concurrency=concurrency)
+    fetcher.base_url = base_url
+    start = time.perf_counter()
+    flights = fetcher.fetch_flights_data("2024-01-01T00:00:00", "2024-01-01T04:00:00")
+    return time.perf_counter() - start, len(flights)
+
+
+def time_async_fetch(base_url: str, concurrency: int) -> tuple[float, int]:
+    async def fetch():
+        async with async_fetching.AsyncSchipholDataFetcher(concurrency) as fetcher:
+            fetcher.base_url = base_url
+            return await fetcher.fetch_flights_data(
+                "2024-01-01T00:00:00", "2024-01-01T04:00:00"
+            )
+
+    start = time.perf_counter()
+    flights = asyncio.run(fetch())
+    return time.perf_counter() - start, len(flights)
+
+
+def main(latency: float = 0.05, num_pages: int = 20):
+    with StubSchipholServer(num_pages=num_pages, latency=latency) as stub:
+        serial_time, serial_count = time_fetch(stub.base_url, 1)
+        print(f"concurrency  1: {serial_time:7.3f}s  {serial_count} flights")
+        for concurrency in (2, 4, 8, 16):
+            elapsed, count = time_fetch(stub.base_url, concurrency)
+            print(
+                f"concurrency {concurrency:2d}: {elapsed:7.3f}s  {count} flights  "
+                f"speedup x{serial_time / elapsed:.1f}"
+            )
+            if async_fetching.aiohttp is not None:
+                elapsed, count = time_async_fetch(stub.base_url, concurrency)
+                print(
+                    f"  asyncio {concurrency:2d}: {elapsed:7.3f}s  {count} flights  "
+                    f"speedup x{serial_time / elapsed:.1f}"
+                )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        latency=float(args[0]) if args else 0.05,
+        num_pages=int(args[1]) if len(args) > 1 else 20,
+    )
@@ -0,0 +1,57 @@
+"""
+Throughput (rows per second) of DataFrame.to_sql(if_exists="replace") versus the
+staging table bulk loader, on SQLite by default or on the database URI given.
+
+Usage: PYTHONPATH=. python benchmarks/bench_loading.py [flights] [db_uri]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from testing.synthetic import generate_flights
+from modules.bulk_loader import bulk_load_frame
+from modules.data_processing import (
+    build_flight_frames,
+    optimize_flight_frame,
+    to_storage_frame,
+)
+
+
+def main(count: int, db_uri: str = None):
+    tmp_dir = tempfile.TemporaryDirectory()
+    if db_uri is None:
+        db_uri = "sqlite:///" + os.path.join(tmp_dir.name, "bench.sqlite")
+    engine = create_engine(db_uri)
+
+    df_arrivals, _, df_departures, _ = build_flight_frames(generate_flights(count))
+    print(f"{count} flights on {engine.dialect.name}")
+    for name, df in (("ARRIVALS", df_arrivals), ("DEPARTURES", df_departures)):
+        df = optimize_flight_frame(df)
+
+        start = time.perf_counter()
+        stored = to_storage_frame(df)
+        if engine.dialect.name == "sqlite" and "baggageClaimBelts" in stored:
+            # SQLite cannot bind lists, give to_sql the same text the loader writes
+            stored["baggageClaimBelts"] = stored["baggageClaimBelts"].map(str)
+        stored.to_sql(f"{name}_TO_SQL", engine, if_exists="replace", index=False)
+        to_sql_seconds = time.perf_counter() - start
+
+        bulk_seconds = bulk_load_frame(engine, name, df)["seconds"]
+        print(
+            f"{name:>10}: to_sql {len(df) / to_sql_seconds:>9.0f} rows/s, "
+            f"bulk {len(df) / bulk_seconds:>9.0f} rows/s "
+            f"({to_sql_seconds / bulk_seconds:.1f}x)"
+        )
+    engine.dispose()
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+        sys.argv[2] if len(sys.argv) > 2 else None,
+    )
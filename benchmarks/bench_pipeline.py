@@ -0,0 +1,161 @@
+"""
+pytest-benchmark cases for every stage of the pipeline, run fully offline on
+synthetic payloads: fetching replayed from a recorded-API fixture, the row by row
+and columnar transforms, the report builders, load_data into SQLite and
+aws_upload into a fake S3 client.
+
+Usage: make benchmark (or, to compare against a saved run,
+  PYTHONPATH=. python -m pytest benchmarks/bench_pipeline.py \\
+      --benchmark-storage=benchmarks/results --benchmark-compare)
+Set BENCH_FLIGHTS to change the payload size and BENCH_FIXTURE to replay a
+recorded fixture (benchmarks/replay.py) instead of a synthetic one.
+"""
+
+import os
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from testing.api_fixture import ApiFixture
+from testing.fake_s3 import FakeS3Client
+from testing.stub_server import StubSchipholServer
+from modules.aws_handler import S3Uploader
+from modules.data_fetching import MAX_PAGE, SchipholDataFetcher
+from modules.data_processing import (
+    aggregate_flight_frame,
+    analyse_arrivals,
+    analyse_departures,
+    build_flight_frames,
+    cleanup_flight_data,
+    filter_dataframe,
+    find_busiest_facilities,
+    find_most_popular_destinations,
+    optimize_flight_frame,
+)
+from modules.database_handler import create_tables
+from modules.etl_controller import ETLController
+from sqlalchemy import create_engine
+
+FLIGHTS = int(os.getenv("BENCH_FLIGHTS", "50000"))
+LOOKUP = {"airlines": {}, "destinations": {}}
+WINDOW = "2024-01-01T10:00:00_2024-01-01T06:00:00"
+
+
+@pytest.fixture(scope="module")
+def fixture():
+    if os.getenv("BENCH_FIXTURE"):
+        return ApiFixture.load(os.getenv("BENCH_FIXTURE"))
+    return ApiFixture.synthetic(FLIGHTS)
+
+
+@pytest.fixture(scope="module")
+def raw_flights(fixture):
+    return fixture.flights
+
+
+@pytest.fixture(scope="module")
+def cleaned(raw_flights):
+    return cleanup_flight_data(raw_flights)
+
+
+@pytest.fixture(scope="module")
+def frames(raw_flights):
+    df_arrivals, dest_arrivals, df_departures, dest_departures = build_flight_frames(
+        raw_flights
+    )
+    return (
+        optimize_flight_frame(df_arrivals),
+        dest_arrivals,
+        optimize_flight_frame(df_departures),
+        dest_departures,
+    )
+
+
+@pytest.fixture(scope="module")
+def controller():
+    controller = ETLController()
+    controller.windowStr = WINDOW
+    return controller
+
+
+@pytest.fixture(scope="module")
+def processed(controller, raw_flights):
+    with mock.patch(
+        "modules.reference_resolver.resolve_reference_data", return_value=LOOKUP
+    ):
+        return controller.process_data(raw_flights)
+
+
+def test_fetch_replayed_flights(benchmark, fixture):
+    with StubSchipholServer(latency=0.01, fixture=fixture) as stub:
+
+        def fetch():
+            fetcher = SchipholDataFetcher()
+            fetcher.base_url = stub.base_url
+            try:
+                return fetcher.fetch_flights_data(
+                    "2024-01-01T06:00:00", "2024-01-01T10:00:00"
+                )
+            finally:
+                fetcher.close()
+
+        flights = benchmark.pedantic(fetch, rounds=3)
+    # The fetcher stops after MAX_PAGE pages, like on the live API
+    pages = fixture.flight_pages[: MAX_PAGE + 1]
+    assert len(flights) == sum(len(page) for page in pages)
+
+
+def test_cleanup_flight_data(benchmark, raw_flights):
+    benchmark(cleanup_flight_data, raw_flights)
+
+
+def test_analyse_arrivals(benchmark, cleaned):
+    benchmark(analyse_arrivals, cleaned[0])
+
+
+def test_analyse_departures(benchmark, cleaned):
+    benchmark(analyse_departures, cleaned[1])
+
+
+def test_build_flight_frames(benchmark, raw_flights):
+    benchmark(build_flight_frames, raw_flights)
+
+
+def test_aggregate_flight_frame(benchmark, frames):
+    benchmark(aggregate_flight_frame, frames[2])
+
+
+def test_filter_dataframe(benchmark, frames):
+    benchmark(filter_dataframe, frames[0], "state", "LND", "airline", 5, LOOKUP)
+
+
+def test_find_most_popular_destinations(benchmark, frames):
+    benchmark(find_most_popular_destinations, frames[1], 10, LOOKUP)
+
+
+def test_find_busiest_facilities(benchmark, frames):
+    benchmark(find_busiest_facilities, frames[0], frames[2], 10, WINDOW, LOOKUP)
+
+
+def test_load_data_sqlite(benchmark, controller, processed, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.sqlite'}")
+
+    def prepare_database():
+        controller.engine = engine
+        create_tables(engine)
+
+    with mock.patch.object(controller, "_prepare_database", prepare_database):
+        assert benchmark.pedantic(controller.load_data, args=(processed,), rounds=3)
+    engine.dispose()
+
+
+def test_aws_upload_fake_s3(benchmark, controller, processed):
+    client = FakeS3Client()
+    with mock.patch(
+        "modules.aws_handler.S3Uploader",
+        lambda: S3Uploader(client=client, bucket="bench"),
+    ):
+        benchmark(controller.aws_upload, processed["reports"]["facilities"])
+    assert client.objects
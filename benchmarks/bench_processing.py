@@ -0,0 +1,45 @@
+"""
+Benchmark of the row by row transform (cleanup_flight_data + analyse_arrivals /
+analyse_departures) against the columnar build_flight_frames on synthetic payloads.
+
+Usage: PYTHONPATH=. python benchmarks/bench_processing.py [sizes...]
+"""
+
+import sys
+import time
+
+from testing.synthetic import generate_flights
+from modules.data_processing import (
+    analyse_arrivals,
+    analyse_departures,
+    build_flight_frames,
+    cleanup_flight_data,
+)
+
+
+def row_by_row(flights: list):
+    arrivals, departures = cleanup_flight_data(flights)
+    return analyse_arrivals(arrivals) + analyse_departures(departures)
+
+
+def best_of(function, flights: list, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(flights)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(sizes: list):
+    print(f"{'flights':>9} {'row by row':>11} {'columnar':>10} {'speedup':>8}")
+    for size in sizes:
+        flights = generate_flights(size)
+        repeat = 3 if size <= 100_000 else 1
+        old = best_of(row_by_row, flights, repeat)
+        new = best_of(build_flight_frames, flights, repeat)
+        print(f"{size:>9} {old:>10.3f}s {new:>9.3f}s {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,48 @@
+"""
+Records fixtures of the Schiphol API (testing.api_fixture.ApiFixture) from
+the live API, or synthesizes them.
+
+Usage:
+  PYTHONPATH=. python benchmarks/replay.py record <path> [window_hours]
+  PYTHONPATH=. python benchmarks/replay.py synthesize <path> [flights]
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from testing.api_fixture import ApiFixture, RecordingFetcher
+
+
+def record(path: str, window_hours: float = 4):
+    """
+    Records the flights of the trailing window from the live API, together with
+    their airlines and destinations.
+    """
+    fetcher = RecordingFetcher()
+    now = datetime.now()
+    flights = fetcher.fetch_flights_data(
+        (now - timedelta(hours=window_hours)).strftime("%Y-%m-%dT%H:%M:%S"),
+        now.strftime("%Y-%m-%dT%H:%M:%S"),
+    )
+    for code in {flight.get("prefixICAO") for flight in flights} - {None}:
+        fetcher.fetch_airlines_data(code)
+    for iata in {
+        iata for flight in flights for iata in flight["route"]["destinations"]
+    }:
+        fetcher.fetch_destinations_data(iata)
+    fetcher.close()
+    # Pages after the first empty one are never used
+    fetcher.fixture.flight_pages = [p for p in fetcher.fixture.flight_pages if p]
+    fetcher.fixture.save(path)
+    print(
+        f"Recorded {len(flights)} flights, {len(fetcher.fixture.airlines)} airlines "
+        f"and {len(fetcher.fixture.destinations)} destinations to {path}"
+    )
+
+
+if __name__ == "__main__":
+    command, path, *args = sys.argv[1:]
+    if command == "record":
+        record(path, float(args[0]) if args else 4)
+    else:
+        ApiFixture.synthetic(int(args[0]) if args else 10_000).save(path)
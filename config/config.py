@@ -14,11 +14,81 @@ if os.getenv("DATA_WINDOW_HOURS"):
     )  # ensure this is a float number
 else:
     DATA_WINDOW_HOURS = 4
-    logger.warning(
-        f"DATA_WINDOW_HOURS was set automatically to {DATA_WINDOW_HOURS} hours."
-    )
-    logger.warning("To configure it use the environment variable 'DATA_WINDOW_HOURS'.")
 
+# Incremental extraction: only request the flights scheduled after the last run
+INCREMENTAL_EXTRACTION = os.getenv("INCREMENTAL_EXTRACTION", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+INCREMENTAL_STATE_PATH = os.getenv(
+    "INCREMENTAL_STATE_PATH", os.path.join("state", "flights_state.json.gz")
+)
+# Already fetched flights re-read on every run, to pick up their state changes
+INCREMENTAL_OVERLAP_MINUTES = float(os.getenv("INCREMENTAL_OVERLAP_MINUTES", "60"))
+
+# Number of flight pages requested in parallel (1 fetches pages one by one)
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "4"))
+
+# Run the flights pagination and the reference lookups on one asyncio event loop
+# and one pooled aiohttp session instead of thread pools (needs aiohttp)
+ASYNC_FETCHING = os.getenv("ASYNC_FETCHING", "false").lower() in ("1", "true", "yes")
+
+# Keep only the fields the pipeline reads of every fetched flight, in compact
+# records instead of the full API dicts
+COMPACT_FLIGHT_RECORDS = os.getenv("COMPACT_FLIGHT_RECORDS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# HTTP client settings for the Schiphol API (timeouts in seconds)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+# Airline/destination lookups cache (an empty path keeps the cache in memory only)
+REFERENCE_CACHE_PATH = os.getenv(
+    "REFERENCE_CACHE_PATH", os.path.join("cache", "reference_data.sqlite")
+)
+REFERENCE_CACHE_TTL_HOURS = float(os.getenv("REFERENCE_CACHE_TTL_HOURS", "168"))
+REFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("REFERENCE_CACHE_MAX_ENTRIES", "5000"))
+
+# Raw API responses cache, revalidated with ETag/If-Modified-Since (off unless a
+# path is set). In replay mode the responses are only read from the cache. With
+# the cache on, the end of the trailing window is aligned to slots of
+# RESPONSE_CACHE_ALIGN_MINUTES, so the runs of one slot send the same requests.
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+RESPONSE_CACHE_ALIGN_MINUTES = int(os.getenv("RESPONSE_CACHE_ALIGN_MINUTES", "15"))
+RESPONSE_CACHE_TTL_HOURS = float(os.getenv("RESPONSE_CACHE_TTL_HOURS", "168"))
+RESPONSE_CACHE_REPLAY = os.getenv("RESPONSE_CACHE_REPLAY", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Backfill: worker processes, API requests per second shared by all the workers
+# (0 for no limit) and the log of the completed windows
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+BACKFILL_RATE_LIMIT = float(os.getenv("BACKFILL_RATE_LIMIT", "10"))
+BACKFILL_LOG_PATH = os.getenv(
+    "BACKFILL_LOG_PATH", os.path.join("state", "backfill_log.jsonl")
+)
+
+# Daemon mode: run every DAEMON_INTERVAL_MINUTES, or on the DAEMON_CRON expression
+# when it is set. The lock file keeps runs of every process from overlapping.
+DAEMON_INTERVAL_MINUTES = float(os.getenv("DAEMON_INTERVAL_MINUTES", "60"))
+DAEMON_CRON = os.getenv("DAEMON_CRON", "")
+RUN_LOCK_PATH = os.getenv("RUN_LOCK_PATH", os.path.join("state", "etl.lock"))
+
+# Per run metrics: JSON lines file, and an optional Prometheus text file (e.g. for
+# the node exporter's textfile collector)
+METRICS_JSON_PATH = os.getenv(
+    "METRICS_JSON_PATH", os.path.join("logs", "metrics.jsonl")
+)
+METRICS_PROMETHEUS_PATH = os.getenv("METRICS_PROMETHEUS_PATH", "")
 
 # Database connection settings
 DB_PREFIX = os.getenv("DB_PREFIX")
@@ -28,10 +98,61 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 
 DB_URI = f"{DB_PREFIX}://{DB_USER}:{DB_PASSWORD}@{DB_IP_ADDRESS}/{DB_NAME}"
-logger.debug(f"Database URI is : {DB_URI}")
+# "copy" bulk loads through a staging table (COPY on PostgreSQL), "to_sql" uses
+# pandas' batched inserts
+DB_LOAD_METHOD = os.getenv("DB_LOAD_METHOD", "copy")
+# Tables loaded at the same time, each on its own pooled connection (SQLite
+# loads them one by one, it has a single writer)
+DB_LOAD_CONCURRENCY = int(os.getenv("DB_LOAD_CONCURRENCY", "3"))
+# Connections kept by the engine of the process, enough for the parallel loads
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+# "upsert" merges the flights into ARRIVALS/DEPARTURES keyed by flight name and
+# scheduled time, "replace" rewrites the tables with the current window only
+DB_LOAD_MODE = os.getenv("DB_LOAD_MODE", "upsert")
+
+# Rolling 1h/24h/7d analytics (ROLLING_ANALYTICS table), moved forward after every
+# load. They are counted from the flight history, so only with DB_LOAD_MODE=upsert.
+ROLLING_ANALYTICS = os.getenv("ROLLING_ANALYTICS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Directory of the files handed over between the stages run one by one
+# (main.py extract/process/load/upload)
+STAGE_DIR = os.getenv("STAGE_DIR", "stages")
+# Output of every stage of a run, checkpointed under CHECKPOINT_DIR/<run id> so a
+# failed run can be resumed (main.py --resume <run id>). Empty disables them.
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", os.path.join("state", "checkpoints"))
+# Compression of the stage frames: "uncompressed" files are memory-mapped back in,
+# "lz4" or "zstd" ones are smaller but decompressed when read
+STAGE_COMPRESSION = os.getenv("STAGE_COMPRESSION", "uncompressed")
 
 # S3 configuration
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 S3_BASE_KEY = "_window_report.csv"
+# "parquet" writes compressed Parquet reports under Hive style partitions
+# (report=<name>/date=YYYY-MM-DD/hour=HH), "csv" keeps the <name>/<window> CSVs
+S3_REPORT_FORMAT = os.getenv("S3_REPORT_FORMAT", "parquet")
+S3_PARQUET_COMPRESSION = os.getenv("S3_PARQUET_COMPRESSION", "snappy")
+# Reports uploaded in parallel, objects above the threshold use multipart upload
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "8"))
+S3_MULTIPART_THRESHOLD_MB = float(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8"))
+# S3 rejects parts smaller than 5 MB (except the last one)
+S3_MULTIPART_CHUNK_MB = float(os.getenv("S3_MULTIPART_CHUNK_MB", "8"))
+
+
+def log_settings():
+    """
+    Logs the settings that fell back to a default, once the logging is configured.
+    """
+    if not os.getenv("DATA_WINDOW_HOURS"):
+        logger.warning(
+            f"DATA_WINDOW_HOURS was set automatically to {DATA_WINDOW_HOURS} hours."
+        )
+        logger.warning(
+            "To configure it use the environment variable 'DATA_WINDOW_HOURS'."
+        )
+    logger.debug(f"Database URI is : {DB_URI}")
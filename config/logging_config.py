@@ -3,7 +3,11 @@ import os
 
 # Directory for log files
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)  # Ensure the directory exists
+
+# Handlers are only set up by configure_logging(), not at import, so importing the
+# modules neither touches the file system nor configures the logging of the caller
+logger = logging.getLogger(__name__)
+_configured = False
 
 
 def setup_logging(log_filename="app.log", log_level=logging.INFO):
@@ -14,6 +18,7 @@ def setup_logging(log_filename="app.log", log_level=logging.INFO):
     - log_filename: Name of the log file.
     - log_level: Logging level (default: INFO).
     """
+    os.makedirs(LOG_DIR, exist_ok=True)  # Ensure the directory exists
     logging_config = {
         "version": 1,
         "disable_existing_loggers": False,
@@ -55,9 +60,17 @@ def setup_logging(log_filename="app.log", log_level=logging.INFO):
     return logging.getLogger(__name__)
 
 
-# Check the if TEST_MODE is on
-if os.getenv("TEST_MODE"):
-    logger = setup_logging(log_filename="app.test.log", log_level=logging.DEBUG)
-else:
-    # Initialize the logger with default configuration
-    logger = setup_logging()
+def configure_logging():
+    """
+    Sets up the logging of the application once, called by the entry points.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    # Check the if TEST_MODE is on
+    if os.getenv("TEST_MODE"):
+        setup_logging(log_filename="app.test.log", log_level=logging.DEBUG)
+    else:
+        # Initialize the logger with default configuration
+        setup_logging()
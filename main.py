@@ -1,13 +1,237 @@
-from modules.etl_controller import ETLController
+import argparse
+from datetime import datetime
+from functools import partial
+from modules.scheduler import CronSchedule, Daemon, IntervalSchedule, run_lock
+from config.config import (
+    BACKFILL_LOG_PATH,
+    BACKFILL_WORKERS,
+    DAEMON_CRON,
+    DAEMON_INTERVAL_MINUTES,
+    DATA_WINDOW_HOURS,
+    STAGE_DIR,
+    log_settings,
+)
+from config.logging_config import configure_logging
 
+# The pipeline modules are imported by the functions below, so that the CLI starts
+# fast and a single stage only imports what it needs
 
-def run_pipeline():
+# Stages that can be run one by one, handing their output over through STAGE_DIR
+STAGES = {
+    "extract": "only fetch the window and write its raw flights",
+    "process": "process the extracted flights into frames and reports",
+    "load": "store the processed frames in the database",
+    "upload": "upload the processed reports to S3",
+}
+
+
+def run_pipeline(
+    full_refresh: bool = False,
+    streaming: bool = False,
+    replay: bool = False,
+    resume: str = None,
+):
+    """
+    Run the full ETL pipeline, or resume the failed run <resume>.
+    """
+    from modules.etl_controller import ETLController
+
+    with run_lock() as acquired:
+        if not acquired:
+            raise SystemExit("Another run is still active, not starting a new one.")
+        etl_controller = ETLController(full_refresh=full_refresh, replay=replay)
+        if streaming:
+            etl_controller.run_streaming_etl_process()
+        else:
+            etl_controller.run_etl_process(resume=resume)
+
+
+def run_daemon(
+    interval_minutes: float = DAEMON_INTERVAL_MINUTES,
+    cron: str = DAEMON_CRON,
+    full_refresh: bool = False,
+    streaming: bool = False,
+):
+    """
+    Run the ETL pipeline on a schedule, in one long running process that keeps its
+    imports, connections and caches warm between the runs.
+    """
+    from modules.etl_controller import ETLController
+
+    schedule = CronSchedule(cron) if cron else IntervalSchedule(interval_minutes * 60)
+    etl_controller = ETLController(full_refresh=full_refresh, keep_warm=True)
+
+    def job():
+        if streaming:
+            etl_controller.run_streaming_etl_process()
+        else:
+            etl_controller.run_etl_process()
+        # Only the first run re-downloads the whole window
+        etl_controller.full_refresh = False
+
+    try:
+        # An interval schedule starts right away, a cron one waits for its slot
+        Daemon(job, schedule, run_immediately=not cron).run()
+    finally:
+        etl_controller.close()
+
+
+def run_stage(
+    stage: str,
+    stage_dir: str = STAGE_DIR,
+    full_refresh: bool = False,
+    replay: bool = False,
+):
     """
-    Run the full ETL pipeline.
+    Run a single stage of the ETL pipeline. Each stage reads the output of the
+    previous one from <stage_dir> and writes its own there.
     """
-    etl_controller = ETLController()
-    etl_controller.run_etl_process()
+    from modules.etl_controller import ETLController
+
+    with run_lock() as acquired:
+        if not acquired:
+            raise SystemExit("Another run is still active, not starting a new one.")
+        etl_controller = ETLController(full_refresh=full_refresh, replay=replay)
+        if stage == "extract":
+            etl_controller.run_extract_stage(stage_dir)
+        elif stage == "process":
+            etl_controller.run_process_stage(stage_dir)
+        elif stage == "load":
+            if not etl_controller.run_load_stage(stage_dir):
+                raise SystemExit("Some tables could not be stored.")
+        else:
+            etl_controller.run_upload_stage(stage_dir)
+
+
+def run_backfill_pipeline(
+    start: datetime,
+    end: datetime,
+    window_hours: float = DATA_WINDOW_HOURS,
+    workers: int = BACKFILL_WORKERS,
+    replay: bool = False,
+):
+    """
+    Run the ETL pipeline for every window of the [start, end] range.
+    """
+    from modules.backfill import BackfillLog, run_backfill, run_window
+
+    log = BackfillLog()
+    if replay:
+        # A replay reprocesses every window, also those the backfill completed
+        log = BackfillLog(BACKFILL_LOG_PATH + ".replay")
+        log.reset()
+    summary = run_backfill(
+        start,
+        end,
+        window_hours,
+        workers,
+        log=log,
+        runner=partial(run_window, replay=replay),
+    )
+    if summary["failed"]:
+        raise SystemExit(
+            f"{len(summary['failed'])} backfill windows failed, run again to resume."
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Schiphol Airport ETL Tool")
+    subparsers = parser.add_subparsers(
+        dest="stage",
+        metavar="STAGE",
+        help="run a single stage instead of the whole pipeline: " + ", ".join(STAGES),
+    )
+    for stage, description in STAGES.items():
+        subparser = subparsers.add_parser(stage, help=description)
+        subparser.add_argument(
+            "--stage-dir",
+            default=STAGE_DIR,
+            help="directory of the files handed over between the stages "
+            "(default STAGE_DIR)",
+        )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="re-download the whole window even when incremental extraction is on",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="process the flights page by page to keep memory bounded",
+    )
+    parser.add_argument(
+        "--backfill",
+        nargs=2,
+        metavar=("FROM", "TO"),
+        type=datetime.fromisoformat,
+        help="process the range between two ISO datetimes window by window",
+    )
+    parser.add_argument(
+        "--window-hours",
+        type=float,
+        default=DATA_WINDOW_HOURS,
+        help="size of the backfill windows (default DATA_WINDOW_HOURS)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BACKFILL_WORKERS,
+        help="backfill worker processes (default BACKFILL_WORKERS)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and start a run on every slot of the schedule",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DAEMON_INTERVAL_MINUTES,
+        metavar="MINUTES",
+        help="daemon interval between runs (default DAEMON_INTERVAL_MINUTES)",
+    )
+    parser.add_argument(
+        "--cron",
+        default=DAEMON_CRON,
+        metavar="EXPRESSION",
+        help="5 field cron expression of the daemon runs, instead of --interval",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="resume a failed run from its checkpoint, skipping its completed stages",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="reprocess from the cached API responses without any network call",
+    )
+    args = parser.parse_args(argv)
+    if args.replay and args.daemon:
+        # Every run would reprocess the same cached window
+        parser.error("--replay doesn't apply to --daemon")
+    if args.resume and (args.stage or args.backfill or args.daemon or args.streaming):
+        # Streamed pages are stored as they come, backfills resume from their log
+        parser.error("--resume only applies to a full pipeline run")
+    return args
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    args = parse_args()
+    configure_logging()
+    log_settings()
+    if args.stage:
+        run_stage(args.stage, args.stage_dir, args.full_refresh, args.replay)
+    elif args.backfill:
+        run_backfill_pipeline(
+            *args.backfill, args.window_hours, args.workers, replay=args.replay
+        )
+    elif args.daemon:
+        run_daemon(args.interval, args.cron, args.full_refresh, args.streaming)
+    else:
+        run_pipeline(
+            full_refresh=args.full_refresh,
+            streaming=args.streaming,
+            replay=args.replay,
+            resume=args.resume,
+        )
@@ -0,0 +1,325 @@
+import asyncio
+import time
+from datetime import datetime
+
+try:
+    import aiohttp
+except ImportError:  # only the sync fetcher is available then
+    aiohttp = None
+from modules.data_fetching import (
+    MAX_PAGE,
+    RETRYABLE_STATUS_CODES,
+    BaseSchipholFetcher,
+    SchipholAPIError,
+    _updated_since,
+    _window_str,
+    get_reference_cache,
+    incremental_window,
+    merge_incremental,
+    trailing_window,
+)
+from config.config import FETCH_CONCURRENCY
+from config.logging_config import logger
+
+
+class AsyncSchipholDataFetcher(BaseSchipholFetcher):
+    """
+    Asyncio client of the Schiphol API, with the same retry policy, statistics and
+    metrics as SchipholDataFetcher. All the requests of a fetcher share one aiohttp
+    session (and its keep-alive connections) and at most <concurrency> of them are
+    in flight at a time. Use it as an async context manager, or call open() and
+    close() from the event loop that runs the requests.
+    """
+
+    def __init__(self, concurrency: int = FETCH_CONCURRENCY, **kwargs):
+        if aiohttp is None:
+            raise Exception("aiohttp is required for the async fetcher.")
+        super().__init__(concurrency, **kwargs)
+        self.session = None
+        self._semaphore = None
+
+    async def open(self):
+        if self.session is None:
+            connect_timeout, read_timeout = self.timeout
+            limit = max(self.concurrency, 1)
+            self.session = aiohttp.ClientSession(
+                # requests drops unset headers, aiohttp refuses them
+                headers={
+                    key: value
+                    for key, value in self.headers.items()
+                    if value is not None
+                },
+                connector=aiohttp.TCPConnector(limit=limit),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=connect_timeout, sock_read=read_timeout
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(limit)
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _fetch_data_from_api(self, endpoint, params=None):
+        """
+        Awaitable counterpart of SchipholDataFetcher._fetch_data_from_api: returns
+        the decoded response, or None on 204 or 404, and raises SchipholAPIError
+        when the request is rejected or once the retries are exhausted.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        cache, entry = self._cached_response(endpoint, params)
+        if cache is not None and cache.replay:
+            return self._replay(cache, entry, endpoint, params)
+        headers = cache.conditional_headers(entry) if cache is not None else {}
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            rate_limiter = self._request_limiter()
+            if rate_limiter is not None:
+                await asyncio.sleep(rate_limiter.reserve())
+            self._count("requests")
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    size = 0
+                    try:
+                        async with self.session.get(
+                            url, params=params, headers=headers
+                        ) as response:
+                            body = await response.read()
+                            size = len(body)
+                    finally:
+                        self._observe(
+                            endpoint,
+                            started,
+                            response.status if response is not None else None,
+                            size,
+                        )
+                if response.status == 304 and entry is not None:
+                    logger.debug(f"Cached response of {endpoint} is still current")
+                    return self._decode(cache.serve(entry, revalidated=True))
+                if response.status == 204:
+                    logger.warning(
+                        f"No content returned from {endpoint} for params {params}"
+                    )
+                    return None
+                if response.status == 404:
+                    logger.warning(f"Nothing found at {endpoint} for params {params}")
+                    return None
+                if response.status not in RETRYABLE_STATUS_CODES:
+                    if response.status >= 400:
+                        error = f"Http Error: {response.status} for url: {response.url}"
+                        self._count("failures")
+                        logger.error(error)
+                        raise SchipholAPIError(error)
+                    logger.debug(f"Data fetched successfully from {endpoint}")
+                    self._store_response(
+                        cache, endpoint, params, body, response.headers
+                    )
+                    return self._decode(body)
+                if response.status == 429:
+                    self._count("rate_limited")
+                error = f"Http Error: {response.status} for url: {response.url}"
+            except asyncio.TimeoutError as errt:
+                error = f"Timeout Error: {errt!r}"
+            except aiohttp.ClientConnectionError as errc:
+                error = f"Error Connecting: {errc}"
+            except aiohttp.ClientError as err:
+                self._count("failures")
+                logger.error(f"Error: {err}")
+                raise SchipholAPIError(f"Error: {err}") from err
+
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff_delay(attempt, response)
+            logger.warning(f"{error}. Retrying in {delay:.2f}s.")
+            self._count("retries")
+            self._count("backoff_seconds", delay)
+            await asyncio.sleep(delay)
+
+        self._count("failures")
+        logger.error(f"{error}. Giving up after {self.max_retries} retries.")
+        raise SchipholAPIError(error)
+
+    async def iter_pages(self, endpoint, params=None):
+        """
+        Async generator over the pages of <endpoint>, yielded in page order. Keeps
+        up to <self.concurrency> page requests in flight and stops at the first
+        page that comes back empty (or with 204), like the sync fetcher.
+        """
+        pages = {}
+        in_flight = {}
+        last_page = MAX_PAGE
+        next_page = 0
+        next_to_yield = 0
+
+        try:
+            while True:
+                # Refill, never requesting past a known end of data
+                while next_page <= last_page and len(in_flight) < max(
+                    self.concurrency, 1
+                ):
+                    page_params = dict(params or {}, page=next_page)
+                    task = asyncio.ensure_future(
+                        self._fetch_data_from_api(endpoint, page_params)
+                    )
+                    in_flight[task] = next_page
+                    next_page += 1
+
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    page = in_flight.pop(task)
+                    data = task.result()
+                    if data is not None and data.get("flights"):
+                        pages[page] = data["flights"]
+                    else:
+                        last_page = min(last_page, page - 1)
+
+                while next_to_yield <= last_page and next_to_yield in pages:
+                    self._count_page()
+                    yield pages.pop(next_to_yield)
+                    next_to_yield += 1
+
+            if last_page == MAX_PAGE:
+                self._warn_page_cap(endpoint, params)
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def fetch_flights_data(
+        self, fromDatetime: str, toDatetime: str, search_field: str = None
+    ) -> list:
+        """
+        Method that fetches the flight data of the window defined by the arguments
+        (on <search_field> instead of the schedule when given).
+        """
+        params = self._flights_params(fromDatetime, toDatetime, search_field)
+        all_data = []
+        async for page in self.iter_pages("flights", params):
+            all_data.extend(page)
+        return all_data
+
+    async def fetch_airlines_data(self, airline: str):
+        return await self._fetch_data_from_api("airlines/" + airline)
+
+    async def fetch_destinations_data(self, iata: str):
+        return await self._fetch_data_from_api("destinations/" + iata)
+
+
+async def _fetch_flights_between(
+    api_fetcher: AsyncSchipholDataFetcher,
+    offset_datetime: datetime,
+    now: datetime,
+    search_field: str = None,
+) -> list:
+    requests_before = api_fetcher.stats["requests"]
+    try:
+        logger.debug("Requesting flight data...")
+        flights = await api_fetcher.fetch_flights_data(
+            offset_datetime.strftime("%Y-%m-%dT%H:%M:%S"),
+            now.strftime("%Y-%m-%dT%H:%M:%S"),
+            search_field,
+        )
+        logger.debug("Fetched flight data successfully.")
+    except Exception as err:
+        # A partial window must not pass for the complete one
+        logger.error(f"Error: {err}")
+        raise
+    finally:
+        logger.info(
+            f"Flights API requests: {api_fetcher.stats['requests'] - requests_before}"
+        )
+    return flights
+
+
+async def fetch_flights_data(
+    api_fetcher: AsyncSchipholDataFetcher, window_hours=-1
+) -> tuple[list, str]:
+    """
+    Awaitable version of data_fetching.fetch_flights_data.
+    """
+    offset_datetime, now = trailing_window(window_hours)
+
+    flights = await _fetch_flights_between(api_fetcher, offset_datetime, now)
+
+    return [flights, _window_str(offset_datetime, now)]
+
+
+async def fetch_flights_window(
+    api_fetcher: AsyncSchipholDataFetcher, start: datetime, end: datetime
+) -> tuple[list, str]:
+    """
+    Awaitable version of data_fetching.fetch_flights_window.
+    """
+    flights = await _fetch_flights_between(api_fetcher, start, end)
+    return [flights, _window_str(start, end)]
+
+
+async def fetch_flights_incremental(
+    api_fetcher: AsyncSchipholDataFetcher,
+    state,
+    window_hours=-1,
+    full_refresh: bool = False,
+) -> tuple[list, str]:
+    """
+    Awaitable version of data_fetching.fetch_flights_incremental.
+    """
+    offset_datetime, delta_start, now, window_hours = incremental_window(
+        state, window_hours, full_refresh
+    )
+    delta = await _fetch_flights_between(api_fetcher, delta_start, now)
+    updated = []
+    if delta_start > offset_datetime:
+        # Flights scheduled before the delta may have changed since the last run
+        updated = await _fetch_flights_between(
+            api_fetcher, _updated_since(state, delta_start), now, "lastUpdatedAt"
+        )
+    return merge_incremental(
+        state, delta, offset_datetime, delta_start, now, window_hours, updated
+    )
+
+
+async def _cached_lookup(kind: str, code: str, fetch):
+    # Same cache as the sync lookups, the SQLite store is only read on a miss
+    cache = get_reference_cache()
+    value = cache.get(kind, code)
+    if value is None:
+        try:
+            logger.debug(f"Requesting {kind} info...")
+            value = await fetch(code)
+            logger.debug(f"Fetched {kind} info successfully.")
+        except Exception as err:
+            logger.error(f"Error: {err}")
+            return None
+        if value is not None:
+            cache.put(kind, code, value)
+    return value
+
+
+async def fetch_airline(api_fetcher: AsyncSchipholDataFetcher, airline: str) -> dict:
+    """
+    Awaitable version of data_fetching.fetch_airline.
+    """
+    return await _cached_lookup("airline", airline, api_fetcher.fetch_airlines_data)
+
+
+async def fetch_destination(api_fetcher: AsyncSchipholDataFetcher, iata: str) -> dict:
+    """
+    Awaitable version of data_fetching.fetch_destination.
+    """
+    return await _cached_lookup(
+        "destination", iata, api_fetcher.fetch_destinations_data
+    )
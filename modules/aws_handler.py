@@ -1,44 +1,205 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import boto3
 import pandas as pd
-from io import StringIO
+from io import BytesIO, StringIO
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only the CSV reports are available then
+    pa = None
 from config.config import (
     AWS_ACCESS_KEY_ID,
     AWS_SECRET_ACCESS_KEY,
     S3_BUCKET_NAME,
     S3_BASE_KEY,
+    S3_REPORT_FORMAT,
+    S3_PARQUET_COMPRESSION,
+    S3_UPLOAD_CONCURRENCY,
+    S3_MULTIPART_THRESHOLD_MB,
+    S3_MULTIPART_CHUNK_MB,
 )
 from config.logging_config import logger
 
+_s3_client = None
+_s3_lock = threading.Lock()
 
-def store_to_s3(filePrefix: str, df: pd.DataFrame, windowStr: str):
+
+def get_s3_client():
     """
-    Method that uploads the dataframes as CSVs in AWS s3 bucket.
+    Returns the process wide S3 client. Building a client is slow, and clients are
+    safe to share between threads.
     """
+    global _s3_client
+    with _s3_lock:
+        if _s3_client is None:
+            if AWS_ACCESS_KEY_ID is None:
+                # When running in AWS no access keys are required.
+                _s3_client = boto3.client("s3")
+            else:
+                # When running locally.
+                _s3_client = boto3.client(
+                    "s3",
+                    aws_access_key_id=AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                )
+        return _s3_client
 
-    # Convert DataFrame to CSV string
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
 
-    # Configure S3 object
-    if AWS_ACCESS_KEY_ID is None:
-        # When running in AWS no access keys are required.
-        s3 = boto3.client("s3")
-    else:
-        # When running locally.
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        )
-    S3_KEY = filePrefix + "/" + windowStr + S3_BASE_KEY
+def report_key(
+    filePrefix: str, windowStr: str, report_format: str = S3_REPORT_FORMAT
+) -> str:
+    """
+    S3 key of a report. Parquet reports are partitioned by report name and by the
+    date and hour the window ends, so queries can skip the other partitions.
+    """
+    if report_format == "csv":
+        return filePrefix + "/" + windowStr + S3_BASE_KEY
+    window_end = datetime.strptime(windowStr.split("_")[0], "%Y-%m-%dT%H:%M:%S")
+    return (
+        f"report={filePrefix}/date={window_end:%Y-%m-%d}/hour={window_end:%H}/"
+        f"{windowStr}.parquet"
+    )
 
-    # Upload CSV to S3 bucket
-    try:
-        s3.put_object(Body=csv_buffer.getvalue(), Bucket=S3_BUCKET_NAME, Key=S3_KEY)
+
+def serialize_report(
+    df: pd.DataFrame,
+    report_format: str = S3_REPORT_FORMAT,
+    compression: str = S3_PARQUET_COMPRESSION,
+) -> bytes:
+    """
+    Method that turns a report into the bytes of its S3 object.
+    """
+    if report_format == "csv":
+        csv_buffer = StringIO()
+        df.to_csv(csv_buffer, index=False)
+        return csv_buffer.getvalue().encode("utf-8")
+    if report_format != "parquet":
+        raise Exception(f"Unknown report format '{report_format}'.")
+    if pa is None:
+        raise Exception("pyarrow is required for the Parquet reports.")
+
+    buffer = BytesIO()
+    pq.write_table(
+        pa.Table.from_pandas(df, preserve_index=False),
+        buffer,
+        compression=compression,
+    )
+    return buffer.getvalue()
+
+
+class S3Uploader:
+    """
+    Uploads reports to S3 concurrently through one shared client. Objects larger
+    than the multipart threshold are sent in parts.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        bucket: str = S3_BUCKET_NAME,
+        max_workers: int = S3_UPLOAD_CONCURRENCY,
+        multipart_threshold: int = int(S3_MULTIPART_THRESHOLD_MB * 1024 * 1024),
+        part_size: int = int(S3_MULTIPART_CHUNK_MB * 1024 * 1024),
+        report_format: str = S3_REPORT_FORMAT,
+    ):
+        self.client = client if client is not None else get_s3_client()
+        self.bucket = bucket
+        self.max_workers = max(1, max_workers)
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.report_format = report_format
+
+    def upload_reports(self, reports: dict, windowStr: str) -> dict:
+        """
+        Uploads every {name: DataFrame} report of <reports>, as Parquet or CSV
+        depending on the report format. Returns the key, size and upload time of
+        every report. Raises once all the uploads are done if any of them failed.
+        """
+        objects = {
+            name: (
+                report_key(name, windowStr, self.report_format),
+                serialize_report(df, self.report_format),
+            )
+            for name, df in reports.items()
+        }
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                name: executor.submit(self.upload_object, key, body)
+                for name, (key, body) in objects.items()
+            }
+
+        timings = {}
+        errors = {}
+        for name, future in futures.items():
+            try:
+                timings[name] = future.result()
+            except Exception as exc:
+                errors[name] = exc
+        if errors:
+            errMsg = f"Error uploading reports to S3: {errors}"
+            logger.error(errMsg)
+            raise Exception(errMsg)
+        return timings
+
+    def upload_object(self, key: str, body: bytes) -> dict:
+        """
+        Uploads <body> to <key>, with a multipart upload above the threshold.
+        """
+        start = time.perf_counter()
+        if len(body) > self.multipart_threshold:
+            parts = self._multipart_upload(key, body)
+        else:
+            self.client.put_object(Body=body, Bucket=self.bucket, Key=key)
+            parts = 1
+        elapsed = time.perf_counter() - start
         logger.info(
-            f"CSV file uploaded successfully to S3 bucket: {S3_BUCKET_NAME}/{S3_KEY}"
+            f"Report uploaded successfully to S3 bucket: {self.bucket}/{key} "
+            f"({len(body)} bytes in {elapsed:.3f}s)"
         )
+        return {"key": key, "bytes": len(body), "parts": parts, "seconds": elapsed}
+
+    def _multipart_upload(self, key: str, body: bytes) -> int:
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)[
+            "UploadId"
+        ]
+        try:
+            parts = []
+            for offset in range(0, len(body), self.part_size):
+                part_number = len(parts) + 1
+                response = self.client.upload_part(
+                    Body=body[offset : offset + self.part_size],
+                    Bucket=self.bucket,
+                    Key=key,
+                    PartNumber=part_number,
+                    UploadId=upload_id,
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception:
+            # Incomplete uploads are billed until aborted
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+            raise
+        return len(parts)
+
+
+def store_to_s3(filePrefix: str, df: pd.DataFrame, windowStr: str):
+    """
+    Method that uploads the dataframes as reports in AWS s3 bucket.
+    """
+    S3_KEY = report_key(filePrefix, windowStr)
+    try:
+        return S3Uploader(max_workers=1).upload_object(S3_KEY, serialize_report(df))
     except Exception as e:
-        logger.error(f"Error uploading CSV file to S3: {e}")
+        logger.error(f"Error uploading report to S3: {e}")
         raise Exception(e)
@@ -0,0 +1,174 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from modules.data_fetching import set_rate_limiter
+from modules.rate_limiter import RateLimiter
+from modules.scheduler import run_lock
+from config.config import (
+    BACKFILL_LOG_PATH,
+    BACKFILL_RATE_LIMIT,
+    BACKFILL_WORKERS,
+    DATA_WINDOW_HOURS,
+    DB_LOAD_MODE,
+    RUN_LOCK_PATH,
+)
+from config.logging_config import logger
+
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def split_windows(start: datetime, end: datetime, window_hours: float) -> list:
+    """
+    Splits [<start>, <end>] into consecutive windows of <window_hours>, the last
+    one ending at <end>.
+    """
+    if end <= start:
+        raise Exception(f"Backfill range is empty: {start} to {end}.")
+    step = timedelta(hours=window_hours)
+    windows = []
+    while start < end:
+        windows.append((start, min(start + step, end)))
+        start += step
+    return windows
+
+
+def window_id(start: datetime, end: datetime) -> str:
+    # Same form as the window string the reports are stored under
+    return f"{end.strftime(DATETIME_FORMAT)}_{start.strftime(DATETIME_FORMAT)}"
+
+
+class BackfillLog:
+    """
+    Append-only JSON lines log of the completed backfill windows. A backfill that
+    is started again skips the windows found here, so a failed run resumes where
+    it stopped.
+    """
+
+    def __init__(self, path: str = BACKFILL_LOG_PATH):
+        self.path = path
+
+    def completed(self) -> set:
+        if not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path, "r") as file:
+            for line in file:
+                try:
+                    done.add(json.loads(line)["window"])
+                except (ValueError, KeyError):
+                    # A line cut short by a crash, its window runs again
+                    logger.warning(f"Ignoring unreadable backfill log line: {line!r}")
+        return done
+
+    def reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def mark_done(self, window: str, result: dict):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as file:
+            file.write(json.dumps({"window": window, **result}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def run_window(start: datetime, end: datetime, replay: bool = False) -> dict:
+    """
+    Runs the ETL pipeline for one window (in a worker process). With <replay> the
+    window is reprocessed from the response cache only.
+    """
+    # Imported here, the controller pulls in the whole pipeline
+    from modules.etl_controller import ETLController
+
+    started = time.perf_counter()
+    result = ETLController(replay=replay).run_etl_window(start, end)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _init_worker(rate_limiter):
+    set_rate_limiter(rate_limiter)
+
+
+def run_backfill(
+    start: datetime,
+    end: datetime,
+    window_hours: float = DATA_WINDOW_HOURS,
+    workers: int = BACKFILL_WORKERS,
+    rate_limit: float = BACKFILL_RATE_LIMIT,
+    log: BackfillLog = None,
+    runner=run_window,
+    lock_path: str = RUN_LOCK_PATH,
+) -> dict:
+    """
+    Extracts, processes and stores every window of [<start>, <end>] in parallel
+    worker processes, sharing one API request budget of <rate_limit> requests
+    per second. Windows already in the completion <log> are skipped and every
+    window is logged as soon as it is done. Holds the run lock at <lock_path>
+    and needs DB_LOAD_MODE=upsert. Returns the completed, skipped and failed
+    windows.
+    """
+    if DB_LOAD_MODE != "upsert":
+        # Otherwise every window would replace the previous one
+        raise Exception("Backfills need DB_LOAD_MODE=upsert.")
+    # Held for the whole backfill, so that no daemon or one-shot run loads the
+    # same tables in between
+    with run_lock(lock_path) as acquired:
+        if not acquired:
+            raise Exception("Another run is still active, not starting the backfill.")
+        return _run_backfill(
+            start, end, window_hours, workers, rate_limit, log or BackfillLog(), runner
+        )
+
+
+def _run_backfill(start, end, window_hours, workers, rate_limit, log, runner):
+    windows = split_windows(start, end, window_hours)
+    done = log.completed()
+    pending = [window for window in windows if window_id(*window) not in done]
+    summary = {
+        "completed": [],
+        "skipped": [window_id(*w) for w in windows if window_id(*w) in done],
+        "failed": {},
+    }
+    logger.info(
+        f"Backfilling {len(pending)} windows of {window_hours}h "
+        f"({len(summary['skipped'])} already done) with {workers} workers."
+    )
+
+    rate_limiter = RateLimiter(rate_limit) if rate_limit > 0 else None
+
+    def finish(window, future_result):
+        try:
+            result = future_result()
+        except Exception as exc:
+            logger.error(f"Backfill window {window_id(*window)} failed: {exc}")
+            summary["failed"][window_id(*window)] = str(exc)
+            return
+        log.mark_done(window_id(*window), result)
+        summary["completed"].append(window_id(*window))
+        logger.info(f"Backfill window {window_id(*window)} done: {result}")
+
+    if workers <= 1:
+        set_rate_limiter(rate_limiter)
+        try:
+            for window in pending:
+                finish(window, lambda: runner(*window))
+        finally:
+            set_rate_limiter(None)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(rate_limiter,)
+        ) as executor:
+            futures = {executor.submit(runner, *window): window for window in pending}
+            for future in as_completed(futures):
+                finish(futures[future], future.result)
+
+    logger.info(
+        f"Backfill finished: {len(summary['completed'])} completed, "
+        f"{len(summary['skipped'])} skipped, {len(summary['failed'])} failed."
+    )
+    return summary
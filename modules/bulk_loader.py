@@ -0,0 +1,285 @@
+import csv
+import time
+from io import StringIO
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from modules.data_processing import to_storage_frame
+from config.logging_config import logger
+
+# psycopg2's text form of NULL in COPY ... CSV
+COPY_NULL = "\\N"
+
+
+def _array_literal(value) -> str:
+    # Same text PostgreSQL stores when a Python list goes into a TEXT column
+    return "{" + ",".join(str(item) for item in value) + "}"
+
+
+def _is_list_column(series: pd.Series) -> bool:
+    # Columns are homogeneous, the first value tells the type
+    values = series.dropna()
+    return (
+        series.dtype == object and not values.empty and isinstance(values.iloc[0], list)
+    )
+
+
+def _prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df = to_storage_frame(df)
+    list_columns = [column for column in df.columns if _is_list_column(df[column])]
+    if list_columns:
+        df = df.copy()
+        for column in list_columns:
+            df[column] = df[column].map(
+                lambda value: (
+                    _array_literal(value) if isinstance(value, list) else value
+                )
+            )
+    return df
+
+
+def _quote(engine, name: str) -> str:
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def bulk_load_frame(
+    engine, table_name: str, df: pd.DataFrame, partition_column: str = None
+) -> dict:
+    """
+    Replaces the rows of the table <table_name> with the rows of <df>, keeping its
+    schema (keys, indexes and partitions). The rows go into a staging table first
+    (a temporary table copied with COPY FROM STDIN on PostgreSQL, batched inserts
+    otherwise), then the table is emptied and filled from the staging table in
+    the same transaction, so readers never see a half loaded table. The monthly
+    partitions of <partition_column> are created first on PostgreSQL. Returns the
+    number of rows and the load time.
+    """
+    start = time.perf_counter()
+    if df.columns.empty:
+        logger.warning(f"Nothing to load into {table_name}, the frame has no columns.")
+        return {"rows": 0, "seconds": 0.0}
+    df = _prepare_frame(df)
+    columns = _column_list(engine, [str(column) for column in df.columns])
+    staging_name = f"{table_name}_staging"
+
+    with engine.begin() as connection:
+        if not inspect(connection).has_table(table_name):
+            # Tables outside create_tables.sql take the column types of to_sql
+            connection.execute(
+                text(pd.io.sql.get_schema(df, table_name, con=connection))
+            )
+        if engine.dialect.name == "postgresql":
+            if partition_column is not None:
+                _create_monthly_partitions(
+                    connection, engine, table_name, df[partition_column]
+                )
+            connection.execute(
+                text(
+                    f"CREATE TEMPORARY TABLE {_quote(engine, staging_name)} "
+                    f"(LIKE {_quote(engine, table_name)}) ON COMMIT DROP"
+                )
+            )
+            _copy_rows(connection, engine, staging_name, df)
+            connection.execute(text(f"TRUNCATE {_quote(engine, table_name)}"))
+        else:
+            df.to_sql(
+                staging_name,
+                connection,
+                if_exists="replace",
+                index=False,
+                chunksize=10_000,
+            )
+            connection.execute(text(f"DELETE FROM {_quote(engine, table_name)}"))
+        connection.execute(
+            text(
+                f"INSERT INTO {_quote(engine, table_name)} ({columns}) "
+                f"SELECT {columns} FROM {_quote(engine, staging_name)}"
+            )
+        )
+        if engine.dialect.name != "postgresql":
+            connection.execute(text(f"DROP TABLE {_quote(engine, staging_name)}"))
+
+    elapsed = time.perf_counter() - start
+    logger.debug(
+        f"Bulk loaded {len(df)} rows into {table_name} in {elapsed:.3f}s "
+        f"({len(df) / elapsed if elapsed else 0:.0f} rows/s)."
+    )
+    return {"rows": len(df), "seconds": elapsed}
+
+
+def insert_frame(
+    engine, table_name: str, df: pd.DataFrame, partition_column: str = None
+) -> dict:
+    """
+    Replaces the rows of the table <table_name> with the rows of <df> through
+    plain to_sql inserts (DB_LOAD_METHOD=to_sql), keeping its schema. The table
+    is emptied and filled in the same transaction, creating the monthly
+    partitions of <partition_column> first on PostgreSQL. Returns the number of
+    rows and the load time.
+    """
+    start = time.perf_counter()
+    df = _prepare_frame(df)
+
+    with engine.begin() as connection:
+        if inspect(connection).has_table(table_name):
+            if engine.dialect.name == "postgresql":
+                if partition_column is not None:
+                    _create_monthly_partitions(
+                        connection, engine, table_name, df[partition_column]
+                    )
+                connection.execute(text(f"TRUNCATE {_quote(engine, table_name)}"))
+            else:
+                connection.execute(text(f"DELETE FROM {_quote(engine, table_name)}"))
+        df.to_sql(
+            table_name, connection, if_exists="append", index=False, chunksize=10_000
+        )
+
+    elapsed = time.perf_counter() - start
+    logger.debug(f"Inserted {len(df)} rows into {table_name} in {elapsed:.3f}s.")
+    return {"rows": len(df), "seconds": elapsed}
+
+
+def bulk_upsert_frame(
+    engine,
+    table_name: str,
+    df: pd.DataFrame,
+    key_columns: tuple,
+    partition_column: str = None,
+) -> dict:
+    """
+    Inserts the rows of <df> into the existing table <table_name> and updates the
+    rows whose <key_columns> are already there, so loading the same or overlapping
+    windows again is idempotent. On PostgreSQL the rows are copied into a
+    temporary table and merged with one INSERT ... ON CONFLICT, creating the
+    monthly partitions of <partition_column> they fall in first. Returns the
+    number of rows and the load time.
+    """
+    start = time.perf_counter()
+    if df.empty:
+        logger.warning(f"Nothing to upsert into {table_name}, the frame is empty.")
+        return {"rows": 0, "seconds": 0.0}
+    # ON CONFLICT can update a row only once per statement
+    df = _prepare_frame(df).drop_duplicates(subset=list(key_columns), keep="last")
+    columns = [str(column) for column in df.columns]
+
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            if partition_column is not None:
+                _create_monthly_partitions(
+                    connection, engine, table_name, df[partition_column]
+                )
+            staging_name = f"{table_name}_upsert"
+            connection.execute(
+                text(
+                    f"CREATE TEMPORARY TABLE {_quote(engine, staging_name)} "
+                    f"(LIKE {_quote(engine, table_name)}) ON COMMIT DROP"
+                )
+            )
+            _copy_rows(connection, engine, staging_name, df)
+            source = (
+                f"SELECT {_column_list(engine, columns)} "
+                f"FROM {_quote(engine, staging_name)}"
+            )
+            connection.execute(
+                text(
+                    _upsert_statement(engine, table_name, columns, key_columns, source)
+                )
+            )
+        else:
+            source = "VALUES (" + ", ".join(f":p{i}" for i in range(len(columns))) + ")"
+            connection.execute(
+                text(
+                    _upsert_statement(engine, table_name, columns, key_columns, source)
+                ),
+                _parameter_rows(df),
+            )
+
+    elapsed = time.perf_counter() - start
+    logger.debug(
+        f"Upserted {len(df)} rows into {table_name} in {elapsed:.3f}s "
+        f"({len(df) / elapsed if elapsed else 0:.0f} rows/s)."
+    )
+    return {"rows": len(df), "seconds": elapsed}
+
+
+def _column_list(engine, columns: list) -> str:
+    return ", ".join(_quote(engine, column) for column in columns)
+
+
+def _upsert_statement(
+    engine, table_name: str, columns: list, key_columns: tuple, source: str
+) -> str:
+    updates = ", ".join(
+        f"{_quote(engine, column)} = EXCLUDED.{_quote(engine, column)}"
+        for column in columns
+        if column not in key_columns
+    )
+    # Rows made of their keys only have nothing to update
+    action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+    return (
+        f"INSERT INTO {_quote(engine, table_name)} ({_column_list(engine, columns)}) "
+        f"{source} "
+        f"ON CONFLICT ({_column_list(engine, list(key_columns))}) {action}"
+    )
+
+
+def _parameter_rows(df: pd.DataFrame) -> list:
+    df = df.copy()
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            df[column] = df[column].map(
+                lambda value: value.isoformat() if not pd.isna(value) else None
+            )
+    df = df.astype(object).where(df.notna(), None)
+    return [
+        {f"p{i}": value for i, value in enumerate(row)}
+        for row in df.itertuples(index=False, name=None)
+    ]
+
+
+def _create_monthly_partitions(connection, engine, table_name: str, column):
+    # Partition bounds are read in the session time zone
+    connection.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+    scheduled = pd.to_datetime(column, utc=True).dt.tz_localize(None)
+    for month in sorted(scheduled.dropna().dt.to_period("M").unique()):
+        partition_name = f"{table_name}_{month.year}_{month.month:02d}"
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {_quote(engine, partition_name)} "
+                f"PARTITION OF {_quote(engine, table_name)} "
+                f"FOR VALUES FROM ('{month.start_time:%Y-%m-%d}') "
+                f"TO ('{(month + 1).start_time:%Y-%m-%d}')"
+            )
+        )
+
+
+def _copy_rows(connection, engine, table_name: str, df: pd.DataFrame):
+    # Naive UTC timestamps are formatted much faster, the session reads them as UTC
+    connection.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+    df = df.copy()
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            df[column] = df[column].dt.tz_convert("UTC").dt.tz_localize(None)
+
+    buffer = StringIO()
+    df.to_csv(
+        buffer, index=False, header=False, na_rep=COPY_NULL, quoting=csv.QUOTE_MINIMAL
+    )
+    buffer.seek(0)
+
+    columns = _column_list(engine, [str(column) for column in df.columns])
+    statement = (
+        f"COPY {_quote(engine, table_name)} ({columns}) FROM STDIN "
+        f"WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2
+            cursor.copy_expert(statement, buffer)
+        else:
+            # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
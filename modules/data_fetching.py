@@ -1,16 +1,92 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
 import requests
-from config.config import SCHIPHOL_API_APP_ID, SCHIPHOL_API_APP_KEY, DATA_WINDOW_HOURS
+from requests.adapters import HTTPAdapter
+from config.config import (
+    SCHIPHOL_API_APP_ID,
+    SCHIPHOL_API_APP_KEY,
+    DATA_WINDOW_HOURS,
+    FETCH_CONCURRENCY,
+    COMPACT_FLIGHT_RECORDS,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+    INCREMENTAL_OVERLAP_MINUTES,
+    RESPONSE_CACHE_ALIGN_MINUTES,
+)
 from config.logging_config import logger
+from modules.flight_records import decode_flights_response
+from modules.incremental_state import IncrementalState, flight_schedule
+from modules.reference_cache import ReferenceCache
 
+# Upper threshold for the page index (for simplicity)
+MAX_PAGE = 50
 
-class SchipholDataFetcher:
+# Responses worth retrying: rate limiting and server side errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Optional request budget shared by every fetcher of the process
+_rate_limiter = None
+# Metrics of the running pipeline run, fed by every fetcher of the process
+_metrics = None
+# Raw responses cache of the running pipeline run
+_response_cache = None
+
+# Shared by every airline/destination lookup of the process
+_reference_cache = None
+_reference_fetcher = None
+_reference_lock = threading.Lock()
+# Shared by the flights requests of every run of the process, so a long running
+# process keeps its connections
+_flights_fetcher = None
+
+
+class SchipholAPIError(Exception):
     """
-    Class to handle data fetching from Schiphol API.
+    Raised when a request still fails after all retries. Unlike a 204 response,
+    this does not mean that there is no more data.
     """
 
-    def __init__(self):
+
+class BaseSchipholFetcher:
+    """
+    Settings, statistics and retry policy shared by the sync and async clients of
+    the Schiphol API.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = FETCH_CONCURRENCY,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_base: float = HTTP_BACKOFF_BASE,
+        backoff_max: float = HTTP_BACKOFF_MAX,
+        rate_limiter=None,
+        metrics=None,
+        response_cache=None,
+        compact_flights: bool = False,
+    ):
         self.base_url = "https://api.schiphol.nl/public-flights"
+        self.concurrency = concurrency
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Without its own limiter a fetcher waits for the process's one, read at
+        # every request since the shared fetchers outlive a backfill
+        self.rate_limiter = rate_limiter
+        # Without its own metrics a fetcher reports to the current run's metrics
+        self.metrics = metrics
+        self.response_cache = response_cache
+        # Flights pages are decoded into FlightRecords instead of raw dicts
+        self.compact_flights = compact_flights
         self.headers = {
             "Accept": "application/json",
             "app_id": SCHIPHOL_API_APP_ID,
@@ -18,59 +94,296 @@ class SchipholDataFetcher:
             "ResourceVersion": "v4",
         }
 
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "backoff_seconds": 0.0,
+            "failures": 0,
+            "pages": 0,
+            "bytes": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, value=1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _run_metrics(self):
+        return self.metrics if self.metrics is not None else _metrics
+
+    def _request_limiter(self):
+        return self.rate_limiter if self.rate_limiter is not None else _rate_limiter
+
+    def _cached_response(self, endpoint: str, params=None) -> tuple:
+        # The cache (or None) and its entry for this request
+        cache = (
+            self.response_cache if self.response_cache is not None else _response_cache
+        )
+        if cache is None:
+            return None, None
+        return cache, cache.get(endpoint, params)
+
+    def _decode(self, content: bytes):
+        return decode_flights_response(content, self.compact_flights)
+
+    def _replay(self, cache, entry, endpoint: str, params=None):
+        # Serves a request from the cache only, no request is sent
+        content = cache.serve(entry)
+        if content is None:
+            if endpoint == "flights" and (params or {}).get("page") == 0:
+                # Without its first page the window was never cached
+                raise SchipholAPIError(
+                    f"No cached response of {endpoint} for params {params}"
+                )
+            return None
+        return self._decode(content)
+
+    def _store_response(self, cache, endpoint, params, content: bytes, headers):
+        if cache is not None:
+            cache.put(
+                endpoint,
+                params,
+                content,
+                headers.get("ETag"),
+                headers.get("Last-Modified"),
+            )
+
+    def _observe(self, endpoint: str, started: float, status=None, size: int = 0):
+        self._count("bytes", size)
+        metrics = self._run_metrics()
+        if metrics is not None:
+            metrics.observe_http(
+                endpoint.split("/")[0], time.perf_counter() - started, status, size
+            )
+
+    def _count_page(self):
+        self._count("pages")
+        if self._run_metrics() is not None:
+            self._run_metrics().add("pages")
+
+    def _warn_page_cap(self, endpoint: str, params=None):
+        # The pages past MAX_PAGE are never requested
+        logger.warning(
+            f"Reached the page cap ({MAX_PAGE}) of {endpoint} {params or {}}, "
+            "the flights of the later pages are missing."
+        )
+
+    def _backoff_delay(self, attempt: int, response=None) -> float:
+        # Exponential backoff with full jitter, the server's Retry-After wins
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        if response is not None and response.headers.get("Retry-After"):
+            delay = max(delay, _parse_retry_after(response.headers["Retry-After"]))
+        return min(delay, self.backoff_max)
+
+    def _flights_params(
+        self, fromDatetime: str, toDatetime: str, search_field: str = None
+    ) -> dict:
+        params = {
+            "includedelays": "true",
+            "sort": "+scheduleTime",
+            "fromDateTime": fromDatetime,
+            "toDateTime": toDatetime,
+        }
+        if search_field is not None:
+            # The bounds filter on this field instead of the schedule
+            params["searchDateTimeField"] = search_field
+        return params
+
+
+class SchipholDataFetcher(BaseSchipholFetcher):
+    """
+    Class to handle data fetching from Schiphol API.
+    """
+
+    def __init__(self, concurrency: int = FETCH_CONCURRENCY, **kwargs):
+        super().__init__(concurrency, **kwargs)
+
+        # One pooled session per fetcher, sized for the concurrent page requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=2, pool_maxsize=max(concurrency, 10), max_retries=0
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+
     def _fetch_data_from_api(self, endpoint, params=None):
+        """
+        Returns the decoded response, or None when the API has no content (204) or
+        does not know the resource (404). Raises SchipholAPIError once the retries
+        on connection errors, timeouts, rate limiting (429) and server errors are
+        exhausted, and right away when the request is rejected (e.g. 401, 403).
+        """
         url = f"{self.base_url}/{endpoint}"
-        try:
-            response = requests.get(url, headers=self.headers, params=params)
-            if response.status_code == 204:
-                logger.warning(
-                    f"No content returned from {endpoint} for params {params}"
-                )
-                return None
-            response.raise_for_status()
-            logger.debug(f"Data fetched successfully from {endpoint}")
-            return response.json()
-        except requests.exceptions.HTTPError as errh:
-            logger.error(f"Http Error: {errh}")
-        except requests.exceptions.ConnectionError as errc:
-            logger.error(f"Error Connecting: {errc}")
-        except requests.exceptions.Timeout as errt:
-            logger.error(f"Timeout Error: {errt}")
-        except requests.exceptions.RequestException as err:
-            logger.error(f"Error: {err}")
-        return None
+        cache, entry = self._cached_response(endpoint, params)
+        if cache is not None and cache.replay:
+            return self._replay(cache, entry, endpoint, params)
+        headers = cache.conditional_headers(entry) if cache is not None else {}
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            rate_limiter = self._request_limiter()
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            self._count("requests")
+            started = time.perf_counter()
+            try:
+                try:
+                    response = self.session.get(
+                        url, params=params, headers=headers, timeout=self.timeout
+                    )
+                finally:
+                    self._observe(
+                        endpoint,
+                        started,
+                        response.status_code if response is not None else None,
+                        len(response.content) if response is not None else 0,
+                    )
+                if response.status_code == 304 and entry is not None:
+                    logger.debug(f"Cached response of {endpoint} is still current")
+                    return self._decode(cache.serve(entry, revalidated=True))
+                if response.status_code == 204:
+                    logger.warning(
+                        f"No content returned from {endpoint} for params {params}"
+                    )
+                    return None
+                if response.status_code == 404:
+                    logger.warning(f"Nothing found at {endpoint} for params {params}")
+                    return None
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    logger.debug(f"Data fetched successfully from {endpoint}")
+                    self._store_response(
+                        cache, endpoint, params, response.content, response.headers
+                    )
+                    return self._decode(response.content)
+                if response.status_code == 429:
+                    self._count("rate_limited")
+                error = f"Http Error: {response.status_code} for url: {response.url}"
+            except requests.exceptions.HTTPError as errh:
+                # A rejected request would be rejected again, and is not the end
+                # of the data either
+                self._count("failures")
+                logger.error(f"Http Error: {errh}")
+                raise SchipholAPIError(f"Http Error: {errh}") from errh
+            except requests.exceptions.ConnectionError as errc:
+                error = f"Error Connecting: {errc}"
+            except requests.exceptions.Timeout as errt:
+                error = f"Timeout Error: {errt}"
+            except requests.exceptions.RequestException as err:
+                self._count("failures")
+                logger.error(f"Error: {err}")
+                raise SchipholAPIError(f"Error: {err}") from err
+
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff_delay(attempt, response)
+            logger.warning(f"{error}. Retrying in {delay:.2f}s.")
+            self._count("retries")
+            self._count("backoff_seconds", delay)
+            time.sleep(delay)
+
+        self._count("failures")
+        logger.error(f"{error}. Giving up after {self.max_retries} retries.")
+        raise SchipholAPIError(error)
+
+    def close(self):
+        self.session.close()
 
     def _fetch_pages_iteratively(self, endpoint, params=None):
         all_data = []
-        page = 0
+        for page in self._iter_pages(endpoint, params):
+            all_data.extend(page)
+        return all_data
 
-        while True:
-            params["page"] = page
-            data = self._fetch_data_from_api(endpoint, params)
-            if data is not None:
-                all_data.extend(data["flights"])
-            else:
-                break
+    def _iter_pages(self, endpoint, params=None):
+        """
+        Generator over the pages of <endpoint>, yielded in page order. Stops at the
+        first page that comes back empty (or with 204).
+        """
+        if self.concurrency > 1:
+            pages = self._iter_pages_concurrently(endpoint, params)
+        else:
+            pages = self._iter_pages_serially(endpoint, params)
+        for page in pages:
+            self._count_page()
+            yield page
 
-            page += 1
-            if page > 50:
-                # Setting upper threshold 50 for page size (for simplicity)
+    def _iter_pages_serially(self, endpoint, params=None):
+        page = 0
+        while page <= MAX_PAGE:
+            data = self._fetch_data_from_api(endpoint, dict(params or {}, page=page))
+            if data is None or not data.get("flights"):
                 break
-        return all_data
+            yield data["flights"]
+            page += 1
+        else:
+            self._warn_page_cap(endpoint, params)
+
+    def _iter_pages_concurrently(self, endpoint, params=None):
+        """
+        Keeps up to <self.concurrency> page requests in flight. The first page that
+        comes back empty (or with 204) marks the end of the data, pages after it
+        are discarded and the rest are yielded in page order as soon as all the
+        pages before them have arrived.
+        """
+        pages = {}
+        in_flight = {}
+        last_page = MAX_PAGE
+        next_page = 0
+        next_to_yield = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                # Refill the pool, never requesting past a known end of data
+                while next_page <= last_page and len(in_flight) < self.concurrency:
+                    page_params = dict(params or {}, page=next_page)
+                    future = executor.submit(
+                        self._fetch_data_from_api, endpoint, page_params
+                    )
+                    in_flight[future] = next_page
+                    next_page += 1
+
+                if not in_flight:
+                    break
 
-    def fetch_flights_data(self, fromDatetime: str, toDatetime: str):
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    data = future.result()
+                    if data is not None and data.get("flights"):
+                        pages[page] = data["flights"]
+                    else:
+                        last_page = min(last_page, page - 1)
+
+                while next_to_yield <= last_page and next_to_yield in pages:
+                    yield pages.pop(next_to_yield)
+                    next_to_yield += 1
+
+        if last_page == MAX_PAGE:
+            self._warn_page_cap(endpoint, params)
+
+    def fetch_flights_data(
+        self, fromDatetime: str, toDatetime: str, search_field: str = None
+    ):
         """
         Function that fetches the flight data the window defined by the arguments.
+        With <search_field> (e.g. lastUpdatedAt) the window applies to that field
+        instead of the schedule.
         """
-        params = {
-            "includedelays": "true",
-            "sort": "+scheduleTime",
-            "fromDateTime": fromDatetime,
-            "toDateTime": toDatetime,
-        }
+        params = self._flights_params(fromDatetime, toDatetime, search_field)
 
         return self._fetch_pages_iteratively("flights", params)
 
+    def iter_flights_pages(self, fromDatetime: str, toDatetime: str):
+        """
+        Generator over the pages of flights of the window defined by the arguments.
+        """
+        params = self._flights_params(fromDatetime, toDatetime)
+
+        return self._iter_pages("flights", params)
+
     def fetch_airlines_data(self, airline: str):
         return self._fetch_data_from_api("airlines/" + airline)
 
@@ -78,45 +391,293 @@ class SchipholDataFetcher:
         return self._fetch_data_from_api("destinations/" + iata)
 
 
+def _get_flights_fetcher() -> SchipholDataFetcher:
+    global _flights_fetcher
+    with _reference_lock:
+        if _flights_fetcher is None:
+            _flights_fetcher = SchipholDataFetcher(
+                compact_flights=COMPACT_FLIGHT_RECORDS
+            )
+        return _flights_fetcher
+
+
+def _stats_since(api_fetcher: SchipholDataFetcher, before: dict) -> dict:
+    return {key: value - before[key] for key, value in api_fetcher.stats.items()}
+
+
+def _fetch_flights_between(
+    offset_datetime: datetime, now: datetime, search_field: str = None
+) -> list:
+    api_fetcher = _get_flights_fetcher()
+    stats_before = dict(api_fetcher.stats)
+
+    # Format the datetime as a string in the desired format
+    fromDatetime = offset_datetime.strftime("%Y-%m-%dT%H:%M:%S")
+    toDatetime = now.strftime("%Y-%m-%dT%H:%M:%S")
+
+    try:
+        logger.debug("Requesting flight data...")
+        flights = api_fetcher.fetch_flights_data(fromDatetime, toDatetime, search_field)
+        logger.debug("Fetched flight data successfully.")
+    except Exception as err:
+        # A partial window must not pass for the complete one
+        logger.error(f"Error: {err}")
+        raise
+    finally:
+        logger.info(
+            f"Flights API HTTP stats: {_stats_since(api_fetcher, stats_before)}"
+        )
+
+    return flights
+
+
+def _window_str(offset_datetime: datetime, now: datetime) -> str:
+    return (
+        now.strftime("%Y-%m-%dT%H:%M:%S")
+        + "_"
+        + offset_datetime.strftime("%Y-%m-%dT%H:%M:%S")
+    )
+
+
+def _window_end() -> datetime:
+    """
+    Function that returns the end of the trailing window: now, or the start of the
+    current slot of RESPONSE_CACHE_ALIGN_MINUTES when the response cache is on, so
+    the runs of one slot request the same pages and hit the cache.
+    """
+    now = datetime.now()
+    if _response_cache is None or RESPONSE_CACHE_ALIGN_MINUTES <= 0:
+        return now
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    slot = timedelta(minutes=RESPONSE_CACHE_ALIGN_MINUTES)
+    return midnight + (now - midnight) // slot * slot
+
+
+def trailing_window(window_hours=-1) -> tuple[datetime, datetime]:
+    """
+    Function that returns the start and end of the trailing window. When replaying
+    from the response cache, the window of the last cached flights request is
+    returned instead, so the run reads exactly the cached pages.
+    """
+    if _response_cache is not None and _response_cache.replay:
+        window = _response_cache.latest_window()
+        if window is None:
+            raise Exception("Nothing to replay, no flights in the response cache.")
+        logger.info(
+            f"Replaying the cached window {window[0]:%Y-%m-%dT%H:%M:%S} - "
+            f"{window[1]:%Y-%m-%dT%H:%M:%S}."
+        )
+        return window
+    now = _window_end()
+    if window_hours < 0:
+        window_hours = DATA_WINDOW_HOURS
+    return now - timedelta(hours=window_hours), now
+
+
+def set_metrics(metrics):
+    """
+    Makes every fetcher of this process report its HTTP calls to <metrics>.
+    """
+    global _metrics
+    _metrics = metrics
+
+
+def set_response_cache(response_cache):
+    """
+    Makes every fetcher of this process go through <response_cache> (None turns
+    the cache off).
+    """
+    global _response_cache
+    _response_cache = response_cache
+
+
+def set_rate_limiter(rate_limiter):
+    """
+    Makes every fetcher of this process wait for <rate_limiter> before each
+    request (None lifts the limit).
+    """
+    global _rate_limiter
+    _rate_limiter = rate_limiter
+
+
+def fetch_flights_window(start: datetime, end: datetime) -> tuple[list, str]:
+    """
+    Exposed function that fetches the flight entries scheduled between <start> and
+    <end>, together with the window string.
+    """
+    flights = _fetch_flights_between(start, end)
+    return [flights, _window_str(start, end)]
+
+
 def fetch_flights_data(window_hours=-1) -> tuple[list, str]:
     """
     Exposed function that fetches the flight entries. Optional argument window
     defines the time window for which we request data.
     """
-    api_fetcher = SchipholDataFetcher()
-
     # Define the time window
-    now = datetime.now()
+    offset_datetime, now = trailing_window(window_hours)
+
+    flights = _fetch_flights_between(offset_datetime, now)
+
+    return [flights, _window_str(offset_datetime, now)]
+
+
+def iter_flights_pages(window_hours=-1) -> tuple:
+    """
+    Exposed function that returns a generator over the pages of flights of the
+    trailing window, together with the window string. Pages are fetched while the
+    generator is consumed, so only a few of them are held in memory at a time.
+    """
+    offset_datetime, now = trailing_window(window_hours)
+
+    def pages():
+        api_fetcher = _get_flights_fetcher()
+        stats_before = dict(api_fetcher.stats)
+        try:
+            yield from api_fetcher.iter_flights_pages(
+                offset_datetime.strftime("%Y-%m-%dT%H:%M:%S"),
+                now.strftime("%Y-%m-%dT%H:%M:%S"),
+            )
+        finally:
+            logger.info(
+                f"Flights API HTTP stats: {_stats_since(api_fetcher, stats_before)}"
+            )
+
+    return pages(), _window_str(offset_datetime, now)
+
+
+def fetch_flights_incremental(
+    state: IncrementalState, window_hours=-1, full_refresh: bool = False
+) -> tuple[list, str]:
+    """
+    Exposed function that returns the flight entries of the trailing window, only
+    requesting the flights scheduled or updated after the high-water mark of
+    <state> (minus a short overlap) and merging them into the flights of the
+    previous run. With <full_refresh> the whole window is requested again. The
+    caller saves the state once the window has been processed successfully.
+    """
+    offset_datetime, delta_start, now, window_hours = incremental_window(
+        state, window_hours, full_refresh
+    )
+    delta = _fetch_flights_between(delta_start, now)
+    updated = []
+    if delta_start > offset_datetime:
+        # Flights scheduled before the delta may have changed since the last run
+        updated = _fetch_flights_between(
+            _updated_since(state, delta_start), now, "lastUpdatedAt"
+        )
+    return merge_incremental(
+        state, delta, offset_datetime, delta_start, now, window_hours, updated
+    )
+
+
+def incremental_window(
+    state: IncrementalState, window_hours=-1, full_refresh: bool = False
+) -> tuple:
+    """
+    Function that returns the start of the trailing window, the datetime from
+    which flights have to be requested, the end of the window and its size.
+    Resets <state> when it cannot be reused.
+    """
+    now = _window_end()
     if window_hours < 0:
         window_hours = DATA_WINDOW_HOURS
     offset_datetime = now - timedelta(hours=window_hours)
 
-    # Format the datetime as a string in the desired format
-    fromDatetime = offset_datetime.strftime("%Y-%m-%dT%H:%M:%S")
-    toDatetime = now.strftime("%Y-%m-%dT%H:%M:%S")
+    delta_start = None
+    if not full_refresh:
+        delta_start = state.delta_start(
+            offset_datetime,
+            window_hours,
+            timedelta(minutes=INCREMENTAL_OVERLAP_MINUTES),
+        )
+    if delta_start is None:
+        state.reset()
+        delta_start = offset_datetime
+    return offset_datetime, delta_start, now, window_hours
+
+
+def _updated_since(state: IncrementalState, delta_start: datetime) -> datetime:
+    # Updates are requested from the last one the previous run saw
+    return state.updated_since(
+        delta_start, timedelta(minutes=INCREMENTAL_OVERLAP_MINUTES)
+    )
+
+
+def merge_incremental(
+    state: IncrementalState,
+    delta: list,
+    offset_datetime: datetime,
+    delta_start: datetime,
+    now: datetime,
+    window_hours: float,
+    updated: list = (),
+) -> tuple[list, str]:
+    """
+    Function that merges the newly fetched flights into <state>, returning the
+    flights of the window together with the window string. Of the flights
+    <updated> since the last run, only those scheduled in the window are kept.
+    """
+    delta = list(delta) + [
+        flight
+        for flight in updated
+        if offset_datetime <= flight_schedule(flight) <= now
+    ]
+    logger.info(
+        f"Fetched {len(delta)} flights scheduled or updated since "
+        f"{delta_start:%Y-%m-%dT%H:%M:%S}, "
+        f"merging into {len(state.flights)} stored flights."
+    )
+    flights = state.merge(delta, offset_datetime, now, window_hours)
+
+    return [flights, _window_str(offset_datetime, now)]
 
+
+def _parse_retry_after(value: str) -> float:
+    # Retry-After is either a number of seconds or an HTTP date
     try:
-        logger.debug("Requesting flight data...")
-        flights = api_fetcher.fetch_flights_data(fromDatetime, toDatetime)
-        logger.debug("Fetched flight data successfully.")
-    except Exception as err:
-        logger.error(f"Error: {err}")
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+
+
+def get_reference_cache() -> ReferenceCache:
+    """
+    Returns the process wide cache used for airline and destination lookups.
+    """
+    global _reference_cache
+    with _reference_lock:
+        if _reference_cache is None:
+            _reference_cache = ReferenceCache()
+        return _reference_cache
 
-    return [flights, toDatetime + "_" + fromDatetime]
+
+def _get_reference_fetcher() -> SchipholDataFetcher:
+    global _reference_fetcher
+    with _reference_lock:
+        if _reference_fetcher is None:
+            _reference_fetcher = SchipholDataFetcher()
+        return _reference_fetcher
 
 
 def fetch_airline(airline: str) -> dict:
     """
     Exposed function that returns airline's information.
     """
-    api_fetcher = SchipholDataFetcher()
+    api_fetcher = _get_reference_fetcher()
     try:
         logger.debug("Requesting airline info...")
-        airline = api_fetcher.fetch_airlines_data(airline)
+        airline = get_reference_cache().get_or_fetch(
+            "airline", airline, api_fetcher.fetch_airlines_data
+        )
         logger.debug("Fetched airline info successfully.")
-
     except Exception as err:
+        # Failed lookups keep the code in the reports
         logger.error(f"Error: {err}")
+        airline = None
 
     return airline
 
@@ -125,12 +686,16 @@ def fetch_destination(iata: str) -> dict:
     """
     Exposed function that returns destination's information.
     """
-    api_fetcher = SchipholDataFetcher()
+    api_fetcher = _get_reference_fetcher()
     try:
         logger.debug("Requesting destination info...")
-        destination = api_fetcher.fetch_destinations_data(iata)
+        destination = get_reference_cache().get_or_fetch(
+            "destination", iata, api_fetcher.fetch_destinations_data
+        )
         logger.debug("Fetched destination info successfully.")
     except Exception as err:
+        # Failed lookups keep the code in the reports
         logger.error(f"Error: {err}")
+        destination = None
 
     return destination
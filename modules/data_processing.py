@@ -1,7 +1,16 @@
+import numpy as np
 import pandas as pd
 from collections import Counter
+from operator import attrgetter, itemgetter
 
-from data_fetching import fetch_airline, fetch_destination
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # the belts then stay as Python lists
+    pa = None
+
+from modules.flight_records import MISSING, project_flights
+from modules.reference_resolver import join_airline_names, join_destination_cities
 from config.config import SCHEMA_VERSION
 from config.logging_config import logger
 
@@ -24,6 +33,11 @@ def cleanup_flight_data(flight_data: list) -> tuple[list, list]:
         processed_flight = {
             # General
             "flight_name": flight["flightName"],
+            "scheduleDateTime": (
+                flight["scheduleDateTime"]
+                if "scheduleDateTime" in flight.keys()
+                else ""
+            ),
             "terminal": flight["terminal"] if "terminal" in flight.keys() else "",
             # Keep the most recent entry only
             "publicFlightState": flight["publicFlightState"]["flightStates"][0],
@@ -93,6 +107,38 @@ def cleanup_flight_data(flight_data: list) -> tuple[list, list]:
     return arrivals_cleaned, departures_cleaned
 
 
+# Columns of the destination counts, one row per destination and direction ("A"
+# arrivals, "D" departures, as flightDirection in the API)
+DESTINATION_COLUMNS = ["destination", "direction", "flights"]
+
+
+def destination_frame(counts: pd.Series, direction: str) -> pd.DataFrame:
+    """
+    Function that turns the flight counts of the destinations in <counts> (indexed
+    by IATA code) into the long destination frame of <direction>.
+    """
+    return pd.DataFrame(
+        {
+            "destination": pd.array(counts.index, dtype="str"),
+            "direction": pd.array([direction] * len(counts), dtype="str"),
+            "flights": counts.to_numpy(dtype="int64"),
+        },
+        columns=DESTINATION_COLUMNS,
+    )
+
+
+def destination_rows(
+    df_destinations_arr: pd.DataFrame, df_destinations_dep: pd.DataFrame, window: str
+) -> pd.DataFrame:
+    """
+    Function that returns the destination counts of both directions as the rows of
+    the DESTINATIONS table, keyed by the <window> they were counted in.
+    """
+    df = pd.concat([df_destinations_arr, df_destinations_dep], ignore_index=True)
+    df.insert(0, "window", pd.array([window] * len(df), dtype="str"))
+    return df
+
+
 def analyse_arrivals(arrivals: list) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Function to parse arrival data.
@@ -105,6 +151,7 @@ def analyse_arrivals(arrivals: list) -> tuple[pd.DataFrame, pd.DataFrame]:
 
         row = {
             "flight_name": flight.get("flight_name"),
+            "scheduleDateTime": flight.get("scheduleDateTime"),
             "airline": flight.get("flight_company_prefix"),
             "terminal": flight.get("terminal"),
             "state": flight.get("publicFlightState"),
@@ -129,6 +176,7 @@ def analyse_arrivals(arrivals: list) -> tuple[pd.DataFrame, pd.DataFrame]:
         arrival_data,
         columns=[
             "flight_name",
+            "scheduleDateTime",
             "airline",
             "terminal",
             "state",
@@ -138,7 +186,9 @@ def analyse_arrivals(arrivals: list) -> tuple[pd.DataFrame, pd.DataFrame]:
             "baggageClaimBelts",
         ],
     )
-    df_destination_data = pd.DataFrame([destination_data])
+    df_destination_data = destination_frame(
+        pd.Series(destination_data, dtype="int64"), "A"
+    )
 
     return df_arrival_data, df_destination_data
 
@@ -155,6 +205,7 @@ def analyse_departures(departures: list) -> tuple[pd.DataFrame, pd.DataFrame]:
 
         row = {
             "flight_name": flight.get("flight_name"),
+            "scheduleDateTime": flight.get("scheduleDateTime"),
             "airline": flight.get("flight_company_prefix"),
             "terminal": flight.get("terminal"),
             "state": flight.get("publicFlightState"),
@@ -181,6 +232,7 @@ def analyse_departures(departures: list) -> tuple[pd.DataFrame, pd.DataFrame]:
         departure_data,
         columns=[
             "flight_name",
+            "scheduleDateTime",
             "airline",
             "terminal",
             "state",
@@ -191,65 +243,441 @@ def analyse_departures(departures: list) -> tuple[pd.DataFrame, pd.DataFrame]:
             "actualOffBlockTime",
         ],
     )
-    df_destination_data = pd.DataFrame([destination_data])
+    df_destination_data = destination_frame(
+        pd.Series(destination_data, dtype="int64"), "D"
+    )
 
     return df_departure_data, df_destination_data
 
 
+# Output columns of the arrivals/departures frames and the raw field behind each
+# of them. Missing fields become "" and mark the row as incomplete.
+ARRIVAL_FIELDS = {
+    "flight_name": "flightName",
+    "scheduleDateTime": "scheduleDateTime",
+    "airline": "prefixICAO",
+    "terminal": "terminal",
+    "state": "publicFlightState",
+    "estimatedLandingTime": "estimatedLandingTime",
+    "actualLandingTime": "actualLandingTime",
+    "expectedTimeOnBelt": "expectedTimeOnBelt",
+    "baggageClaimBelts": "baggageClaim",
+}
+DEPARTURE_FIELDS = {
+    "flight_name": "flightName",
+    "scheduleDateTime": "scheduleDateTime",
+    "airline": "prefixICAO",
+    "terminal": "terminal",
+    "state": "publicFlightState",
+    "gate": "gate",
+    "expectedTimeGateOpen": "expectedTimeGateOpen",
+    "expectedTimeBoarding": "expectedTimeBoarding",
+    "expectedTimeGateClosing": "expectedTimeGateClosing",
+    "actualOffBlockTime": "actualOffBlockTime",
+}
+
+
+def build_flight_frames(
+    flight_data: list,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Columnar equivalent of cleanup_flight_data followed by analyse_arrivals and
+    analyse_departures. Goes from the raw API flights straight to the arrivals,
+    arrival destinations, departures and departure destinations frames, with the
+    completeness filtering and destination counting done on whole columns.
+    """
+    # Compact records (possibly mixed with raw dicts) are read by attribute
+    records = not all(isinstance(flight, dict) for flight in flight_data)
+    if records:
+        flight_data = project_flights(flight_data)
+    getter = attrgetter if records else itemgetter
+
+    versions = set(map(getter("schemaVersion"), flight_data))
+    versions.discard(SCHEMA_VERSION)
+    if versions:
+        raise Exception(
+            "Schema version of the API has changed from "
+            + str(SCHEMA_VERSION)
+            + " to "
+            + str(versions.pop())
+        )
+
+    directions = list(map(getter("flightDirection"), flight_data))
+    arrivals = [f for f, direction in zip(flight_data, directions) if direction == "A"]
+    departures = [
+        f for f, direction in zip(flight_data, directions) if direction != "A"
+    ]
+
+    df_arrival_data, df_arrival_destinations = _build_direction_frames(
+        arrivals, ARRIVAL_FIELDS, "A", records
+    )
+    df_departure_data, df_departure_destinations = _build_direction_frames(
+        departures, DEPARTURE_FIELDS, "D", records
+    )
+    return (
+        df_arrival_data,
+        df_arrival_destinations,
+        df_departure_data,
+        df_departure_destinations,
+    )
+
+
+def _extract_column(flights: list, field: str, records: bool = False) -> list:
+    if records:
+        return _extract_record_column(flights, field)
+    if field == "publicFlightState":
+        # Keep the most recent entry only
+        return [flight[field]["flightStates"][0] for flight in flights]
+    if field == "baggageClaim":
+        # A null claim has no belts either
+        return [
+            flight[field]["belts"] if flight.get(field) is not None else ""
+            for flight in flights
+        ]
+    if field == "flightName":
+        return [flight[field] for flight in flights]
+    return [flight.get(field, "") for flight in flights]
+
+
+def _extract_record_column(flights: list, field: str) -> list:
+    values = list(map(attrgetter(field), flights))
+    if field == "publicFlightState":
+        return [value["flightStates"][0] for value in values]
+    if field == "baggageClaim":
+        return [
+            "" if value is MISSING or value is None else value["belts"]
+            for value in values
+        ]
+    if field == "flightName":
+        return values
+    # Like dict.get(field, ""), nulls are kept
+    return ["" if value is MISSING else value for value in values]
+
+
+def _build_direction_frames(
+    flights: list, fields: dict, direction: str, records: bool = False
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    if not flights:
+        return pd.DataFrame([], columns=list(fields)), destination_frame(
+            pd.Series([], dtype="int64"), direction
+        )
+
+    columns = {
+        column: _extract_column(flights, field, records)
+        for column, field in fields.items()
+    }
+    df = pd.DataFrame(columns, columns=list(fields))
+
+    # Drop incomplete rows, list valued columns are compared element by element
+    complete = pd.Series(True, index=df.index)
+    for column in fields:
+        if column == "baggageClaimBelts":
+            complete &= pd.Series(
+                [belts != "" for belts in columns[column]], index=df.index, dtype=bool
+            )
+        else:
+            complete &= df[column].ne("")
+    # Infer the dtypes again, as if the frame was built from complete rows only
+    df = df[complete].reset_index(drop=True).infer_objects()
+
+    routes = pd.Series(
+        [
+            route["destinations"]
+            for route in map((attrgetter if records else itemgetter)("route"), flights)
+        ],
+        dtype=object,
+    )
+    destinations = routes[complete.values].explode().dropna()
+    # Rows in order of first appearance, like the row by row counting
+    counts = destinations.value_counts(sort=False).reindex(pd.unique(destinations))
+    df_destination_data = destination_frame(counts, direction)
+
+    return df, df_destination_data
+
+
+# Low cardinality code columns and timestamp columns of the flight frames
+CATEGORY_COLUMNS = ["airline", "terminal", "state", "gate"]
+TIMESTAMP_COLUMNS = [
+    "scheduleDateTime",
+    "estimatedLandingTime",
+    "actualLandingTime",
+    "expectedTimeOnBelt",
+    "expectedTimeGateOpen",
+    "expectedTimeBoarding",
+    "expectedTimeGateClosing",
+    "actualOffBlockTime",
+]
+
+
+def optimize_flight_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Function that returns a compact copy of an arrivals/departures frame: code
+    columns become categorical, timestamps are parsed to datetime64 (UTC) and the
+    baggage belts become an Arrow list<int16> column (when pyarrow is installed).
+    """
+    df = df.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    for column in TIMESTAMP_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(
+                df[column], utc=True, format="ISO8601", errors="coerce"
+            )
+    if "baggageClaimBelts" in df and pa is not None:
+        df["baggageClaimBelts"] = _belts_to_arrow(df["baggageClaimBelts"])
+    return df
+
+
+def _belts_to_arrow(belts: pd.Series) -> pd.Series:
+    try:
+        array = pa.array(
+            [[int(belt) for belt in row] for row in belts], type=pa.list_(pa.int16())
+        )
+    except (ValueError, TypeError, OverflowError):
+        # Non numeric belt ids are kept as strings
+        array = pa.array(belts.tolist(), type=pa.list_(pa.string()))
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=belts.index)
+
+
+def to_storage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Function that turns Arrow list columns back into Python lists, the form the
+    database drivers can adapt.
+    """
+    list_columns = [
+        column
+        for column, dtype in df.dtypes.items()
+        if isinstance(dtype, pd.ArrowDtype) and pa.types.is_list(dtype.pyarrow_dtype)
+    ]
+    if not list_columns:
+        return df
+    df = df.copy()
+    for column in list_columns:
+        df[column] = pd.Series(
+            pa.array(df[column].array).to_pylist(), index=df.index, dtype=object
+        )
+    return df
+
+
+def _value_counts(series: pd.Series) -> pd.Series:
+    # Categorical columns also count their unobserved categories, drop them
+    counts = series.value_counts()
+    return counts[counts > 0]
+
+
+# Dimensions counted together by aggregate_flight_frame
+AGGREGATE_COLUMNS = ["state", "airline", "terminal", "gate"]
+# Largest state x airline x terminal x gate table counted with one bincount
+DENSE_AGGREGATE_CELLS = 10_000_000
+
+
+def _sorted_counts(counts: pd.Series) -> pd.Series:
+    # Most frequent first, ties keep their order in the index
+    counts = counts[counts > 0].astype("int64")
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def _belt_counts(belts: pd.Series) -> pd.Series:
+    if isinstance(belts.dtype, pd.ArrowDtype):
+        # Arrow list column: count the flattened values without building an index
+        counts = pc.value_counts(pc.list_flatten(pa.array(belts.array)))
+        return _sorted_counts(
+            pd.Series(
+                counts.field("counts").to_numpy(),
+                index=pd.Index(counts.field("values").to_pylist()),
+            )
+        )
+    counts = Counter(belt for row in belts.tolist() for belt in row)
+    return _sorted_counts(pd.Series(counts, dtype="int64"))
+
+
+def _codes(series: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    if isinstance(series.dtype, pd.CategoricalDtype) and not series.hasnans:
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return codes, pd.Index(uniques)
+
+
+class _Combinations:
+    """
+    Occurrences of every combination of values of <columns> in <df>, counted in
+    one pass. Small combination spaces are counted with a single bincount over the
+    value codes, larger ones with a groupby.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: list):
+        self.columns = columns
+        codes, levels = zip(*(_codes(df[column]) for column in columns))
+        self.levels = dict(zip(columns, levels))
+        shape = tuple(len(level) for level in levels)
+        size = int(np.prod(shape, dtype="int64"))
+        if 0 < size <= DENSE_AGGREGATE_CELLS:
+            key = np.ravel_multi_index(codes, shape)
+            self.dense = np.bincount(key, minlength=size).reshape(shape)
+        else:
+            self.dense = None
+            self.sparse = df.groupby(
+                columns, observed=True, sort=False, dropna=False
+            ).size()
+
+    def total(self, *columns) -> pd.Series:
+        """
+        Counts per value of <columns>, most frequent first.
+        """
+        if self.dense is None:
+            counts = self.sparse.groupby(
+                level=list(columns), observed=True, sort=False
+            ).sum()
+            return _sorted_counts(counts)
+
+        summed_axes = tuple(
+            axis for axis, column in enumerate(self.columns) if column not in columns
+        )
+        counts = self.dense.sum(axis=summed_axes)
+        if len(columns) == 1:
+            index = self.levels[columns[0]]
+        else:
+            index = pd.MultiIndex.from_product(
+                [self.levels[column] for column in columns], names=list(columns)
+            )
+        return _sorted_counts(pd.Series(counts.ravel(), index=index))
+
+
+def aggregate_flight_frame(df: pd.DataFrame) -> dict:
+    """
+    Function that counts the flights of <df> for every dimension the reports use
+    in a single pass: every state, airline, terminal and gate combination is
+    counted at once, and the (state, airline), airline, terminal and gate tables
+    are summed from these counts. The baggage belts are counted next to them.
+    Every table is sorted by decreasing count, so the report builders only take
+    their top entries.
+    """
+    columns = [column for column in AGGREGATE_COLUMNS if column in df.columns]
+    combinations = _Combinations(df, columns)
+
+    airlines = combinations.total("airline")
+    aggregates = {
+        "states": combinations.total("state", "airline"),
+        "airlines": airlines[airlines.index != ""],
+        "terminals": combinations.total("terminal"),
+    }
+    if "gate" in columns:
+        aggregates["gates"] = combinations.total("gate")
+    if "baggageClaimBelts" in df.columns:
+        aggregates["belts"] = _belt_counts(df["baggageClaimBelts"])
+    return aggregates
+
+
+def _top_counts(counts: pd.Series, column: str, top_n: int) -> pd.DataFrame:
+    counts = counts.head(top_n)
+    return pd.DataFrame({column: counts.index, "count": counts.values})
+
+
+def top_state_counts(
+    df: pd.DataFrame,
+    col_name: str,
+    filter_value: str,
+    group_by_col: str,
+    top_n: int,
+    aggregates: dict = None,
+) -> pd.DataFrame:
+    """
+    Function that returns the <top_n> codes of column <group_by_col> with the most
+    occurrences in the dataframe <df>, when the value of column <col_name> is
+    <filter_value>. The state/airline counts are taken from the precomputed
+    <aggregates> of <df> when given.
+    """
+    if aggregates is not None and (col_name, group_by_col) == ("state", "airline"):
+        states = aggregates["states"]
+        counts = states[states.index.get_level_values(0) == filter_value]
+        return _top_counts(counts.droplevel(0), group_by_col, top_n)
+
+    filtered_df = df[df[col_name] == filter_value]
+
+    airline_counts = _value_counts(filtered_df[group_by_col]).reset_index()
+    airline_counts.columns = [group_by_col, "count"]
+
+    return airline_counts.nlargest(top_n, "count")
+
+
 def filter_dataframe(
-    df: pd.DataFrame, col_name: str, filter_value: str, group_by_col: str, top_n: int
+    df: pd.DataFrame,
+    col_name: str,
+    filter_value: str,
+    group_by_col: str,
+    top_n: int,
+    lookup: dict = None,
+    aggregates: dict = None,
 ) -> pd.DataFrame:
     """
     Function that returns the <top_n> entries of column <group_by_col> with the
     most occurrences in the dataframe <df> , when the value of column <col_name> is
-    <filter_value>.
+    <filter_value>. Airline names are joined from the reference <lookup> table.
     """
     if df.empty:
         logger.warning("Dataframe provided is empty. No analysis provided.")
         return df
 
-    filtered_df = df[df[col_name] == filter_value]
+    top_airlines = top_state_counts(
+        df, col_name, filter_value, group_by_col, top_n, aggregates
+    )
 
-    airline_counts = filtered_df[group_by_col].value_counts().reset_index()
-    airline_counts.columns = [group_by_col, "count"]
+    top_airlines[group_by_col] = join_airline_names(top_airlines[group_by_col], lookup)
+    return top_airlines
 
-    top_airlines = airline_counts.nlargest(top_n, "count")
 
-    top_airlines[group_by_col] = top_airlines[group_by_col].map(
-        lambda x: fetch_airline(x)["publicName"]
+def top_destination_counts(df: pd.DataFrame, top_n: int) -> pd.DataFrame:
+    """
+    Function that returns the <top_n> most popular destination codes in the
+    destination frame <df> with the number of flights. The rows are selected with
+    a partial sort (nlargest), ties go to the destination seen first.
+    """
+    # Selected on the bare counts, by position
+    top = pd.Series(df["flights"].to_numpy()).nlargest(top_n, keep="first")
+    return pd.DataFrame(
+        {
+            "destination": df["destination"].to_numpy()[top.index.to_numpy()],
+            "flights": top.to_numpy(),
+        }
     )
-    return top_airlines
 
 
-def find_most_popular_destinations(df: pd.DataFrame, top_n: int) -> pd.DataFrame:
+def find_most_popular_destinations(
+    df: pd.DataFrame, top_n: int, lookup: dict = None
+) -> pd.DataFrame:
     """
     Function that returns the <top_n> most popular destination cities in dataframe
-    <df>, indicating the city name and the number of flights.
+    <df>, indicating the city name and the number of flights. City names are joined
+    from the reference <lookup> table.
     """
     if df.empty:
         logger.warning("Dataframe provided is empty. No analysis provided.")
         return df
 
-    top_values = df.iloc[0].nlargest(top_n)
-    top_columns = top_values.index.tolist()
-    top_values = top_values.values.tolist()
+    top_dest_df = top_destination_counts(df, top_n)
 
-    # Create a new DataFrame with columns ["col_name", "value"]
-    top_dest_df = pd.DataFrame({"destination": top_columns, "flights": top_values})
-
-    top_dest_df["destination"] = top_dest_df["destination"].map(
-        lambda x: fetch_destination(x)["city"]
+    top_dest_df["destination"] = join_destination_cities(
+        top_dest_df["destination"], lookup
     )
 
     return top_dest_df
 
 
 def find_busiest_facilities(
-    df_arrivals: pd.DataFrame, df_departures: pd.DataFrame, top_n: int, window: str
+    df_arrivals: pd.DataFrame,
+    df_departures: pd.DataFrame,
+    top_n: int,
+    window: str,
+    lookup: dict = None,
+    arrival_aggregates: dict = None,
+    departure_aggregates: dict = None,
 ) -> dict:
     """
     A function that returns a dictionary with different information about the
     top <top_n> busiest airport facilities and most popular airlines during the <window>.
+    The counts come from the aggregate_flight_frame tables of the two frames,
+    computed here when they are not given.
     """
     top_baggage_belts_df = pd.DataFrame(columns=["window", "beltID", "count"])
     top_gates_df = pd.DataFrame(columns=["window", "gate", "count"])
@@ -257,32 +685,41 @@ def find_busiest_facilities(
     busiest_dep_terminals_df = pd.DataFrame(columns=["window", "terminal", "count"])
     combined_counts_df = pd.DataFrame(columns=["window", "airline", "count"])
 
+    if arrival_aggregates is None:
+        arrival_aggregates = aggregate_flight_frame(df_arrivals)
+    if departure_aggregates is None:
+        departure_aggregates = aggregate_flight_frame(df_departures)
+
     if not df_arrivals.empty:
-        top_baggage_belts_df = _find_busy_baggage_belts(df_arrivals, top_n)
+        top_baggage_belts_df = _top_counts(arrival_aggregates["belts"], "beltID", top_n)
         top_baggage_belts_df.loc[:, "window"] = window
 
         # Select top N busy arrivals' terminals
-        terminal_counts = df_arrivals["terminal"].value_counts().reset_index()
-        terminal_counts.columns = ["terminal", "count"]
-        busiest_arr_terminals_df = terminal_counts.head(top_n).copy()
+        busiest_arr_terminals_df = _top_counts(
+            arrival_aggregates["terminals"], "terminal", top_n
+        )
         busiest_arr_terminals_df.loc[:, "window"] = window
 
     if not df_departures.empty:
         # Gates
-        gate_counts = df_departures["gate"].value_counts()
-        top_gates_df = pd.DataFrame(
-            list(gate_counts.head(top_n).items()), columns=["gate", "count"]
-        )
+        top_gates_df = _top_counts(departure_aggregates["gates"], "gate", top_n)
         top_gates_df.loc[:, "window"] = window
 
         # Select top N busy departures' terminals
-        terminal_counts = df_arrivals["terminal"].value_counts().reset_index()
-        terminal_counts.columns = ["terminal", "count"]
-        busiest_dep_terminals_df = terminal_counts.head(top_n).copy()
+        busiest_dep_terminals_df = _top_counts(
+            departure_aggregates["terminals"], "terminal", top_n
+        )
         busiest_dep_terminals_df.loc[:, "window"] = window
 
     if not df_arrivals.empty or not df_departures.empty:
-        combined_counts_df = _find_busy_airlines(df_arrivals, df_departures, top_n)
+        combined_counts_df = _find_busy_airlines(
+            df_arrivals,
+            df_departures,
+            top_n,
+            lookup,
+            arrival_aggregates,
+            departure_aggregates,
+        )
         combined_counts_df.loc[:, "window"] = window
     return {
         "busy_belts": top_baggage_belts_df,
@@ -293,37 +730,48 @@ def find_busiest_facilities(
     }
 
 
-def _find_busy_baggage_belts(df, top_n):
-    # Baggage belts
-    baggage_claim_lists = df["baggageClaimBelts"].tolist()
-    all_baggage_claims = [item for sublist in baggage_claim_lists for item in sublist]
-    baggage_claim_counts = Counter(all_baggage_claims)
-    return pd.DataFrame(
-        baggage_claim_counts.most_common(top_n), columns=["beltID", "count"]
-    )
-
-
-def _find_busy_airlines(df_arrivals, df_departures, top_n):
-    # Airlines & drop empty lines
-
-    arrivals_counts = df_arrivals[df_arrivals["airline"] != ""][
-        "airline"
-    ].value_counts()
-    departures_counts = df_departures[df_departures["airline"] != ""][
-        "airline"
-    ].value_counts()
+def top_airline_counts(
+    df_arrivals,
+    df_departures,
+    top_n,
+    arrival_aggregates=None,
+    departure_aggregates=None,
+):
+    """
+    Function that returns the <top_n> airline codes with the most arrivals and
+    departures combined.
+    """
+    if arrival_aggregates is None:
+        arrival_aggregates = aggregate_flight_frame(df_arrivals)
+    if departure_aggregates is None:
+        departure_aggregates = aggregate_flight_frame(df_departures)
 
     # Create a DataFrame to aggregate both counts
     combined_counts_df = pd.DataFrame(
         {
-            "count": arrivals_counts.add(
-                departures_counts, fill_value=0
-            )  # Add counts, fill NaN with 0
+            "count": arrival_aggregates["airlines"]
+            .add(departure_aggregates["airlines"], fill_value=0)
+            .astype("int64")
         }
     )
-    combined_counts_df = combined_counts_df.sort_values(by="count", ascending=False)
-    combined_counts_df = combined_counts_df.head(top_n)
-    combined_counts_df["airline"] = combined_counts_df.index.map(
-        lambda x: fetch_airline(x)["publicName"]
+    combined_counts_df = combined_counts_df.sort_values(
+        by="count", ascending=False, kind="stable"
+    )
+    return combined_counts_df.head(top_n)
+
+
+def _find_busy_airlines(
+    df_arrivals,
+    df_departures,
+    top_n,
+    lookup=None,
+    arrival_aggregates=None,
+    departure_aggregates=None,
+):
+    combined_counts_df = top_airline_counts(
+        df_arrivals, df_departures, top_n, arrival_aggregates, departure_aggregates
     )
+    combined_counts_df["airline"] = join_airline_names(
+        combined_counts_df.index.to_series(), lookup
+    ).values
     return combined_counts_df.reset_index(drop=True)
@@ -1,36 +1,228 @@
-from sqlalchemy import create_engine, text
-from config.config import DB_URI
+import os
+import threading
+import weakref
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    SmallInteger,
+    String,
+    Table,
+    Text,
+    create_engine,
+    inspect,
+    text,
+)
+from config.config import DB_POOL_SIZE, DB_URI
 from config.logging_config import logger
 
+# Natural key of the flight tables and the column they are partitioned by
+FLIGHT_KEY_COLUMNS = ("flight_name", "scheduleDateTime")
+FLIGHT_PARTITION_COLUMN = "scheduleDateTime"
+# Natural key of the destination counts, one row per window, direction and city
+DESTINATION_KEY_COLUMNS = ("window", "direction", "destination")
+# (key columns, partition column) of the tables loaded by upsert
+UPSERT_KEYS = {
+    "ARRIVALS": (FLIGHT_KEY_COLUMNS, FLIGHT_PARTITION_COLUMN),
+    "DEPARTURES": (FLIGHT_KEY_COLUMNS, FLIGHT_PARTITION_COLUMN),
+    "DESTINATIONS": (DESTINATION_KEY_COLUMNS, None),
+}
+
+# Wide destination tables of the previous versions, replaced by DESTINATIONS
+LEGACY_TABLES = ("DESTINATIONS_ARRIVALS", "DESTINATIONS_DEPARTURES")
+
+# Key of the PostgreSQL advisory lock that serializes the schema setup of
+# processes starting together (backfill workers)
+SCHEMA_LOCK_KEY = 7_105_031
+
+# Same flight tables as sql/create_tables.sql, for databases other than PostgreSQL
+# (no partitioning, belts are stored as their "{1,2}" text)
+metadata = MetaData()
+Table(
+    "ARRIVALS",
+    metadata,
+    Column("flight_name", String(16), primary_key=True),
+    Column("scheduleDateTime", DateTime(timezone=True), primary_key=True),
+    Column("airline", String(8)),
+    Column("terminal", SmallInteger),
+    Column("state", String(8)),
+    Column("estimatedLandingTime", DateTime(timezone=True)),
+    Column("actualLandingTime", DateTime(timezone=True)),
+    Column("expectedTimeOnBelt", DateTime(timezone=True)),
+    Column("baggageClaimBelts", Text),
+    Index("ARRIVALS_airline_idx", "airline"),
+    Index("ARRIVALS_state_idx", "state"),
+    Index("ARRIVALS_terminal_idx", "terminal"),
+    Index("ARRIVALS_schedule_idx", "scheduleDateTime"),
+)
+Table(
+    "DEPARTURES",
+    metadata,
+    Column("flight_name", String(16), primary_key=True),
+    Column("scheduleDateTime", DateTime(timezone=True), primary_key=True),
+    Column("airline", String(8)),
+    Column("terminal", SmallInteger),
+    Column("state", String(8)),
+    Column("gate", String(8)),
+    Column("expectedTimeGateOpen", DateTime(timezone=True)),
+    Column("expectedTimeBoarding", DateTime(timezone=True)),
+    Column("expectedTimeGateClosing", DateTime(timezone=True)),
+    Column("actualOffBlockTime", DateTime(timezone=True)),
+    Index("DEPARTURES_airline_idx", "airline"),
+    Index("DEPARTURES_state_idx", "state"),
+    Index("DEPARTURES_terminal_idx", "terminal"),
+    Index("DEPARTURES_gate_idx", "gate"),
+    Index("DEPARTURES_schedule_idx", "scheduleDateTime"),
+)
+Table(
+    "DESTINATIONS",
+    metadata,
+    Column("window", String(40), primary_key=True),
+    Column("direction", String(1), primary_key=True),
+    Column("destination", String(8), primary_key=True),
+    Column("flights", Integer, nullable=False),
+    Index("DESTINATIONS_top_idx", "window", "direction", "flights"),
+)
+# Rolling analytics (rolling_analytics.py): flights per scheduled hour and value of
+# a dimension, and their sums over the rolling spans read by the dashboards
+Table(
+    "ROLLING_HOURLY_COUNTS",
+    metadata,
+    Column("hour", DateTime(timezone=True), primary_key=True),
+    Column("dimension", String(24), primary_key=True),
+    Column("value", String(16), primary_key=True),
+    Column("flights", Integer, nullable=False),
+    Column("delayed", Integer, nullable=False),
+    Column("canceled", Integer, nullable=False),
+)
+Table(
+    "ROLLING_ANALYTICS",
+    metadata,
+    Column("span", String(8), primary_key=True),
+    Column("dimension", String(24), primary_key=True),
+    Column("value", String(16), primary_key=True),
+    Column("flights", Integer, nullable=False),
+    Column("delayed", Integer, nullable=False),
+    Column("canceled", Integer, nullable=False),
+    Column("delay_rate", Float, nullable=False),
+    Column("cancel_rate", Float, nullable=False),
+    Column("window_end", DateTime(timezone=True), nullable=False),
+)
+
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+# Engines whose tables have been set up by this process
+_schema_ready = weakref.WeakSet()
+
 
 def get_engine():
-    return create_engine(DB_URI)
+    """
+    Function that returns the pooled engine shared by the whole process, created
+    on first use. A forked process (e.g. a backfill worker) creates its own and
+    leaves the connections of its parent alone.
+    """
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is not None and _engine_pid != os.getpid():
+            _engine.dispose(close=False)
+            _engine = None
+        if _engine is None:
+            _engine = create_engine(DB_URI, pool_size=DB_POOL_SIZE, pool_pre_ping=True)
+            _engine_pid = os.getpid()
+        return _engine
+
+
+def dispose_engine(engine=None):
+    """
+    Function that closes the pooled connections of <engine> (the engine of the
+    process by default). The next get_engine() creates a new one.
+    """
+    global _engine
+    with _engine_lock:
+        engine = engine or _engine
+        if engine is None:
+            return
+        engine.dispose()
+        if engine is _engine:
+            _engine = None
 
 
 def execute_sql_script(engine, script_path):
     """
-    Method to execute a *.sql script.
+    Method to execute a *.sql script in one transaction. On PostgreSQL the whole
+    script is sent in one round trip.
+    """
+    with open(script_path, "r") as file:
+        script = file.read()
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.exec_driver_sql(
+                f"SELECT pg_advisory_xact_lock({SCHEMA_LOCK_KEY})"
+            )
+            connection.exec_driver_sql(script)
+            return
+        for statement in script.split(";"):
+            if statement.strip():  # Ensure statement is not empty
+                connection.execute(text(statement))
+
+
+def migrate_legacy_tables(engine):
+    """
+    Method that moves the tables of the previous versions out of the way of the
+    keyed ones. ARRIVALS and DEPARTURES written by DataFrame.to_sql (no key) are
+    renamed to <table>_legacy, so their rows are kept, and the wide destination
+    tables are dropped, they only held the last window.
     """
-    with engine.connect() as connection:
-        with open(script_path, "r") as file:
-            script = file.read()
-            statements = script.split(
-                ";"
-            )  # Split the script into individual statements
-            for statement in statements:
-                if statement.strip():  # Ensure statement is not empty
-                    connection.execute(text(statement))
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.exec_driver_sql(
+                f"SELECT pg_advisory_xact_lock({SCHEMA_LOCK_KEY})"
+            )
+        inspector = inspect(connection)
+        quote = engine.dialect.identifier_preparer.quote
+        for table_name in inspector.get_table_names():
+            # The baseline script created them unquoted, so in lower case
+            if table_name.upper() in LEGACY_TABLES:
+                logger.warning(f"Dropping the legacy table {table_name}.")
+                connection.execute(text(f"DROP TABLE {quote(table_name)}"))
+        for table_name in ("ARRIVALS", "DEPARTURES"):
+            if not inspector.has_table(table_name):
+                continue
+            keys = inspector.get_pk_constraint(table_name)["constrained_columns"]
+            if tuple(keys) == FLIGHT_KEY_COLUMNS:
+                continue
+            legacy_name = f"{table_name}_legacy"
+            logger.warning(
+                f"{table_name} has the layout of a previous version, renaming it "
+                f"to {legacy_name}."
+            )
+            connection.execute(
+                text(f"ALTER TABLE {quote(table_name)} RENAME TO {quote(legacy_name)}")
+            )
 
 
-def create_tables():
+def create_tables(engine=None):
     """
-    Method to create the required tables.
+    Method to create the required tables, once per engine. With the engine of the
+    process they are set up once per process.
     """
     try:
-        engine = get_engine()
+        engine = engine or get_engine()
+        if engine in _schema_ready:
+            return
         # Generate the required tables in the database
         logger.info("Create required tables in the database.")
-        execute_sql_script(engine, "sql/create_tables.sql")
+        migrate_legacy_tables(engine)
+        if engine.dialect.name == "postgresql":
+            execute_sql_script(engine, "sql/create_tables.sql")
+        else:
+            metadata.create_all(engine)
+        _schema_ready.add(engine)
     except Exception as exc:
         logger.error(str(exc))
         raise Exception(exc)
@@ -1,41 +1,72 @@
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
+import asyncio
+from contextlib import contextmanager
 import os
-from pathlib import Path
-import sys
-
-sys.path.append(str(Path.cwd()) + "/modules")
-sys.path.append(str(Path.cwd()) + "/config")
-
-from data_processing import (
-    cleanup_flight_data,
-    analyse_arrivals,
-    analyse_departures,
-    filter_dataframe,
-    find_most_popular_destinations,
-    find_busiest_facilities,
-)
+import time
+from typing import TYPE_CHECKING
 
-from data_fetching import fetch_flights_data
-from database_handler import create_tables
-from aws_handler import store_to_s3
+# pandas, SQLAlchemy, boto3 and aiohttp, and the modules built on them, are
+# imported by the methods that use them, so that a run of a single stage only
+# pays for the imports of that stage
+from modules.data_fetching import (
+    fetch_flights_data,
+    fetch_flights_incremental,
+    fetch_flights_window,
+    get_reference_cache,
+    iter_flights_pages,
+    set_metrics,
+    set_response_cache,
+)
+from modules.metrics import RunMetrics
+from modules.incremental_state import IncrementalState
+from modules.response_cache import ResponseCache
+from modules.stage_files import (
+    RunCheckpoint,
+    load_processed,
+    load_raw_flights,
+    save_processed,
+    save_raw_flights,
+)
 
 from config.logging_config import logger
 from config.config import *
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class ETLController:
     """
     ETL controller class
     """
 
-    def __init__(self):
+    # Size of the airline, destination and facility reports
+    TOP_AIRLINES = 5
+    TOP_DESTINATIONS = 10
+    TOP_FACILITIES = 10
+
+    def __init__(
+        self, full_refresh: bool = False, replay: bool = False, keep_warm: bool = False
+    ):
         self.windowStr = ""
+        # A long running controller (daemon mode) keeps its database engine and
+        # async HTTP client between runs, until close()
+        self.keep_warm = keep_warm
+        self.engine = None
+        # Incremental runs only request the flights added since the last run
+        self.full_refresh = full_refresh
+        # Replayed runs read the API responses from the response cache only
+        self.replay = replay or RESPONSE_CACHE_REPLAY
+        self.incremental_state = IncrementalState() if INCREMENTAL_EXTRACTION else None
+        if self.replay and self.incremental_state is not None:
+            logger.info("Incremental extraction is ignored when replaying the cache.")
+            self.incremental_state = None
+        self.metrics = RunMetrics()
+        # (event loop, async fetcher) used by the runs, see _event_loop
+        self._async_client = None
 
-    def extract_data(self) -> list:
-        """
-        Data extraction method.
-        """
+    def _check_api_credentials(self):
+        if self.replay:
+            return
         # Check if ENV variables were provided
         if SCHIPHOL_API_APP_ID is None or SCHIPHOL_API_APP_KEY is None:
             errMsg = (
@@ -44,49 +75,138 @@ class ETLController:
             )
             logger.error(errMsg)
             raise Exception(errMsg)
+
+    def extract_data(self) -> list:
+        """
+        Data extraction method.
+        """
+        self._check_api_credentials()
         try:
-            flights, self.windowStr = fetch_flights_data()
+            if self._async_client is not None:
+                from modules import async_fetching
+
+                loop, api_fetcher = self._async_client
+                if self.incremental_state is not None:
+                    flights, self.windowStr = loop.run_until_complete(
+                        async_fetching.fetch_flights_incremental(
+                            api_fetcher,
+                            self.incremental_state,
+                            full_refresh=self.full_refresh,
+                        )
+                    )
+                else:
+                    flights, self.windowStr = loop.run_until_complete(
+                        async_fetching.fetch_flights_data(api_fetcher)
+                    )
+            elif self.incremental_state is not None:
+                flights, self.windowStr = fetch_flights_incremental(
+                    self.incremental_state, full_refresh=self.full_refresh
+                )
+            else:
+                flights, self.windowStr = fetch_flights_data()
         except Exception as exc:
             logger.error(f"Error fetching data {exc}")
-            return {}
+            raise Exception(f"Error fetching data {exc}")
 
         logger.info(f"Successfully fetched {len(flights)} raw data entries.")
+        self.metrics.add("flights", len(flights))
         return flights
 
     def process_data(self, raw_data: list) -> list:
         """
         Data processing method.
         """
-        arrivals, departures = cleanup_flight_data(raw_data)
-        df_arrivals, df_destinations_arr = analyse_arrivals(arrivals)
-        df_departures, df_destinations_dep = analyse_departures(departures)
+        from modules.data_processing import (
+            aggregate_flight_frame,
+            build_flight_frames,
+            filter_dataframe,
+            find_busiest_facilities,
+            find_most_popular_destinations,
+            optimize_flight_frame,
+        )
+
+        (
+            df_arrivals,
+            df_destinations_arr,
+            df_departures,
+            df_destinations_dep,
+        ) = build_flight_frames(raw_data)
+        df_arrivals = optimize_flight_frame(df_arrivals)
+        df_departures = optimize_flight_frame(df_departures)
+        self.metrics.add("rows", len(df_arrivals) + len(df_departures))
+        logger.debug(
+            "Flight frames memory: "
+            f"arrivals {df_arrivals.memory_usage(deep=True).sum()} bytes, "
+            f"departures {df_departures.memory_usage(deep=True).sum()} bytes."
+        )
 
         try:
+            # One counting pass per frame feeds all the reports below
+            arrival_aggregates = aggregate_flight_frame(df_arrivals)
+            departure_aggregates = aggregate_flight_frame(df_departures)
+            lookup = self.resolve_reference_data(
+                df_arrivals,
+                df_departures,
+                df_destinations_arr,
+                df_destinations_dep,
+                arrival_aggregates,
+                departure_aggregates,
+            )
             processing_results = {
                 "arrivals": {
                     "most_landed": filter_dataframe(
-                        df_arrivals, "state", "LND", "airline", 5
+                        df_arrivals,
+                        "state",
+                        "LND",
+                        "airline",
+                        self.TOP_AIRLINES,
+                        lookup,
+                        arrival_aggregates,
                     ),
                     "most_diverted": filter_dataframe(
-                        df_arrivals, "state", "DIV", "airline", 5
+                        df_arrivals,
+                        "state",
+                        "DIV",
+                        "airline",
+                        self.TOP_AIRLINES,
+                        lookup,
+                        arrival_aggregates,
                     ),
                     "most_popular_destinations": find_most_popular_destinations(
-                        df_destinations_arr, 10
+                        df_destinations_arr, self.TOP_DESTINATIONS, lookup
                     ),
                 },
                 "departures": {
                     "most_delayed": filter_dataframe(
-                        df_departures, "state", "DEL", "airline", 5
+                        df_departures,
+                        "state",
+                        "DEL",
+                        "airline",
+                        self.TOP_AIRLINES,
+                        lookup,
+                        departure_aggregates,
                     ),
                     "most_canceled": filter_dataframe(
-                        df_departures, "state", "CNX", "airline", 5
+                        df_departures,
+                        "state",
+                        "CNX",
+                        "airline",
+                        self.TOP_AIRLINES,
+                        lookup,
+                        departure_aggregates,
                     ),
                     "most_popular_destinations": find_most_popular_destinations(
-                        df_destinations_dep, 10
+                        df_destinations_dep, self.TOP_DESTINATIONS, lookup
                     ),
                 },
                 "facilities": find_busiest_facilities(
-                    df_arrivals, df_departures, 10, self.windowStr
+                    df_arrivals,
+                    df_departures,
+                    self.TOP_FACILITIES,
+                    self.windowStr,
+                    lookup,
+                    arrival_aggregates,
+                    departure_aggregates,
                 ),
             }
         except Exception as exc:
@@ -102,11 +222,80 @@ class ETLController:
             "reports": processing_results,
         }
 
-    def load_data(self, processed_data: list):
+    def resolve_reference_data(
+        self,
+        df_arrivals: "pd.DataFrame",
+        df_departures: "pd.DataFrame",
+        df_destinations_arr: "pd.DataFrame",
+        df_destinations_dep: "pd.DataFrame",
+        arrival_aggregates: dict = None,
+        departure_aggregates: dict = None,
+    ) -> dict:
         """
-        Store data in database
+        Collects the airline and destination codes needed by all the reports and
+        resolves them in one deduplicated batch.
         """
+        from modules.data_processing import (
+            aggregate_flight_frame,
+            top_airline_counts,
+            top_destination_counts,
+            top_state_counts,
+        )
+
+        if arrival_aggregates is None:
+            arrival_aggregates = aggregate_flight_frame(df_arrivals)
+        if departure_aggregates is None:
+            departure_aggregates = aggregate_flight_frame(df_departures)
 
+        airline_codes = set()
+        iata_codes = set()
+        for df, aggregates, states in (
+            (df_arrivals, arrival_aggregates, ("LND", "DIV")),
+            (df_departures, departure_aggregates, ("DEL", "CNX")),
+        ):
+            if df.empty:
+                continue
+            for state in states:
+                top = top_state_counts(
+                    df, "state", state, "airline", self.TOP_AIRLINES, aggregates
+                )
+                airline_codes.update(top["airline"])
+        if not df_arrivals.empty or not df_departures.empty:
+            top = top_airline_counts(
+                df_arrivals,
+                df_departures,
+                self.TOP_FACILITIES,
+                arrival_aggregates,
+                departure_aggregates,
+            )
+            airline_codes.update(top.index)
+        for df in (df_destinations_arr, df_destinations_dep):
+            if not df.empty:
+                top = top_destination_counts(df, self.TOP_DESTINATIONS)
+                iata_codes.update(top["destination"])
+
+        lookup = self._lookup(airline_codes, iata_codes)
+        self.metrics.add("reference_lookups", len(airline_codes) + len(iata_codes))
+        logger.info(
+            f"Resolved {len(airline_codes)} airlines and {len(iata_codes)} "
+            "destinations for the reports."
+        )
+        return lookup
+
+    def _lookup(self, airline_codes, iata_codes) -> dict:
+        from modules.reference_resolver import (
+            resolve_reference_data,
+            resolve_reference_data_async,
+        )
+
+        if self._async_client is not None:
+            loop, api_fetcher = self._async_client
+            return loop.run_until_complete(
+                resolve_reference_data_async(api_fetcher, airline_codes, iata_codes)
+            )
+        return resolve_reference_data(airline_codes, iata_codes)
+
+    def _prepare_database(self):
         if (
             DB_PREFIX is None
             or DB_IP_ADDRESS is None
@@ -121,57 +310,495 @@ class ETLController:
             logger.error(errMsg)
             raise Exception(errMsg)
 
-        # Ensure tables are created
-        self.engine = create_engine(DB_URI)
-        create_tables()
+        # One pooled engine per process, its tables are set up once
+        if self.engine is None:
+            from modules.database_handler import create_tables, get_engine
 
-        names_of_tables = [
-            "ARRIVALS",
-            "DESTINATIONS_ARRIVALS",
-            "DEPARTURES",
-            "DESTINATIONS_DEPARTURES",
-        ]
-        names_of_dfs = list(processed_data.keys())[:-1]  # all keys but the last
+            self.engine = get_engine()
+            create_tables(self.engine)
 
-        for table_name, key in zip(names_of_tables, names_of_dfs):
-            logger.info("Storing " + key + " in table " + table_name)
-            try:
-                processed_data[key].to_sql(
-                    table_name, self.engine, if_exists="replace", index=False
-                )
-                logger.info(key + " successfully written to database")
-            except SQLAlchemyError as e:
-                logger.error(f"Error occurred: {e}")
+    def _upsert_table(self, table_name: str, df: "pd.DataFrame"):
+        from sqlalchemy.exc import SQLAlchemyError
+        from modules.bulk_loader import bulk_upsert_frame
+        from modules.database_handler import UPSERT_KEYS
+
+        key_columns, partition_column = UPSERT_KEYS[table_name]
+        try:
+            stats = bulk_upsert_frame(
+                self.engine, table_name, df, key_columns, partition_column
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Error occurred: {e}")
+            return None
+        return stats
+
+    def _replace_table(self, table_name: str, df: "pd.DataFrame"):
+        from sqlalchemy.exc import SQLAlchemyError
+        from modules.bulk_loader import bulk_load_frame, insert_frame
+        from modules.database_handler import UPSERT_KEYS
+
+        _, partition_column = UPSERT_KEYS[table_name]
+        # Both methods keep the table and its schema, only the rows are replaced
+        load_frame = bulk_load_frame if DB_LOAD_METHOD == "copy" else insert_frame
+        try:
+            return load_frame(self.engine, table_name, df, partition_column)
+        except SQLAlchemyError as e:
+            logger.error(f"Error occurred: {e}")
+            return None
+
+    def _load_table(self, table_name: str, key: str, df: "pd.DataFrame"):
+        """
+        Method that stores the frame <df> in the table <table_name>, on a
+        connection of its own. Returns the number of rows and the load time, None
+        when the table could not be stored.
+        """
+        logger.info("Storing " + key + " in table " + table_name)
+        if DB_LOAD_MODE == "upsert":
+            return self._upsert_table(table_name, df)
+        return self._replace_table(table_name, df)
+
+    def load_data(self, processed_data: list) -> bool:
+        """
+        Store data in database. The tables are independent and loaded at the same
+        time on separate pooled connections (one by one on SQLite). Returns False
+        when some table could not be stored.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from modules.data_processing import destination_rows
+
+        self._prepare_database()
+        stored_all = True
+
+        # The destinations of both directions go into one long table
+        frames = {
+            "ARRIVALS": ("df_arrivals", processed_data["df_arrivals"]),
+            "DEPARTURES": ("df_departures", processed_data["df_departures"]),
+            "DESTINATIONS": (
+                "destinations",
+                destination_rows(
+                    processed_data["df_destinations_arr"],
+                    processed_data["df_destinations_dep"],
+                    self.windowStr,
+                ),
+            ),
+        }
+
+        workers = 1 if self.engine.dialect.name == "sqlite" else DB_LOAD_CONCURRENCY
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(frames)))) as pool:
+            futures = {
+                table_name: pool.submit(self._load_table, table_name, key, df)
+                for table_name, (key, df) in frames.items()
+            }
+        for table_name, future in futures.items():
+            key = frames[table_name][0]
+            stats = future.result()
+            if stats is None:
+                stored_all = False
+                continue
+            self.metrics.observe_table(table_name, stats["rows"], stats["seconds"])
+            logger.info(
+                f"{key} successfully written to table {table_name} "
+                f"({stats['rows']} rows in {stats['seconds']:.2f}s)"
+            )
+        logger.info(
+            f"Stored {len(frames)} tables in {time.perf_counter() - start:.2f}s."
+        )
+        if stored_all:
+            stored_all = self.update_rolling_analytics()
+        return stored_all
+
+    def update_rolling_analytics(self) -> bool:
+        """
+        Method that moves the rolling analytics forward to the window just loaded.
+        They are counted from the flight history, which only the upsert load mode
+        keeps. Returns False when they could not be updated.
+        """
+        from sqlalchemy.exc import SQLAlchemyError
+        from modules.rolling_analytics import RollingAnalytics
+
+        if not ROLLING_ANALYTICS or DB_LOAD_MODE != "upsert":
+            return True
+        self._prepare_database()
+        try:
+            with self.metrics.stage("analytics"):
+                RollingAnalytics(self.engine).update(self.windowStr)
+        except SQLAlchemyError as e:
+            logger.error(f"Error occurred: {e}")
+            return False
+        return True
 
     def aws_upload(self, facilities: dict):
         """
         Method to store the generated reports in AWS
         """
+        from modules.aws_handler import S3Uploader
+
         for key, df in facilities.items():
             if df.empty:
                 logger.info(f"Dataframe for {key} is empty.")
-            store_to_s3(key, df, self.windowStr)
+        timings = S3Uploader().upload_reports(facilities, self.windowStr)
+        self.metrics.add("reports_uploaded", len(timings))
+        self.metrics.add("bytes_uploaded", sum(t["bytes"] for t in timings.values()))
+        logger.info(
+            f"Uploaded {len(timings)} reports in "
+            f"{sum(t['seconds'] for t in timings.values()):.2f}s of upload time."
+        )
+        return timings
+
+    @contextmanager
+    def _instrumented_run(self, run_id: str = None):
+        """
+        Collects the metrics of one run (HTTP calls included) and emits them when
+        the run ends, also when it fails. A resumed run keeps its <run_id>.
+        """
+        if self.replay and not RESPONSE_CACHE_PATH:
+            raise Exception("Nothing to replay, RESPONSE_CACHE_PATH is empty.")
+        self.metrics = RunMetrics()
+        if run_id is not None:
+            self.metrics.run_id = run_id
+        set_metrics(self.metrics)
+        response_cache = None
+        if RESPONSE_CACHE_PATH:
+            response_cache = ResponseCache(replay=self.replay)
+        set_response_cache(response_cache)
+        cache_stats = dict(get_reference_cache().stats)
+        try:
+            yield self.metrics
+            self.metrics.status = "success"
+        except BaseException:
+            self.metrics.status = "failed"
+            raise
+        finally:
+            set_metrics(None)
+            set_response_cache(None)
+            for key, value in get_reference_cache().stats.items():
+                self.metrics.add(
+                    f"reference_cache_{key}", value - cache_stats.get(key, 0)
+                )
+            if response_cache is not None:
+                for key, value in response_cache.stats.items():
+                    self.metrics.add(f"response_cache_{key}", value)
+                logger.info(f"Response cache stats: {response_cache.stats}")
+                response_cache.close()
+            self.metrics.window = self.windowStr
+            self.metrics.emit()
 
-    def run_etl_process(self):
+    @contextmanager
+    def _event_loop(self):
         """
-        Method that executes the ETL pipeline.
+        With ASYNC_FETCHING, runs the extraction and the reference lookups of a run
+        on one event loop and one async fetcher, so they share their connections.
+        A warm controller keeps both for the next runs. Otherwise the sync
+        fetchers are used.
         """
-        logger.info("Extracting data")
-        raw_flights_data = self.extract_data()
+        if not ASYNC_FETCHING:
+            yield
+            return
+        if self._async_client is None:
+            from modules import async_fetching
 
-        logger.info("Data processing")
-        processing_results = self.process_data(raw_flights_data)
+            # asyncio.Runner would do, but it needs Python 3.11
+            loop = asyncio.new_event_loop()
+            api_fetcher = async_fetching.AsyncSchipholDataFetcher(
+                compact_flights=COMPACT_FLIGHT_RECORDS
+            )
+            loop.run_until_complete(api_fetcher.open())
+            self._async_client = (loop, api_fetcher)
+        try:
+            yield
+        finally:
+            if not self.keep_warm:
+                self._close_async_client()
 
-        if processing_results is not None:
-            logger.info("Data storing")
-            self.load_data(processing_results)
+    def _close_async_client(self):
+        if self._async_client is None:
+            return
+        loop, api_fetcher = self._async_client
+        self._async_client = None
+        try:
+            loop.run_until_complete(api_fetcher.close())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+        logger.info(f"Async API HTTP stats: {api_fetcher.stats}")
 
-            logger.info("Uploading to AWS")
-            self.aws_upload(processing_results["reports"]["facilities"])
+    def close(self):
+        """
+        Releases the database engine and the async HTTP client kept by the
+        controller.
+        """
+        self._close_async_client()
+        if self.engine is not None:
+            from modules.database_handler import dispose_engine
+
+            dispose_engine(self.engine)
+            self.engine = None
+
+    def _open_checkpoint(self, run_id: str, resume: bool):
+        if not CHECKPOINT_DIR:
+            if resume:
+                raise Exception("Checkpoints are disabled, CHECKPOINT_DIR is empty.")
+            return None
+        checkpoint = RunCheckpoint(run_id, CHECKPOINT_DIR)
+        if resume and not checkpoint.exists():
+            raise Exception(f"No checkpoint of the run {run_id} in {CHECKPOINT_DIR}.")
+        return checkpoint
+
+    def _checkpointed(self, checkpoint, stage: str, run, save=None, load=None):
+        """
+        Runs the stage <stage> and checkpoints its output with <save>. A stage the
+        checkpoint has already is skipped, its output is read back with <load>.
+        A stage that returns False is not checkpointed.
+        """
+        if checkpoint is not None and checkpoint.done(stage):
+            logger.info(f"Skipping the {stage} stage, completed before.")
+            self.metrics.add("resumed_stages")
+            if load is None:
+                return None
+            output, self.windowStr = load(checkpoint.path)
+            return output
+
+        with self.metrics.stage(stage):
+            output = run()
+        if checkpoint is not None and output is not False:
+            with self.metrics.stage("checkpoint"):
+                if save is not None:
+                    save(output, self.windowStr, checkpoint.path)
+                checkpoint.mark_done(stage, self.windowStr)
+        return output
+
+    def run_etl_process(self, resume: str = None):
+        """
+        Method that executes the ETL pipeline. The output of every stage is
+        checkpointed under CHECKPOINT_DIR, so a failed run can be resumed with its
+        run id (<resume>): the stages it completed are skipped and their output is
+        memory-mapped back in instead of fetched and processed again.
+        """
+        with self._instrumented_run(run_id=resume) as metrics, self._event_loop():
+            checkpoint = self._open_checkpoint(metrics.run_id, resume is not None)
+            # The high-water mark only moves when this run fetched the window
+            extracted = checkpoint is None or not checkpoint.done("extract")
+            try:
+                # Resumed after processing, the raw flights are not read back
+                processed = checkpoint is not None and checkpoint.done("process")
+                logger.info("Extracting data")
+                raw_flights_data = self._checkpointed(
+                    checkpoint,
+                    "extract",
+                    self.extract_data,
+                    save_raw_flights,
+                    None if processed else load_raw_flights,
+                )
+
+                logger.info("Data processing")
+                processing_results = self._checkpointed(
+                    checkpoint,
+                    "process",
+                    lambda: self.process_data(raw_flights_data),
+                    save_processed,
+                    load_processed,
+                )
+
+                logger.info("Data storing")
+                stored_all = self._checkpointed(
+                    checkpoint, "load", lambda: self.load_data(processing_results)
+                )
+
+                logger.info("Uploading to AWS")
+                self._checkpointed(
+                    checkpoint,
+                    "upload",
+                    lambda: self.aws_upload(
+                        processing_results["reports"]["facilities"]
+                    ),
+                )
+            except BaseException:
+                if checkpoint is not None:
+                    logger.error(
+                        f"Run {metrics.run_id} failed, resume it with "
+                        f"'python main.py --resume {metrics.run_id}'."
+                    )
+                raise
+
+            if self.incremental_state is not None and extracted:
+                # The window is fully processed, move the high-water mark
+                self.incremental_state.save()
+            if checkpoint is not None:
+                if stored_all is False:
+                    logger.warning(
+                        f"Some tables were not stored, resume the run with "
+                        f"'python main.py --resume {metrics.run_id}'."
+                    )
+                else:
+                    checkpoint.remove()
+
+        logger.info(f"Reference data cache stats: {get_reference_cache().stats}")
+        logger.info("Success")
+
+    def run_extract_stage(self, stage_dir: str = STAGE_DIR) -> str:
+        """
+        Method that only extracts the window and writes its raw flights to
+        <stage_dir> for the process stage. Returns the path of the file.
+        """
+        with self._instrumented_run() as metrics, self._event_loop():
+            with metrics.stage("extract"):
+                raw_flights_data = self.extract_data()
+                path = save_raw_flights(raw_flights_data, self.windowStr, stage_dir)
+            if self.incremental_state is not None:
+                # The whole merged window is in the file, move the high-water mark
+                self.incremental_state.save()
+        return path
+
+    def run_process_stage(self, stage_dir: str = STAGE_DIR) -> dict:
+        """
+        Method that processes the raw flights written by the extract stage and
+        writes the frames and reports to <stage_dir> for the load and upload
+        stages.
+        """
+        raw_flights_data, self.windowStr = load_raw_flights(stage_dir)
+        with self._instrumented_run() as metrics, self._event_loop():
+            metrics.add("flights", len(raw_flights_data))
+            with metrics.stage("process"):
+                processing_results = self.process_data(raw_flights_data)
+                save_processed(processing_results, self.windowStr, stage_dir)
+        return processing_results
+
+    def run_load_stage(self, stage_dir: str = STAGE_DIR) -> bool:
+        """
+        Method that stores the frames written by the process stage in the
+        database. Returns False when some table could not be stored.
+        """
+        processing_results, self.windowStr = load_processed(stage_dir)
+        with self._instrumented_run() as metrics:
+            with metrics.stage("load"):
+                return self.load_data(processing_results)
+
+    def run_upload_stage(self, stage_dir: str = STAGE_DIR) -> dict:
+        """
+        Method that uploads the reports written by the process stage to S3.
+        """
+        processing_results, self.windowStr = load_processed(
+            stage_dir, reports_only=True
+        )
+        with self._instrumented_run() as metrics:
+            with metrics.stage("upload"):
+                return self.aws_upload(processing_results["reports"]["facilities"])
+
+    def run_etl_window(self, start, end) -> dict:
+        """
+        Method that executes the ETL pipeline for the fixed window [start, end]
+        instead of the trailing one. The window's rows are upserted and its
+        reports are stored under its own window string.
+        """
+        self._check_api_credentials()
+        with self._instrumented_run() as metrics, self._event_loop():
+            with metrics.stage("extract"):
+                if self._async_client is not None:
+                    from modules import async_fetching
+
+                    loop, api_fetcher = self._async_client
+                    raw_flights_data, self.windowStr = loop.run_until_complete(
+                        async_fetching.fetch_flights_window(api_fetcher, start, end)
+                    )
+                else:
+                    raw_flights_data, self.windowStr = fetch_flights_window(start, end)
+            logger.info(
+                f"Fetched {len(raw_flights_data)} raw data entries for {self.windowStr}."
+            )
+            metrics.add("flights", len(raw_flights_data))
+            with metrics.stage("process"):
+                processing_results = self.process_data(raw_flights_data)
+            with metrics.stage("load"):
+                if not self.load_data(processing_results):
+                    # Not logged as completed, the next backfill run retries it
+                    raise Exception(f"Couldn't store the window {self.windowStr}.")
+            with metrics.stage("upload"):
+                self.aws_upload(processing_results["reports"]["facilities"])
+        return {"window": self.windowStr, "flights": len(raw_flights_data)}
+
+    def _store_page(self, table_name: str, df: "pd.DataFrame", page: int):
+        # Without upserts the first page replaces the previous window and the next
+        # ones are added to it
+        if DB_LOAD_MODE != "upsert" and page == 1:
+            stats = self._replace_table(table_name, df)
         else:
-            logger.info("Processing failed due to error. Skipping data storing.")
+            stats = self._upsert_table(table_name, df)
+        if stats is None:
+            raise Exception(
+                f"Couldn't store page {page} of {table_name} for {self.windowStr}."
+            )
+
+    def run_streaming_etl_process(self):
+        """
+        Method that executes the ETL pipeline page by page. Every page of flights
+        is cleaned, appended to the database and folded into running aggregates
+        before the next one is fetched, so memory stays bounded by the page size.
+        """
+        from modules.data_processing import destination_rows, optimize_flight_frame
+        from modules.streaming import StreamingAggregator
+
+        self._check_api_credentials()
+        if self.incremental_state is not None:
+            logger.warning("Incremental extraction is ignored in streaming mode.")
+
+        with self._instrumented_run() as metrics, self._event_loop():
+            self._prepare_database()
+            pages, self.windowStr = iter_flights_pages()
+            aggregator = StreamingAggregator()
+
+            logger.info("Streaming extraction, processing and storing")
+            # Fetching, processing and storing are interleaved page by page
+            with metrics.stage("stream"):
+                for page in pages:
+                    df_arrivals, _, df_departures, _ = aggregator.fold(page)
+                    metrics.add("flights", len(page))
+                    metrics.add("rows", len(df_arrivals) + len(df_departures))
+                    for table_name, df in (
+                        ("ARRIVALS", df_arrivals),
+                        ("DEPARTURES", df_departures),
+                    ):
+                        self._store_page(
+                            table_name, optimize_flight_frame(df), aggregator.pages
+                        )
+            logger.info(
+                f"Processed {aggregator.pages} pages with "
+                f"{aggregator.rows['arrivals']} arrivals and "
+                f"{aggregator.rows['departures']} departures."
+            )
+
+            with metrics.stage("load"):
+                df_destinations = destination_rows(
+                    *aggregator.destination_frames(), self.windowStr
+                )
+                if DB_LOAD_MODE == "upsert":
+                    stats = self._upsert_table("DESTINATIONS", df_destinations)
+                else:
+                    stats = self._replace_table("DESTINATIONS", df_destinations)
+                if stats is None or not self.update_rolling_analytics():
+                    raise Exception(f"Couldn't store the window {self.windowStr}.")
+
+            with metrics.stage("process"):
+                airline_codes, iata_codes = aggregator.reference_codes(
+                    self.TOP_AIRLINES, self.TOP_DESTINATIONS, self.TOP_FACILITIES
+                )
+                lookup = self._lookup(airline_codes, iata_codes)
+                metrics.add("reference_lookups", len(airline_codes) + len(iata_codes))
+                reports = aggregator.reports(
+                    self.TOP_AIRLINES,
+                    self.TOP_DESTINATIONS,
+                    self.TOP_FACILITIES,
+                    self.windowStr,
+                    lookup,
+                )
+
+            logger.info("Uploading to AWS")
+            with metrics.stage("upload"):
+                self.aws_upload(reports["facilities"])
 
+        logger.info(f"Reference data cache stats: {get_reference_cache().stats}")
         logger.info("Success")
+        return reports
 
 
 # Example usage in main.py
@@ -0,0 +1,144 @@
+import json
+from typing import NamedTuple
+
+try:
+    import orjson
+except ImportError:  # the stdlib decoder is used then
+    orjson = None
+
+
+class _Missing:
+    """
+    Value of the fields a raw flight does not have, told apart from JSON null.
+    """
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+    def __reduce__(self):
+        # Unpickled as the module's own instance, records cross processes
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+class FlightRecord(NamedTuple):
+    """
+    Compact form of a raw API flight: only the fields the pipeline reads, in a
+    tuple instead of a dict with every nested field of the API. Absent fields are
+    MISSING, null fields None, like in the raw flight. Besides attribute access it
+    answers the dict lookups the pipeline does on raw flights (flight["field"],
+    "field" in flight, get, keys), so records and raw dicts can be mixed.
+    """
+
+    id: str = MISSING
+    flightName: str = MISSING
+    flightDirection: str = MISSING
+    schemaVersion: str = MISSING
+    scheduleDateTime: str = MISSING
+    scheduleDate: str = MISSING
+    scheduleTime: str = MISSING
+    lastUpdatedAt: str = MISSING
+    prefixICAO: str = MISSING
+    terminal: int = MISSING
+    gate: str = MISSING
+    publicFlightState: dict = MISSING
+    route: dict = MISSING
+    aircraftType: dict = MISSING
+    estimatedLandingTime: str = MISSING
+    actualLandingTime: str = MISSING
+    expectedTimeOnBelt: str = MISSING
+    baggageClaim: dict = MISSING
+    expectedTimeBoarding: str = MISSING
+    expectedTimeGateOpen: str = MISSING
+    expectedTimeGateClosing: str = MISSING
+    actualOffBlockTime: str = MISSING
+
+    @classmethod
+    def from_raw(cls, flight: dict) -> "FlightRecord":
+        # Bypasses the generated __new__, one C level pass over the fields
+        return _new_tuple(cls, map(flight.get, cls._fields, _ALL_MISSING))
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            return tuple.__getitem__(self, key)
+        value = getattr(self, key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        if not isinstance(key, str):
+            return tuple.__contains__(self, key)
+        return getattr(self, key, MISSING) is not MISSING
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, MISSING)
+        return default if value is MISSING else value
+
+    def keys(self) -> list:
+        return [
+            field for field, value in zip(self._fields, self) if value is not MISSING
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            field: value
+            for field, value in zip(self._fields, self)
+            if value is not MISSING
+        }
+
+
+_new_tuple = tuple.__new__
+_ALL_MISSING = (MISSING,) * len(FlightRecord._fields)
+
+
+def project_flights(flights: list) -> list:
+    """
+    Function that projects raw API flights (dicts) down to FlightRecords. Flights
+    that already are records are kept as they are.
+    """
+    from_raw = FlightRecord.from_raw
+    return [
+        from_raw(flight) if isinstance(flight, dict) else flight for flight in flights
+    ]
+
+
+def as_raw(flight) -> dict:
+    """
+    Function that returns a raw flight or a FlightRecord as a JSON serializable
+    dict.
+    """
+    return flight if isinstance(flight, dict) else flight.to_dict()
+
+
+def decode_json(content: bytes):
+    """
+    Function that decodes a JSON response body, with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def encode_json(data) -> bytes:
+    """
+    Function that encodes JSON serializable data (dicts, not FlightRecords), with
+    orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+def decode_flights_response(content: bytes, compact: bool = True):
+    """
+    Function that decodes an API response body. With <compact>, the flights of a
+    flights page are projected to FlightRecords right away, so the full raw dicts
+    are dropped page by page.
+    """
+    data = decode_json(content)
+    if compact and isinstance(data, dict) and "flights" in data:
+        data["flights"] = project_flights(data["flights"])
+    return data
@@ -0,0 +1,156 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from config.config import INCREMENTAL_STATE_PATH
+from config.logging_config import logger
+from modules.flight_records import as_raw
+
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def flight_key(flight: dict) -> str:
+    """
+    Identity of a flight across fetches.
+    """
+    if "id" in flight:
+        return str(flight["id"])
+    return f"{flight.get('flightName')}@{flight.get('scheduleDateTime')}"
+
+
+def flight_schedule(flight: dict) -> datetime:
+    """
+    Scheduled local (wall clock) date and time of a flight, as used by the API's
+    fromDateTime/toDateTime filters.
+    """
+    if flight.get("scheduleDateTime"):
+        scheduled = datetime.fromisoformat(flight["scheduleDateTime"])
+        return scheduled.replace(tzinfo=None)
+    return datetime.fromisoformat(f"{flight['scheduleDate']}T{flight['scheduleTime']}")
+
+
+class IncrementalState:
+    """
+    Flights of the last successfully processed window together with its high-water
+    mark, persisted as gzipped JSON. Lets the next run request only the flights
+    scheduled or updated after the watermark and merge them into the previous
+    window.
+    """
+
+    def __init__(self, path: str = INCREMENTAL_STATE_PATH):
+        self.path = path
+        self.watermark = None
+        self.last_updated_at = ""
+        self.window_hours = None
+        self.flights = []
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with gzip.open(self.path, "rt") as file:
+                state = json.load(file)
+            self.watermark = datetime.strptime(state["watermark"], DATETIME_FORMAT)
+            self.last_updated_at = state.get("lastUpdatedAt", "")
+            self.window_hours = state["windowHours"]
+            self.flights = state["flights"]
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(f"Ignoring unreadable incremental state {self.path}: {exc}")
+            self.reset()
+
+    def save(self):
+        if self.watermark is None:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = {
+            "watermark": self.watermark.strftime(DATETIME_FORMAT),
+            "lastUpdatedAt": self.last_updated_at,
+            "windowHours": self.window_hours,
+            "flights": [as_raw(flight) for flight in self.flights],
+        }
+        # Write next to the old state first, so a crash never leaves it half written
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt") as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self.path)
+        logger.info(
+            f"Saved incremental state with watermark {state['watermark']} "
+            f"({len(self.flights)} flights)."
+        )
+
+    def reset(self):
+        self.watermark = None
+        self.last_updated_at = ""
+        self.window_hours = None
+        self.flights = []
+
+    def delta_start(
+        self, window_start: datetime, window_hours: float, overlap: timedelta
+    ):
+        """
+        Returns the datetime from which flights have to be requested, or None when
+        the state cannot be reused and a full refresh is needed.
+        """
+        if self.watermark is None:
+            logger.info("No incremental state found, doing a full refresh.")
+            return None
+        if self.window_hours != window_hours:
+            logger.info("Window size changed since the last run, doing a full refresh.")
+            return None
+        if self.watermark <= window_start:
+            logger.info("Incremental state is older than the window, full refresh.")
+            return None
+        # Re-read a short overlap, recent flights may still change state
+        return max(window_start, self.watermark - overlap)
+
+    def updated_since(self, delta_start: datetime, overlap: timedelta) -> datetime:
+        """
+        Returns the datetime from which updated flights have to be requested: the
+        last update seen by the previous runs minus <overlap>, or <delta_start>
+        when it is unknown.
+        """
+        try:
+            last_updated_at = datetime.fromisoformat(self.last_updated_at)
+        except ValueError:
+            return delta_start
+        # Local wall clock time, like the schedule bounds
+        return last_updated_at.replace(tzinfo=None) - overlap
+
+    def merge(
+        self,
+        delta: list,
+        window_start: datetime,
+        window_end: datetime,
+        window_hours: float,
+    ) -> list:
+        """
+        Merges the newly fetched flights into the stored window. The most recently
+        updated version of every flight wins and flights scheduled before
+        <window_start> expire. Advances the watermark to <window_end>.
+        """
+        merged = {flight_key(flight): flight for flight in self.flights}
+        for flight in delta:
+            key = flight_key(flight)
+            previous = merged.get(key)
+            if previous is None or flight.get("lastUpdatedAt", "") >= previous.get(
+                "lastUpdatedAt", ""
+            ):
+                merged[key] = flight
+
+        self.flights = sorted(
+            (
+                flight
+                for flight in merged.values()
+                if flight_schedule(flight) >= window_start
+            ),
+            key=flight_schedule,
+        )
+        self.watermark = window_end
+        self.window_hours = window_hours
+        self.last_updated_at = max(
+            [self.last_updated_at]
+            + [flight.get("lastUpdatedAt", "") for flight in delta]
+        )
+        return self.flights
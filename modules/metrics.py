@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config.config import METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH
+from config.logging_config import logger
+
+PROMETHEUS_PREFIX = "schiphol_etl"
+
+
+class RunMetrics:
+    """
+    Timings and throughput of one pipeline run: wall time per stage, latency and
+    size of every HTTP call (grouped by endpoint), rows and load time of every
+    database table, and counters such as rows, pages, bytes and reference
+    lookups. Emitted once per run as a JSON line and
+    optionally as a Prometheus text file.
+    """
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex
+        self.started_at = datetime.now(timezone.utc)
+        self.window = ""
+        self.status = "running"
+        self.stages = {}
+        self.http = {}
+        self.tables = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times the block as the stage <name>, also when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + (
+                    time.perf_counter() - start
+                )
+
+    def add(self, name: str, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_http(self, endpoint: str, seconds: float, status, size: int):
+        """
+        Records one HTTP call to <endpoint> (e.g. "flights", "airlines").
+        """
+        with self._lock:
+            http = self.http.setdefault(
+                endpoint,
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "bytes": 0,
+                },
+            )
+            http["calls"] += 1
+            http["seconds"] += seconds
+            http["max_seconds"] = max(http["max_seconds"], seconds)
+            http["bytes"] += size
+            self.counters["bytes_downloaded"] = (
+                self.counters.get("bytes_downloaded", 0) + size
+            )
+            if status is None or status >= 400:
+                http["errors"] += 1
+
+    def observe_table(self, table: str, rows: int, seconds: float):
+        """
+        Records the load of <rows> rows into the database table <table>.
+        """
+        with self._lock:
+            loads = self.tables.setdefault(table, {"rows": 0, "seconds": 0.0})
+            loads["rows"] += rows
+            loads["seconds"] += seconds
+
+    def _rate(self, counter: str, *stages: str):
+        # Per second of the first of <stages> that ran
+        seconds = next((self.stages[s] for s in stages if s in self.stages), None)
+        if not seconds or counter not in self.counters:
+            return None
+        return round(self.counters[counter] / seconds, 1)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            http = {
+                endpoint: dict(
+                    values,
+                    mean_seconds=values["seconds"] / values["calls"],
+                )
+                for endpoint, values in self.http.items()
+            }
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at.isoformat(),
+                "window": self.window,
+                "status": self.status,
+                "stages": {name: round(s, 6) for name, s in self.stages.items()},
+                "http": http,
+                "tables": {
+                    table: dict(values, seconds=round(values["seconds"], 6))
+                    for table, values in self.tables.items()
+                },
+                "counters": dict(self.counters),
+                "throughput": {
+                    "pages_per_second": self._rate("pages", "stream", "extract"),
+                    "rows_per_second": self._rate("rows", "stream", "process"),
+                    "rows_loaded_per_second": self._rate("rows", "stream", "load"),
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        The metrics of the run in the Prometheus text exposition format.
+        """
+        metrics = self.to_dict()
+        lines = []
+
+        def gauge(name, help_text, samples):
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                label_text = "{" + label_text + "}" if label_text else ""
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{label_text} {value}")
+
+        gauge(
+            "last_run_timestamp_seconds",
+            "Start time of the last run.",
+            [({}, self.started_at.timestamp())],
+        )
+        gauge(
+            "stage_seconds",
+            "Wall time of every stage of the last run.",
+            [({"stage": name}, s) for name, s in metrics["stages"].items()],
+        )
+        for field, help_text in (
+            ("calls", "HTTP calls of the last run."),
+            ("errors", "Failed HTTP calls of the last run."),
+            ("seconds", "Total HTTP call time of the last run."),
+            ("max_seconds", "Slowest HTTP call of the last run."),
+            ("bytes", "Bytes downloaded in the last run."),
+        ):
+            gauge(
+                f"http_{field}",
+                help_text,
+                [
+                    ({"endpoint": endpoint}, values[field])
+                    for endpoint, values in metrics["http"].items()
+                ],
+            )
+        for field, help_text in (
+            ("rows", "Rows loaded into every table in the last run."),
+            ("seconds", "Load time of every table in the last run."),
+        ):
+            gauge(
+                f"table_{field}",
+                help_text,
+                [
+                    ({"table": table}, values[field])
+                    for table, values in metrics["tables"].items()
+                ],
+            )
+        gauge(
+            "count",
+            "Counters of the last run (rows, pages, bytes, lookups).",
+            [({"name": name}, value) for name, value in metrics["counters"].items()],
+        )
+        return "\n".join(lines) + "\n"
+
+    def emit(
+        self,
+        json_path: str = None,
+        prometheus_path: str = None,
+    ) -> dict:
+        """
+        Logs the metrics of the run, appends them as one JSON line to <json_path>
+        and, when set, rewrites the Prometheus text file <prometheus_path>. Both
+        default to METRICS_JSON_PATH and METRICS_PROMETHEUS_PATH.
+        """
+        if json_path is None:
+            json_path = METRICS_JSON_PATH
+        if prometheus_path is None:
+            prometheus_path = METRICS_PROMETHEUS_PATH
+        metrics = self.to_dict()
+        logger.info(f"Run metrics: {json.dumps(metrics)}")
+        if json_path:
+            if os.path.dirname(json_path):
+                os.makedirs(os.path.dirname(json_path), exist_ok=True)
+            with open(json_path, "a") as file:
+                file.write(json.dumps(metrics) + "\n")
+        if prometheus_path:
+            if os.path.dirname(prometheus_path):
+                os.makedirs(os.path.dirname(prometheus_path), exist_ok=True)
+            # Scrapers must never read a half written file
+            tmp_path = prometheus_path + ".tmp"
+            with open(tmp_path, "w") as file:
+                file.write(self.to_prometheus())
+            os.replace(tmp_path, prometheus_path)
+        return metrics
@@ -0,0 +1,34 @@
+import multiprocessing
+import time
+
+
+class RateLimiter:
+    """
+    Spaces API requests so that at most <rate_per_second> of them start every
+    second. The next free slot lives in shared memory, so one limiter handed to
+    several worker processes enforces a single budget across all of them.
+    """
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second
+        self._lock = multiprocessing.Lock()
+        self._next_slot = multiprocessing.Value("d", 0.0, lock=False)
+
+    def reserve(self) -> float:
+        """
+        Takes the next free slot and returns the seconds to wait until it, for
+        callers that cannot block (e.g. coroutines).
+        """
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+        return slot - now
+
+    def acquire(self):
+        """
+        Blocks until the caller may send its request.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,175 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config.config import (
+    REFERENCE_CACHE_PATH,
+    REFERENCE_CACHE_TTL_HOURS,
+    REFERENCE_CACHE_MAX_ENTRIES,
+)
+from config.logging_config import logger
+
+
+class ReferenceCache:
+    """
+    Two level cache for reference data (airlines, destinations). Entries are kept
+    in an in-process LRU and persisted in a SQLite file, so they survive between
+    runs. Entries older than <ttl_hours> are treated as missing and both levels are
+    bounded to <max_entries>, evicting the least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        path: str = REFERENCE_CACHE_PATH,
+        ttl_hours: float = REFERENCE_CACHE_TTL_HOURS,
+        max_entries: int = REFERENCE_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+        self._memory = OrderedDict()
+        # Memory hits whose recency has not been written to the store yet
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._connection = self._open_store(path) if path else None
+
+    def _open_store(self, path: str):
+        try:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            connection = sqlite3.connect(path, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS reference_cache ("
+                "kind TEXT NOT NULL, code TEXT NOT NULL, payload TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (kind, code))"
+            )
+            connection.commit()
+            return connection
+        except sqlite3.Error as exc:
+            logger.warning(f"Reference cache store unavailable, memory only: {exc}")
+            return None
+
+    def _is_expired(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at > self.ttl
+
+    def get(self, kind: str, code: str):
+        """
+        Returns the cached entry for <kind>/<code>, or None when missing or expired.
+        """
+        key = (kind, code)
+        with self._lock:
+            if key in self._memory:
+                fetched_at, value = self._memory[key]
+                if not self._is_expired(fetched_at):
+                    self._memory.move_to_end(key)
+                    self._touched[key] = time.time()
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self.stats["expired"] += 1
+
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT payload, fetched_at FROM reference_cache "
+                    "WHERE kind = ? AND code = ?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    payload, fetched_at = row
+                    if not self._is_expired(fetched_at):
+                        self._connection.execute(
+                            "UPDATE reference_cache SET last_used = ? "
+                            "WHERE kind = ? AND code = ?",
+                            (time.time(), kind, code),
+                        )
+                        self._connection.commit()
+                        value = json.loads(payload)
+                        self._remember(key, fetched_at, value)
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._connection.execute(
+                        "DELETE FROM reference_cache WHERE kind = ? AND code = ?", key
+                    )
+                    self._connection.commit()
+                    self.stats["expired"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, kind: str, code: str, value: dict):
+        """
+        Stores <value> for <kind>/<code> in both cache levels.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember((kind, code), now, value)
+            if self._connection is None:
+                return
+            self._connection.execute(
+                "INSERT OR REPLACE INTO reference_cache "
+                "(kind, code, payload, fetched_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (kind, code, json.dumps(value), now, now),
+            )
+            self._flush_touched()
+            # Keep the store bounded, least recently used entries go first
+            cursor = self._connection.execute(
+                "DELETE FROM reference_cache WHERE rowid IN ("
+                "SELECT rowid FROM reference_cache ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.stats["evictions"] += cursor.rowcount
+            self._connection.commit()
+
+    def _flush_touched(self):
+        self._connection.executemany(
+            "UPDATE reference_cache SET last_used = ? WHERE kind = ? AND code = ?",
+            [(used, kind, code) for (kind, code), used in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _remember(self, key: tuple, fetched_at: float, value: dict):
+        self._memory[key] = (fetched_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            if self._connection is None:
+                self.stats["evictions"] += 1
+
+    def get_or_fetch(self, kind: str, code: str, fetch):
+        """
+        Returns the cached entry for <kind>/<code>, calling <fetch>(code) on a miss.
+        Failed lookups (None) are not cached.
+        """
+        value = self.get(kind, code)
+        if value is None:
+            value = fetch(code)
+            if value is not None:
+                self.put(kind, code, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM reference_cache")
+                self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._flush_touched()
+                self._connection.commit()
+                self._connection.close()
+                self._connection = None
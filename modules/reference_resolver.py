@@ -0,0 +1,107 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+from modules.data_fetching import fetch_airline, fetch_destination
+from config.config import FETCH_CONCURRENCY
+from config.logging_config import logger
+
+
+def resolve_reference_data(
+    airline_codes=(), iata_codes=(), max_workers: int = FETCH_CONCURRENCY
+) -> dict:
+    """
+    Resolves every airline ICAO code and destination IATA code in a single batch.
+    Codes are deduplicated and looked up concurrently (cached entries return
+    without a network call). Returns the lookup table used by the report builders:
+    {"airlines": {icao: publicName}, "destinations": {iata: city}}.
+    """
+    airline_codes, iata_codes = _distinct_codes(airline_codes, iata_codes)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        airline_futures = {
+            code: executor.submit(fetch_airline, code) for code in airline_codes
+        }
+        destination_futures = {
+            code: executor.submit(fetch_destination, code) for code in iata_codes
+        }
+        airlines = {
+            code: _field_or_code(future.result(), "publicName", code)
+            for code, future in airline_futures.items()
+        }
+        destinations = {
+            code: _field_or_code(future.result(), "city", code)
+            for code, future in destination_futures.items()
+        }
+
+    return {"airlines": airlines, "destinations": destinations}
+
+
+async def resolve_reference_data_async(
+    api_fetcher, airline_codes=(), iata_codes=()
+) -> dict:
+    """
+    Awaitable version of resolve_reference_data: the lookups run concurrently on
+    the event loop, through the session of <api_fetcher>
+    (async_fetching.AsyncSchipholDataFetcher).
+    """
+    # Imported here, aiohttp is only needed when the async client is used
+    from modules.async_fetching import fetch_airline, fetch_destination
+
+    airline_codes, iata_codes = _distinct_codes(airline_codes, iata_codes)
+
+    results = await asyncio.gather(
+        *(fetch_airline(api_fetcher, code) for code in airline_codes),
+        *(fetch_destination(api_fetcher, code) for code in iata_codes),
+    )
+    airline_results = results[: len(airline_codes)]
+    destination_results = results[len(airline_codes) :]
+    airlines = {
+        code: _field_or_code(info, "publicName", code)
+        for code, info in zip(airline_codes, airline_results)
+    }
+    destinations = {
+        code: _field_or_code(info, "city", code)
+        for code, info in zip(iata_codes, destination_results)
+    }
+
+    return {"airlines": airlines, "destinations": destinations}
+
+
+def _distinct_codes(airline_codes, iata_codes) -> tuple[list, list]:
+    airline_codes = sorted({code for code in airline_codes if code})
+    iata_codes = sorted({code for code in iata_codes if code})
+    logger.debug(
+        f"Resolving {len(airline_codes)} airlines and {len(iata_codes)} destinations."
+    )
+    return airline_codes, iata_codes
+
+
+def _field_or_code(info, field: str, code: str) -> str:
+    # Keep the raw code when the lookup failed, so a report is never lost
+    if isinstance(info, dict) and info.get(field):
+        return info[field]
+    logger.warning(f"No '{field}' found for code {code}, keeping the code.")
+    return code
+
+
+def join_airline_names(codes: pd.Series, lookup: dict = None) -> pd.Series:
+    """
+    Maps airline ICAO codes to their public name using the <lookup> table. Without
+    a table the codes are resolved on the spot.
+    """
+    if lookup is None:
+        lookup = resolve_reference_data(airline_codes=codes)
+    names = lookup["airlines"]
+    return codes.map(lambda code: names.get(code, code))
+
+
+def join_destination_cities(codes: pd.Series, lookup: dict = None) -> pd.Series:
+    """
+    Maps destination IATA codes to their city using the <lookup> table. Without a
+    table the codes are resolved on the spot.
+    """
+    if lookup is None:
+        lookup = resolve_reference_data(iata_codes=codes)
+    cities = lookup["destinations"]
+    return codes.map(lambda code: cities.get(code, code))
@@ -0,0 +1,185 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from config.config import (
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL_HOURS,
+    RESPONSE_CACHE_REPLAY,
+)
+from config.logging_config import logger
+
+
+def cache_key(endpoint: str, params: dict = None) -> str:
+    """
+    Identity of a request: the endpoint and its sorted query parameters.
+    """
+    return endpoint + "?" + json.dumps(params or {}, sort_keys=True)
+
+
+class ResponseCache:
+    """
+    Raw API responses keyed by endpoint and parameters, gzipped in a SQLite file
+    together with their ETag and Last-Modified validators. Cached responses are
+    revalidated with conditional requests, so an unchanged page costs a 304 instead
+    of its body. In <replay> mode no request is sent at all: responses are served
+    from the cache only and a missing page reads as the end of the data (a missing
+    first page fails the run). Entries older than <ttl_hours> are purged when the
+    cache is opened, except in replay mode.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        ttl_hours: float = RESPONSE_CACHE_TTL_HOURS,
+        replay: bool = RESPONSE_CACHE_REPLAY,
+    ):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.replay = replay
+        self.stats = {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "stored": 0,
+            "bytes_served": 0,
+            "bytes_stored": 0,
+        }
+        self._lock = threading.Lock()
+        self._connection = self._open_store(path)
+
+    def _open_store(self, path: str):
+        try:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Backfill workers share the file, wait for each other's writes
+            connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, params TEXT NOT NULL, "
+                "etag TEXT, last_modified TEXT, body BLOB NOT NULL, "
+                "size INTEGER NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            if not self.replay:
+                # A replay reads the responses of any age
+                connection.execute(
+                    "DELETE FROM response_cache WHERE fetched_at < ?",
+                    (time.time() - self.ttl,),
+                )
+            connection.commit()
+            return connection
+        except sqlite3.Error as exc:
+            logger.warning(f"Response cache unavailable, not caching: {exc}")
+            return None
+
+    def get(self, endpoint: str, params: dict = None):
+        """
+        Returns the cached entry of a request as a dict with its validators and
+        compressed body, or None.
+        """
+        if self._connection is None:
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT etag, last_modified, body, size FROM response_cache "
+                "WHERE key = ?",
+                (cache_key(endpoint, params),),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body, size = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+            "size": size,
+        }
+
+    def conditional_headers(self, entry) -> dict:
+        """
+        Headers that let the server answer 304 when the cached <entry> is current.
+        """
+        headers = {}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def serve(self, entry, revalidated: bool = False):
+        """
+        Returns the raw body of a cached entry, counting it as a hit. Returns None
+        for a missing entry.
+        """
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["revalidated"] += revalidated
+            self.stats["bytes_served"] += entry["size"]
+        return gzip.decompress(entry["body"])
+
+    def put(
+        self,
+        endpoint: str,
+        params: dict,
+        content: bytes,
+        etag: str = None,
+        last_modified: str = None,
+    ):
+        """
+        Stores the raw body of a successful response with its validators.
+        """
+        with self._lock:
+            self.stats["misses"] += 1
+            if self._connection is None:
+                return
+            body = gzip.compress(content)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO response_cache (key, endpoint, params, etag, "
+                "last_modified, body, size, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key(endpoint, params),
+                    endpoint,
+                    json.dumps(params or {}, sort_keys=True),
+                    etag,
+                    last_modified,
+                    body,
+                    len(content),
+                    time.time(),
+                ),
+            )
+            self._connection.commit()
+            self.stats["stored"] += 1
+            self.stats["bytes_stored"] += len(body)
+
+    def latest_window(self):
+        """
+        Returns the (from, to) datetimes of the most recently cached flights
+        request, or None. Lets a replayed trailing run reprocess the last window.
+        """
+        if self._connection is None:
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT params FROM response_cache WHERE endpoint = 'flights' "
+                "ORDER BY fetched_at DESC LIMIT 1"
+            ).fetchone()
+        if row is None:
+            return None
+        params = json.loads(row[0])
+        return (
+            datetime.fromisoformat(params["fromDateTime"]),
+            datetime.fromisoformat(params["toDateTime"]),
+        )
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,263 @@
+import time
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import delete, select, text
+
+from modules.database_handler import metadata
+from config.logging_config import logger
+
+# Rolling spans of the summary table, in hours
+ROLLING_SPANS = {"1h": 1, "24h": 24, "7d": 7 * 24}
+# (dimension, flight table, column) counted per scheduled hour
+DIMENSIONS = (
+    ("arrival_airline", "ARRIVALS", "airline"),
+    ("departure_airline", "DEPARTURES", "airline"),
+    ("arrival_terminal", "ARRIVALS", "terminal"),
+    ("departure_terminal", "DEPARTURES", "terminal"),
+    ("gate", "DEPARTURES", "gate"),
+    ("belt", "ARRIVALS", "baggageClaimBelts"),
+)
+GROUP_COLUMNS = ["dimension", "value"]
+COUNT_COLUMNS = ["flights", "delayed", "canceled"]
+HOUR = pd.Timedelta(hours=1)
+# Key of the PostgreSQL advisory lock that serializes the updates (backfill
+# workers load windows in parallel)
+ADVISORY_LOCK_KEY = 7_105_032
+
+hourly_counts_table = metadata.tables["ROLLING_HOURLY_COUNTS"]
+summary_table = metadata.tables["ROLLING_ANALYTICS"]
+
+
+def window_bounds(windowStr: str) -> tuple:
+    """
+    Function that returns the start and the end of a window string (the end
+    comes first) as UTC timestamps. The window times are local times.
+    """
+    end, start = (
+        pd.Timestamp(datetime.strptime(part, "%Y-%m-%dT%H:%M:%S").astimezone())
+        for part in windowStr.split("_")
+    )
+    return start.tz_convert("UTC"), end.tz_convert("UTC")
+
+
+def _belt_lists(series: pd.Series) -> pd.Series:
+    # PostgreSQL returns the belts as lists, the other databases as "{1,2}" text
+    return series.map(
+        lambda value: (
+            [int(belt) for belt in value.strip("{}").split(",") if belt]
+            if isinstance(value, str)
+            else value
+        )
+    )
+
+
+def _as_keys(series: pd.Series) -> pd.Series:
+    # Terminals and belts come back as floats when the column has NULLs
+    if pd.api.types.is_float_dtype(series):
+        series = series.astype("Int64")
+    return series.astype(str)
+
+
+def hourly_counts(df_arrivals: pd.DataFrame, df_departures: pd.DataFrame):
+    """
+    Function that counts the flights, and the delayed (DEL) and canceled (CNX)
+    ones, per scheduled hour and value of every dimension (airline, terminal,
+    gate and belt). Returns one row per hour, dimension and value.
+    """
+    frames = {"ARRIVALS": df_arrivals, "DEPARTURES": df_departures}
+    counts = []
+    for dimension, table, column in DIMENSIONS:
+        df = frames[table]
+        values = df[column]
+        if column == "baggageClaimBelts":
+            values = _belt_lists(values)
+        rows = pd.DataFrame(
+            {
+                "hour": pd.to_datetime(
+                    df["scheduleDateTime"], utc=True, format="ISO8601"
+                ).dt.floor("h"),
+                "value": values,
+                "delayed": (df["state"] == "DEL").astype("int64"),
+                "canceled": (df["state"] == "CNX").astype("int64"),
+            }
+        )
+        if column == "baggageClaimBelts":
+            # A flight counts on every belt it uses
+            rows = rows.explode("value")
+        rows = rows.dropna(subset=["value"])
+        rows["value"] = _as_keys(rows["value"])
+        grouped = rows.groupby(["hour", "value"], observed=True).agg(
+            flights=("delayed", "size"),
+            delayed=("delayed", "sum"),
+            canceled=("canceled", "sum"),
+        )
+        counts.append(grouped.reset_index().assign(dimension=dimension))
+    return pd.concat(counts, ignore_index=True)[
+        ["hour", *GROUP_COLUMNS, *COUNT_COLUMNS]
+    ].astype({column: "int64" for column in COUNT_COLUMNS})
+
+
+def _totals(df: pd.DataFrame) -> pd.DataFrame:
+    return df.groupby(GROUP_COLUMNS)[COUNT_COLUMNS].sum()
+
+
+def _in_span(df: pd.DataFrame, anchor, hours: int) -> pd.DataFrame:
+    # A span ending at the hour <anchor> holds the <hours> hours up to it
+    return df[(df["hour"] > anchor - hours * HOUR) & (df["hour"] <= anchor)]
+
+
+def _hours_between(first, last) -> list:
+    return list(pd.date_range(first, last, freq="h"))
+
+
+class RollingAnalytics:
+    """
+    Rolling analytics over the flight history loaded in ARRIVALS and DEPARTURES:
+    the flights, delay and cancel rates per airline, terminal, gate and belt over
+    the last 1h, 24h and 7d. The flights are counted per scheduled hour into
+    ROLLING_HOURLY_COUNTS, and the sums materialized in ROLLING_ANALYTICS are
+    moved forward by adding the hours that enter a span and subtracting the ones
+    that expire. An update reads the hours of its window and the edges of the
+    spans, never the whole history.
+    """
+
+    def __init__(self, engine, spans: dict = ROLLING_SPANS):
+        self.engine = engine
+        self.spans = spans
+
+    def _read_flights(self, connection, table: str, since, until) -> pd.DataFrame:
+        columns = ["scheduleDateTime", "state"] + [
+            column for _, name, column in DIMENSIONS if name == table
+        ]
+        query = text(
+            "SELECT "
+            + ", ".join(f'"{column}"' for column in columns)
+            + f' FROM "{table}" WHERE "scheduleDateTime" >= :since'
+            + ' AND "scheduleDateTime" < :until'
+        )
+        return pd.read_sql(
+            query,
+            connection,
+            params={"since": since.isoformat(), "until": until.isoformat()},
+        )
+
+    def _read_counts(self, connection, condition) -> pd.DataFrame:
+        counts = pd.read_sql(select(hourly_counts_table).where(condition), connection)
+        counts["hour"] = pd.to_datetime(counts["hour"], utc=True)
+        return counts
+
+    def _read_summary(self, connection) -> pd.DataFrame:
+        summary = pd.read_sql(select(summary_table), connection)
+        summary["window_end"] = pd.to_datetime(summary["window_end"], utc=True)
+        return summary
+
+    def update(self, windowStr: str) -> dict:
+        """
+        Method that counts again the hours touched by the window <windowStr>,
+        whose flights have just been loaded, and moves the rolling sums forward
+        to its last hour. Windows older than the sums (backfills) only update the
+        spans they fall in. Returns the number of hours counted, the rows of the
+        summary and the update time.
+        """
+        start = time.perf_counter()
+        window_start, window_end = window_bounds(windowStr)
+        first_hour, last_hour = window_start.floor("h"), window_end.floor("h")
+        hours = _hours_between(first_hour, last_hour)
+
+        with self.engine.begin() as connection:
+            if self.engine.dialect.name == "postgresql":
+                connection.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"),
+                    {"key": ADVISORY_LOCK_KEY},
+                )
+            # The hours at the edges of the window also hold flights loaded by
+            # the runs before, so they are counted from the tables, not the window
+            counts = hourly_counts(
+                *(
+                    self._read_flights(connection, table, first_hour, last_hour + HOUR)
+                    for table in ("ARRIVALS", "DEPARTURES")
+                )
+            )
+            summary = self._read_summary(connection)
+            previous = None if summary.empty else summary["window_end"].max() - HOUR
+            anchor = last_hour if previous is None else max(previous, last_hour)
+
+            # Spans the sums moved past entirely are summed again from the counts
+            rebuilt = [
+                span
+                for span, size in self.spans.items()
+                if previous is None or anchor - previous >= size * HOUR
+            ]
+            affected = set(hours)
+            for span, size in self.spans.items():
+                if span not in rebuilt:
+                    # The hours that expire and the ones that enter the span
+                    affected.update(
+                        _hours_between(
+                            previous + (1 - size) * HOUR, anchor - size * HOUR
+                        )
+                    )
+                    affected.update(_hours_between(previous + HOUR, anchor))
+            before = self._read_counts(
+                connection,
+                hourly_counts_table.c.hour.in_(
+                    [hour.to_pydatetime() for hour in affected]
+                ),
+            )
+
+            connection.execute(
+                delete(hourly_counts_table).where(
+                    hourly_counts_table.c.hour.in_(
+                        [hour.to_pydatetime() for hour in hours]
+                    )
+                )
+            )
+            if not counts.empty:
+                connection.execute(
+                    hourly_counts_table.insert(), counts.to_dict("records")
+                )
+            after = pd.concat([before[~before["hour"].isin(hours)], counts])
+
+            totals = []
+            for span, size in self.spans.items():
+                if span in rebuilt:
+                    hour = hourly_counts_table.c.hour
+                    span_totals = _totals(
+                        self._read_counts(
+                            connection,
+                            (hour > (anchor - size * HOUR).to_pydatetime())
+                            & (hour <= anchor.to_pydatetime()),
+                        )
+                    )
+                else:
+                    span_totals = (
+                        _totals(summary[summary["span"] == span])
+                        .add(_totals(_in_span(after, anchor, size)), fill_value=0)
+                        .sub(_totals(_in_span(before, previous, size)), fill_value=0)
+                    )
+                totals.append(span_totals.reset_index().assign(span=span))
+
+            summary = pd.concat(totals, ignore_index=True)
+            # Values without flights left in a span are dropped
+            summary = summary[summary["flights"] > 0].astype(
+                {column: "int64" for column in COUNT_COLUMNS}
+            )
+            summary["delay_rate"] = summary["delayed"] / summary["flights"]
+            summary["cancel_rate"] = summary["canceled"] / summary["flights"]
+            summary["window_end"] = (anchor + HOUR).to_pydatetime()
+            connection.execute(delete(summary_table))
+            if not summary.empty:
+                connection.execute(summary_table.insert(), summary.to_dict("records"))
+
+        stats = {
+            "hours": len(hours),
+            "rows": len(summary),
+            "rebuilt": rebuilt,
+            "seconds": time.perf_counter() - start,
+        }
+        logger.info(
+            f"Rolling analytics up to {anchor + HOUR:%Y-%m-%dT%H:%M}Z: counted "
+            f"{stats['hours']} hours, {stats['rows']} summary rows in "
+            f"{stats['seconds']:.3f}s."
+        )
+        return stats
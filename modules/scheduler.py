@@ -0,0 +1,197 @@
+import fcntl
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from config.config import RUN_LOCK_PATH
+from config.logging_config import logger
+
+# (lowest, highest) value of the minute, hour, day of month, month and day of week
+# fields of a cron expression. Day of week 0 (or 7) is Sunday.
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+# A cron expression that matches nothing within this many days is rejected
+CRON_HORIZON_DAYS = 4 * 366
+
+
+def _parse_cron_field(field: str, lowest: int, highest: int) -> set:
+    values = set()
+    for part in field.split(","):
+        expression, _, step = part.partition("/")
+        if expression == "*":
+            start, end = lowest, highest
+        elif "-" in expression:
+            start, end = (int(value) for value in expression.split("-", 1))
+        else:
+            start = int(expression)
+            # "5/15" runs from 5 to the end of the range
+            end = highest if step else start
+        if not lowest <= start <= end <= highest:
+            raise Exception(f"Cron field '{field}' is out of range.")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class IntervalSchedule:
+    """
+    Runs every <seconds> seconds.
+    """
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise Exception("The schedule interval must be positive.")
+        self.interval = timedelta(seconds=seconds)
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + self.interval
+
+    def __str__(self):
+        return f"every {self.interval}"
+
+
+class CronSchedule:
+    """
+    Runs on the minutes matched by a standard 5 field cron expression (minute,
+    hour, day of month, month, day of week), with lists, ranges and steps. Like
+    cron, a day matches when either of the day fields matches if both are
+    restricted.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise Exception(f"'{expression}' is not a 5 field cron expression.")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(field, lowest, highest)
+            for field, (lowest, highest) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        # Python counts weekdays from Monday, cron from Sunday
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        horizon = candidate + timedelta(days=CRON_HORIZON_DAYS)
+        while candidate < horizon:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise Exception(f"Cron expression '{self.expression}' never matches.")
+
+    def __str__(self):
+        return f"cron '{self.expression}'"
+
+
+@contextmanager
+def run_lock(path: str = RUN_LOCK_PATH):
+    """
+    Holds an exclusive lock on <path> while a run is active. Yields False, without
+    waiting, when another process (a daemon or a one-shot run) holds it.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class Daemon:
+    """
+    Keeps the process alive and calls <job> on every slot of <schedule>. Runs
+    never overlap: the next slot is only computed once a run has finished, and
+    slots missed by a long run are skipped. A failed run is logged and the daemon
+    waits for the next slot. SIGTERM and SIGINT let the current run finish and
+    then stop the daemon.
+    """
+
+    def __init__(
+        self, job, schedule, run_immediately: bool = True, lock_path=RUN_LOCK_PATH
+    ):
+        self.job = job
+        self.schedule = schedule
+        self.run_immediately = run_immediately
+        self.lock_path = lock_path
+        self.runs = {"succeeded": 0, "failed": 0, "skipped": 0}
+        self._stop = threading.Event()
+
+    def stop(self, *args):
+        if not self._stop.is_set():
+            logger.info("Stopping the daemon after the current run.")
+        self._stop.set()
+
+    def _install_signal_handlers(self) -> dict:
+        # Signal handlers can only be set from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+        return {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+
+    def _run_once(self):
+        with run_lock(self.lock_path) as acquired:
+            if not acquired:
+                logger.warning("Another run is still active, skipping this slot.")
+                self.runs["skipped"] += 1
+                return
+            started = time.perf_counter()
+            try:
+                self.job()
+                self.runs["succeeded"] += 1
+            except Exception as exc:
+                logger.error(f"Scheduled run failed: {exc}")
+                self.runs["failed"] += 1
+            logger.info(f"Run finished in {time.perf_counter() - started:.1f}s.")
+
+    def run(self) -> dict:
+        """
+        Runs the schedule until stop() is called (or a signal arrives). Returns
+        the number of succeeded, failed and skipped runs.
+        """
+        previous_handlers = self._install_signal_handlers()
+        logger.info(f"Daemon started, running {self.schedule}.")
+        now = datetime.now()
+        next_run = now if self.run_immediately else self.schedule.next_after(now)
+
+        try:
+            while not self._stop.is_set():
+                delay = (next_run - datetime.now()).total_seconds()
+                if delay > 0:
+                    logger.info(f"Next run at {next_run:%Y-%m-%dT%H:%M:%S}.")
+                    if self._stop.wait(delay):
+                        break
+                self._run_once()
+
+                next_run = self.schedule.next_after(next_run)
+                now = datetime.now()
+                if next_run < now:
+                    logger.warning("The run took longer than its slot, skipping ahead.")
+                    next_run = self.schedule.next_after(now)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+        logger.info(f"Daemon stopped: {self.runs}")
+        return self.runs
@@ -0,0 +1,195 @@
+import gc
+import gzip
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from config.config import (
+    CHECKPOINT_DIR,
+    COMPACT_FLIGHT_RECORDS,
+    STAGE_COMPRESSION,
+    STAGE_DIR,
+)
+from config.logging_config import logger
+from modules.flight_records import as_raw, decode_flights_response, encode_json
+
+# Files of a stage directory: the raw flights of the extract stage, and the frames
+# and reports of the process stage with the manifest that lists them
+RAW_FLIGHTS_FILE = "raw_flights.json.gz"
+PROCESSED_DIR = "processed"
+MANIFEST_FILE = "manifest.json"
+CHECKPOINT_FILE = "checkpoint.json"
+# The stage files are short lived, a fast gzip level compresses them 17x already
+RAW_FLIGHTS_COMPRESSLEVEL = 1
+
+
+def _replace_file(path: str, data: bytes):
+    # Written next to the target and renamed, a failed write leaves no half file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+def _arrow_dtype(arrow_type):
+    # List columns (the baggage belts) keep their pyarrow backed dtype, the other
+    # columns get the dtype stored in the pandas metadata of the file
+    import pandas as pd
+    import pyarrow as pa
+
+    return pd.ArrowDtype(arrow_type) if pa.types.is_list(arrow_type) else None
+
+
+@contextmanager
+def _gc_paused():
+    # Decoding a window allocates millions of acyclic containers, which would set
+    # off full garbage collections over and over (about 4x the decoding time)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def save_raw_flights(flights: list, window: str, stage_dir: str = STAGE_DIR) -> str:
+    """
+    Function that writes the raw flights of a window, as gzipped JSON, for the
+    process stage. Returns the path of the file.
+    """
+    os.makedirs(stage_dir, exist_ok=True)
+    path = os.path.join(stage_dir, RAW_FLIGHTS_FILE)
+    content = encode_json(
+        {"window": window, "flights": [as_raw(flight) for flight in flights]}
+    )
+    _replace_file(path, gzip.compress(content, compresslevel=RAW_FLIGHTS_COMPRESSLEVEL))
+    logger.info(f"Wrote {len(flights)} raw flights of {window} to {path}.")
+    return path
+
+
+def load_raw_flights(stage_dir: str = STAGE_DIR) -> tuple[list, str]:
+    """
+    Function that reads back the raw flights written by the extract stage. Returns
+    the flights and their window string.
+    """
+    path = os.path.join(stage_dir, RAW_FLIGHTS_FILE)
+    if not os.path.exists(path):
+        raise Exception(f"No extracted flights in {path}, run the extract stage.")
+    with open(path, "rb") as file, _gc_paused():
+        data = decode_flights_response(
+            gzip.decompress(file.read()), compact=COMPACT_FLIGHT_RECORDS
+        )
+    return data["flights"], data["window"]
+
+
+def save_processed(
+    processed_data: dict,
+    window: str,
+    stage_dir: str = STAGE_DIR,
+    compression: str = STAGE_COMPRESSION,
+) -> str:
+    """
+    Function that writes the frames and the reports of the process stage as Arrow
+    IPC (Feather) files, which keep the categorical, timezone aware and list
+    columns as they are. Uncompressed files can be memory-mapped when read back.
+    Returns the directory of the files.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    directory = os.path.join(stage_dir, PROCESSED_DIR)
+    manifest = {"window": window, "frames": [], "reports": {}}
+    for key, value in processed_data.items():
+        if key == "reports":
+            for group, reports in value.items():
+                os.makedirs(os.path.join(directory, group), exist_ok=True)
+                manifest["reports"][group] = list(reports)
+                for name, df in reports.items():
+                    path = os.path.join(directory, group, name + ".feather")
+                    feather.write_feather(
+                        pa.Table.from_pandas(df), path, compression=compression
+                    )
+        else:
+            os.makedirs(directory, exist_ok=True)
+            manifest["frames"].append(key)
+            path = os.path.join(directory, key + ".feather")
+            feather.write_feather(
+                pa.Table.from_pandas(value), path, compression=compression
+            )
+
+    # Written last, a directory without manifest is an incomplete stage
+    _replace_file(os.path.join(directory, MANIFEST_FILE), json.dumps(manifest).encode())
+    logger.info(f"Wrote the processed frames and reports of {window} to {directory}.")
+    return directory
+
+
+def load_processed(stage_dir: str = STAGE_DIR, reports_only: bool = False):
+    """
+    Function that reads back the frames and the reports written by the process
+    stage, in the layout returned by ETLController.process_data. With
+    <reports_only> the frames are not read. Uncompressed files are memory-mapped,
+    so the columns that need no conversion are not copied. Returns the data and
+    its window.
+    """
+    import pyarrow.feather as feather
+
+    directory = os.path.join(stage_dir, PROCESSED_DIR)
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise Exception(f"No processed data in {directory}, run the process stage.")
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+
+    def read(*parts):
+        path = os.path.join(directory, *parts[:-1], parts[-1] + ".feather")
+        table = feather.read_table(path, memory_map=True)
+        # One block per column, numeric columns stay views of the mapped file
+        return table.to_pandas(types_mapper=_arrow_dtype, split_blocks=True)
+
+    processed_data = {}
+    if not reports_only:
+        for key in manifest["frames"]:
+            processed_data[key] = read(key)
+    processed_data["reports"] = {
+        group: {name: read(group, name) for name in names}
+        for group, names in manifest["reports"].items()
+    }
+    return processed_data, manifest["window"]
+
+
+class RunCheckpoint:
+    """
+    Stages completed by one pipeline run, checkpointed with their stage files under
+    <directory>/<run id>. A failed run resumed with the same run id skips the
+    stages found here and reads their output back from the files.
+    """
+
+    def __init__(self, run_id: str, directory: str = CHECKPOINT_DIR):
+        self.run_id = run_id
+        self.path = os.path.join(directory, run_id)
+        self.window = None
+        self.completed = []
+        state_path = os.path.join(self.path, CHECKPOINT_FILE)
+        if os.path.exists(state_path):
+            with open(state_path) as file:
+                state = json.load(file)
+            self.window, self.completed = state["window"], state["completed"]
+
+    def exists(self) -> bool:
+        return bool(self.completed)
+
+    def done(self, stage: str) -> bool:
+        return stage in self.completed
+
+    def mark_done(self, stage: str, window: str):
+        os.makedirs(self.path, exist_ok=True)
+        self.window = window
+        self.completed.append(stage)
+        state = {"run_id": self.run_id, "window": window, "completed": self.completed}
+        _replace_file(
+            os.path.join(self.path, CHECKPOINT_FILE), json.dumps(state).encode()
+        )
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
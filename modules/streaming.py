@@ -0,0 +1,178 @@
+from collections import Counter
+import pandas as pd
+
+from modules.data_processing import build_flight_frames, destination_frame
+from modules.reference_resolver import join_airline_names, join_destination_cities
+
+
+class StreamingAggregator:
+    """
+    Running aggregates of the flights of a window, folded page by page. Every page
+    is cleaned, counted and can then be dropped, so memory is bounded by the page
+    size and the number of distinct codes, not by the size of the window.
+    """
+
+    def __init__(self):
+        # (state, airline) occurrences
+        self.arrival_states = Counter()
+        self.departure_states = Counter()
+        self.arrival_destinations = Counter()
+        self.departure_destinations = Counter()
+        self.belts = Counter()
+        self.gates = Counter()
+        self.arrival_terminals = Counter()
+        self.departure_terminals = Counter()
+        self.airlines = Counter()
+        self.pages = 0
+        self.rows = {"arrivals": 0, "departures": 0}
+
+    def fold(self, page: list) -> tuple:
+        """
+        Cleans a page of raw flights and adds it to the running aggregates. Returns
+        the page's arrivals, arrival destinations, departures and departure
+        destinations frames.
+        """
+        frames = build_flight_frames(page)
+        df_arrivals, df_destinations_arr, df_departures, df_destinations_dep = frames
+
+        self.pages += 1
+        self.rows["arrivals"] += len(df_arrivals)
+        self.rows["departures"] += len(df_departures)
+
+        self.arrival_states.update(
+            zip(df_arrivals["state"].tolist(), df_arrivals["airline"].tolist())
+        )
+        self.departure_states.update(
+            zip(df_departures["state"].tolist(), df_departures["airline"].tolist())
+        )
+        for destinations, df in (
+            (self.arrival_destinations, df_destinations_arr),
+            (self.departure_destinations, df_destinations_dep),
+        ):
+            destinations.update(dict(zip(df["destination"], df["flights"].tolist())))
+        for belts in df_arrivals["baggageClaimBelts"].tolist():
+            self.belts.update(belts)
+        self.gates.update(df_departures["gate"].tolist())
+        self.arrival_terminals.update(df_arrivals["terminal"].tolist())
+        self.departure_terminals.update(df_departures["terminal"].tolist())
+        for df in (df_arrivals, df_departures):
+            self.airlines.update(df.loc[df["airline"] != "", "airline"].tolist())
+
+        return frames
+
+    def _top_state(self, states: Counter, state: str, top_n: int) -> Counter:
+        return Counter(
+            {airline: count for (s, airline), count in states.items() if s == state}
+        ).most_common(top_n)
+
+    def reference_codes(
+        self, top_airlines: int, top_destinations: int, top_facilities: int
+    ) -> tuple[set, set]:
+        """
+        Returns the airline and destination codes the reports will need.
+        """
+        airline_codes = set()
+        for states, state in (
+            (self.arrival_states, "LND"),
+            (self.arrival_states, "DIV"),
+            (self.departure_states, "DEL"),
+            (self.departure_states, "CNX"),
+        ):
+            airline_codes.update(
+                code for code, _ in self._top_state(states, state, top_airlines)
+            )
+        airline_codes.update(
+            code for code, _ in self.airlines.most_common(top_facilities)
+        )
+        iata_codes = {
+            code
+            for destinations in (
+                self.arrival_destinations,
+                self.departure_destinations,
+            )
+            for code, _ in destinations.most_common(top_destinations)
+        }
+        return airline_codes, iata_codes
+
+    def destination_frames(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Destination counts of the window, in the long layout of the batch path.
+        """
+        return (
+            destination_frame(pd.Series(self.arrival_destinations, dtype="int64"), "A"),
+            destination_frame(
+                pd.Series(self.departure_destinations, dtype="int64"), "D"
+            ),
+        )
+
+    def reports(
+        self,
+        top_airlines: int,
+        top_destinations: int,
+        top_facilities: int,
+        window: str,
+        lookup: dict = None,
+    ) -> dict:
+        """
+        Builds the same reports as ETLController.process_data from the aggregates.
+        """
+
+        def airline_report(states, state):
+            df = pd.DataFrame(
+                self._top_state(states, state, top_airlines),
+                columns=["airline", "count"],
+            )
+            df["airline"] = join_airline_names(df["airline"], lookup)
+            return df
+
+        def destination_report(destinations):
+            df = pd.DataFrame(
+                destinations.most_common(top_destinations),
+                columns=["destination", "flights"],
+            )
+            df["destination"] = join_destination_cities(df["destination"], lookup)
+            return df
+
+        def facility_report(counts, column):
+            df = pd.DataFrame(
+                counts.most_common(top_facilities), columns=[column, "count"]
+            )
+            df.loc[:, "window"] = window
+            return df
+
+        busiest_airlines = pd.DataFrame(
+            self.airlines.most_common(top_facilities), columns=["airline", "count"]
+        )
+        busiest_airlines["airline"] = join_airline_names(
+            busiest_airlines["airline"], lookup
+        )
+        busiest_airlines = busiest_airlines[["count", "airline"]]
+        busiest_airlines.loc[:, "window"] = window
+
+        return {
+            "arrivals": {
+                "most_landed": airline_report(self.arrival_states, "LND"),
+                "most_diverted": airline_report(self.arrival_states, "DIV"),
+                "most_popular_destinations": destination_report(
+                    self.arrival_destinations
+                ),
+            },
+            "departures": {
+                "most_delayed": airline_report(self.departure_states, "DEL"),
+                "most_canceled": airline_report(self.departure_states, "CNX"),
+                "most_popular_destinations": destination_report(
+                    self.departure_destinations
+                ),
+            },
+            "facilities": {
+                "busy_belts": facility_report(self.belts, "beltID"),
+                "busy_gates": facility_report(self.gates, "gate"),
+                "busiest_arrivals_terminals": facility_report(
+                    self.arrival_terminals, "terminal"
+                ),
+                "busiest_departure_terminals": facility_report(
+                    self.departure_terminals, "terminal"
+                ),
+                "busiest_airlines": busiest_airlines,
+            },
+        }
@@ -1,18 +1,81 @@
--- Create empty table for arrivals
-CREATE TABLE IF NOT EXISTS ARRIVALS (
-    name VARCHAR(255) PRIMARY KEY
-);
--- Create empty destinations table for arrivals
-CREATE TABLE IF NOT EXISTS DESTINATIONS_ARRIVALS (
-    name VARCHAR(255) PRIMARY KEY
+-- Flight tables, one row per flight (natural key: flight name + scheduled time).
+-- Both are range partitioned by month on the scheduled time, the monthly
+-- partitions are created by the loader when the first flight of a month arrives.
+-- The destination counts are kept per window, in one row per destination.
+-- The rolling analytics tables are kept up to date by rolling_analytics.py.
+
+-- Arrivals
+CREATE TABLE IF NOT EXISTS "ARRIVALS" (
+    flight_name VARCHAR(16) NOT NULL,
+    "scheduleDateTime" TIMESTAMPTZ NOT NULL,
+    airline VARCHAR(8),
+    terminal SMALLINT,
+    state VARCHAR(8),
+    "estimatedLandingTime" TIMESTAMPTZ,
+    "actualLandingTime" TIMESTAMPTZ,
+    "expectedTimeOnBelt" TIMESTAMPTZ,
+    "baggageClaimBelts" SMALLINT[],
+    PRIMARY KEY (flight_name, "scheduleDateTime")
+) PARTITION BY RANGE ("scheduleDateTime");
+CREATE INDEX IF NOT EXISTS "ARRIVALS_airline_idx" ON "ARRIVALS" (airline);
+CREATE INDEX IF NOT EXISTS "ARRIVALS_state_idx" ON "ARRIVALS" (state);
+CREATE INDEX IF NOT EXISTS "ARRIVALS_terminal_idx" ON "ARRIVALS" (terminal);
+CREATE INDEX IF NOT EXISTS "ARRIVALS_schedule_idx" ON "ARRIVALS" ("scheduleDateTime");
+
+-- Departures
+CREATE TABLE IF NOT EXISTS "DEPARTURES" (
+    flight_name VARCHAR(16) NOT NULL,
+    "scheduleDateTime" TIMESTAMPTZ NOT NULL,
+    airline VARCHAR(8),
+    terminal SMALLINT,
+    state VARCHAR(8),
+    gate VARCHAR(8),
+    "expectedTimeGateOpen" TIMESTAMPTZ,
+    "expectedTimeBoarding" TIMESTAMPTZ,
+    "expectedTimeGateClosing" TIMESTAMPTZ,
+    "actualOffBlockTime" TIMESTAMPTZ,
+    PRIMARY KEY (flight_name, "scheduleDateTime")
+) PARTITION BY RANGE ("scheduleDateTime");
+CREATE INDEX IF NOT EXISTS "DEPARTURES_airline_idx" ON "DEPARTURES" (airline);
+CREATE INDEX IF NOT EXISTS "DEPARTURES_state_idx" ON "DEPARTURES" (state);
+CREATE INDEX IF NOT EXISTS "DEPARTURES_terminal_idx" ON "DEPARTURES" (terminal);
+CREATE INDEX IF NOT EXISTS "DEPARTURES_gate_idx" ON "DEPARTURES" (gate);
+CREATE INDEX IF NOT EXISTS "DEPARTURES_schedule_idx" ON "DEPARTURES" ("scheduleDateTime");
+
+-- Destinations: flights per window, direction ('A' arrivals, 'D' departures) and
+-- destination. The index answers the top destinations of a window in order.
+CREATE TABLE IF NOT EXISTS "DESTINATIONS" (
+    "window" VARCHAR(40) NOT NULL,
+    direction CHAR(1) NOT NULL,
+    destination VARCHAR(8) NOT NULL,
+    flights INTEGER NOT NULL,
+    PRIMARY KEY ("window", direction, destination)
 );
+CREATE INDEX IF NOT EXISTS "DESTINATIONS_top_idx"
+    ON "DESTINATIONS" ("window", direction, flights DESC);
 
--- Create empty table for departures
-CREATE TABLE IF NOT EXISTS DEPARTURES (
-    name VARCHAR(255) PRIMARY KEY
+-- Rolling analytics: flights, delayed and canceled flights per scheduled hour and
+-- value of a dimension (airline, terminal, gate, belt)
+CREATE TABLE IF NOT EXISTS "ROLLING_HOURLY_COUNTS" (
+    hour TIMESTAMPTZ NOT NULL,
+    dimension VARCHAR(24) NOT NULL,
+    value VARCHAR(16) NOT NULL,
+    flights INTEGER NOT NULL,
+    delayed INTEGER NOT NULL,
+    canceled INTEGER NOT NULL,
+    PRIMARY KEY (hour, dimension, value)
 );
 
--- Create empty destinations table for departures
-CREATE TABLE IF NOT EXISTS DESTINATIONS_DEPARTURES (
-    name VARCHAR(255) PRIMARY KEY
+-- Their sums over the last 1h, 24h and 7d up to window_end, with the rates
+CREATE TABLE IF NOT EXISTS "ROLLING_ANALYTICS" (
+    span VARCHAR(8) NOT NULL,
+    dimension VARCHAR(24) NOT NULL,
+    value VARCHAR(16) NOT NULL,
+    flights INTEGER NOT NULL,
+    delayed INTEGER NOT NULL,
+    canceled INTEGER NOT NULL,
+    delay_rate REAL NOT NULL,
+    cancel_rate REAL NOT NULL,
+    window_end TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (span, dimension, value)
 );
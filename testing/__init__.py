@@ -0,0 +1 @@
+# testing/__init__.py
@@ -0,0 +1,99 @@
+"""
+Record/replay fixtures of the Schiphol API. A fixture holds the pages of
+`/flights` and the `/airlines/{code}` and `/destinations/{iata}` responses of one
+window, recorded from the live API or synthesized, and is served back offline by
+StubSchipholServer(fixture=...).
+"""
+
+import gzip
+import json
+
+from testing.synthetic import AIRLINES, DESTINATIONS, iter_flight_pages
+from modules.data_fetching import SchipholDataFetcher
+
+
+class ApiFixture:
+    """
+    Recorded responses of the flights, airlines and destinations endpoints. The
+    flights pages past the recorded ones answer 204 and unknown codes 404, like
+    the API does.
+    """
+
+    def __init__(self, flight_pages=None, airlines=None, destinations=None):
+        self.flight_pages = flight_pages or []
+        self.airlines = airlines or {}
+        self.destinations = destinations or {}
+
+    @classmethod
+    def synthetic(cls, count: int, page_size: int = 20, **kwargs):
+        """
+        Fixture of <count> synthetic flights, with the airline and destination
+        details of every code they use.
+        """
+        return cls(
+            list(iter_flight_pages(count, page_size, **kwargs)),
+            {
+                code: {"icao": code, "publicName": f"Airline {code}"}
+                for code in AIRLINES
+            },
+            {iata: {"iata": iata, "city": f"City {iata}"} for iata in DESTINATIONS},
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        with gzip.open(path, "rt") as file:
+            fixture = json.load(file)
+        return cls(fixture["flights"], fixture["airlines"], fixture["destinations"])
+
+    def save(self, path: str):
+        with gzip.open(path, "wt") as file:
+            json.dump(
+                {
+                    "flights": self.flight_pages,
+                    "airlines": self.airlines,
+                    "destinations": self.destinations,
+                },
+                file,
+            )
+
+    @property
+    def flights(self) -> list:
+        return [flight for page in self.flight_pages for flight in page]
+
+    def response(self, resource: str, page: int = 0) -> tuple:
+        """
+        Returns the status code and body recorded for <resource>
+        ("flights", "airlines/KLM", "destinations/LHR").
+        """
+        if resource == "flights":
+            if page >= len(self.flight_pages):
+                return 204, None
+            return 200, {"flights": self.flight_pages[page]}
+        kind, _, code = resource.partition("/")
+        recorded = {"airlines": self.airlines, "destinations": self.destinations}
+        body = recorded.get(kind, {}).get(code)
+        return (200, body) if body is not None else (404, None)
+
+
+class RecordingFetcher(SchipholDataFetcher):
+    """
+    SchipholDataFetcher that keeps every decoded response in a fixture.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fixture = ApiFixture()
+
+    def _fetch_data_from_api(self, endpoint, params=None):
+        data = super()._fetch_data_from_api(endpoint, params)
+        if data is None:
+            return None
+        if endpoint == "flights":
+            page = params["page"]
+            pages = self.fixture.flight_pages
+            pages.extend([] for _ in range(page + 1 - len(pages)))
+            pages[page] = data["flights"]
+        else:
+            kind, _, code = endpoint.partition("/")
+            getattr(self.fixture, kind)[code] = data
+        return data
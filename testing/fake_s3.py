@@ -0,0 +1,52 @@
+import threading
+import time
+
+
+class FakeS3Client:
+    """
+    In-memory stand-in for the boto3 S3 client calls used by the uploader.
+    """
+
+    def __init__(self, latency=0.0, fail_keys=()):
+        self.latency = latency
+        self.fail_keys = set(fail_keys)
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def _call(self, key):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self.lock:
+            self.active -= 1
+        if key in self.fail_keys:
+            raise RuntimeError(f"upload of {key} failed")
+
+    def put_object(self, Body, Bucket, Key):
+        self._call(Key)
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Body, Bucket, Key, PartNumber, UploadId):
+        self._call(Key)
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[(Bucket, Key)] = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(Key)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for many concurrent clients without connection resets
+    request_queue_size = 128
+
+
+class StubSchipholServer:
+    """
+    Local stand-in for the Schiphol API that answers every request after a fixed
+    latency. The flights endpoint serves <num_pages> pages of <page_size> flights
+    and then replies with 204, like the real API does at the end of the data.
+    The first <flaky_count> requests of every distinct URL are answered with
+    <flaky_status> to simulate rate limiting or server errors. With a <fixture>
+    (testing.api_fixture.ApiFixture) its recorded responses are served instead.
+    With <etags> every response carries an ETag and conditional requests for an
+    unchanged body are answered with 304.
+    """
+
+    def __init__(
+        self,
+        num_pages=10,
+        page_size=20,
+        latency=0.05,
+        flaky_status=503,
+        flaky_count=0,
+        fixture=None,
+        etags=False,
+    ):
+        self.fixture = fixture
+        self.etags = etags
+        self.not_modified_count = 0
+        self.num_pages = num_pages
+        self.page_size = page_size
+        self.latency = latency
+        self.flaky_status = flaky_status
+        self.flaky_count = flaky_count
+        self.request_count = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/public-flights"
+
+    def flights_page(self, page: int) -> list:
+        return [
+            {"flightName": f"STB{page:03d}{i:03d}", "page": page}
+            for i in range(self.page_size)
+        ]
+
+    def response(self, resource: str, page: int) -> tuple:
+        if self.fixture is not None:
+            return self.fixture.response(resource, page)
+        if resource == "flights":
+            if page >= self.num_pages:
+                return 204, None
+            return 200, {"flights": self.flights_page(page)}
+        if resource.startswith("airlines/"):
+            code = resource.split("/", 1)[1]
+            return 200, {"icao": code, "publicName": f"Airline {code}"}
+        if resource.startswith("destinations/"):
+            iata = resource.split("/", 1)[1]
+            return 200, {"iata": iata, "city": f"City {iata}"}
+        return 404, None
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                    attempt = stub._attempts.get(self.path, 0)
+                    stub._attempts[self.path] = attempt + 1
+                time.sleep(stub.latency)
+
+                if attempt < stub.flaky_count:
+                    self.send_response(stub.flaky_status)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                url = urlparse(self.path)
+                resource = url.path.split("/public-flights/", 1)[-1]
+                page = int(parse_qs(url.query).get("page", ["0"])[0])
+                status, body = stub.response(resource, page)
+                if status != 200:
+                    self.send_response(status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                payload = json.dumps(body).encode()
+                etag = f'"{hashlib.md5(payload).hexdigest()}"'
+                if stub.etags and self.headers.get("If-None-Match") == etag:
+                    with stub._lock:
+                        stub.not_modified_count += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                if stub.etags:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                # Keep the benchmark output clean
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,149 @@
+import random
+from datetime import datetime, timedelta
+
+AIRLINES = ["KLM", "TRA", "EZY", "DAL", "BAW", "AFR", "DLH", "RYR", "UAE", "CXA"]
+DESTINATIONS = ["LHR", "CDG", "JFK", "BCN", "FCO", "DXB", "ATL", "MAD", "IST", "OSL"]
+ARRIVAL_STATES = ["LND", "EXP", "FIR", "AIR", "DIV", "SCH"]
+DEPARTURE_STATES = ["DEL", "CNX", "BRD", "GTO", "DEP", "SCH"]
+GATES = ["D7", "D12", "B20", "C10", "E18", "F4", "G3", "H1", "M7"]
+BELTS = ["11", "12", "13", "14", "15", "16", "21", "22"]
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000+01:00"
+
+
+def generate_flights(
+    count: int,
+    start: datetime = datetime(2024, 1, 1, 6),
+    window_hours: float = 4,
+    missing_ratio: float = 0.1,
+    seed: int = 42,
+) -> list:
+    """
+    Generates <count> raw flights shaped like the v4 `/flights` payload, scheduled
+    over <window_hours> from <start>. Optional fields are left out for roughly
+    <missing_ratio> of the flights, so the completeness filtering has work to do.
+    """
+    return [
+        flight
+        for page in iter_flight_pages(
+            count, count or 1, start, window_hours, missing_ratio, seed
+        )
+        for flight in page
+    ]
+
+
+def iter_flight_pages(
+    count: int,
+    page_size: int = 20,
+    start: datetime = datetime(2024, 1, 1, 6),
+    window_hours: float = 4,
+    missing_ratio: float = 0.1,
+    seed: int = 42,
+):
+    """
+    Generator over the same flights as generate_flights, in pages of <page_size>
+    like the API serves them. Only one page is held in memory at a time, so
+    payloads of millions of flights can be streamed.
+    """
+    rng = random.Random(seed)
+    step = window_hours * 3600 / max(count, 1)
+    for page_start in range(0, count, page_size):
+        yield [
+            _make_flight(rng, i, start + timedelta(seconds=i * step), missing_ratio)
+            for i in range(page_start, min(page_start + page_size, count))
+        ]
+
+
+def _make_flight(
+    rng: random.Random, i: int, scheduled: datetime, missing_ratio: float
+) -> dict:
+    arrival = rng.random() < 0.5
+    airline = rng.choice(AIRLINES)
+    flight = {
+        "id": str(100000000000000000 + i),
+        "flightName": f"{airline[:2]}{i:06d}",
+        "flightDirection": "A" if arrival else "D",
+        "schemaVersion": "4",
+        "scheduleDateTime": scheduled.strftime(TIME_FORMAT),
+        "scheduleDate": scheduled.strftime("%Y-%m-%d"),
+        "scheduleTime": scheduled.strftime("%H:%M:%S"),
+        "lastUpdatedAt": (scheduled - timedelta(minutes=30)).strftime(TIME_FORMAT),
+        "publicFlightState": {
+            "flightStates": [
+                rng.choice(ARRIVAL_STATES if arrival else DEPARTURE_STATES)
+            ]
+        },
+        "route": {
+            "destinations": rng.sample(DESTINATIONS, rng.choice((1, 1, 1, 2))),
+            "eu": "S",
+            "visa": False,
+        },
+        "prefixICAO": airline,
+        "prefixIATA": airline[:2],
+        "terminal": rng.choice((1, 2, 3)),
+        "aircraftType": {"iataMain": "73H", "iataSub": "73H"},
+        "serviceType": "J",
+        # Fields the pipeline never reads, they only weigh on decoding and memory
+        "aircraftRegistration": f"PH{i % 900:04d}",
+        "airlineCode": 100 + i % 50,
+        "flightNumber": i % 10000,
+        "mainFlight": f"{airline[:2]}{i:06d}",
+        "isOperationalFlight": True,
+        "codeshares": {"codeshares": [f"DL{i % 9000:04d}", f"AF{i % 7000:04d}"]},
+        "transferPositions": {"transferPositions": [i % 90, i % 90 + 1]},
+        "checkinAllocations": {
+            "checkinAllocations": [
+                {
+                    "startTime": scheduled.strftime(TIME_FORMAT),
+                    "endTime": scheduled.strftime(TIME_FORMAT),
+                    "rows": {
+                        "rows": [
+                            {
+                                "position": str(i % 30),
+                                "desks": {
+                                    "desks": [
+                                        {
+                                            "checkinClass": {
+                                                "code": "ECO",
+                                                "description": "Economy",
+                                            },
+                                            "position": i % 12,
+                                        }
+                                    ]
+                                },
+                            }
+                        ]
+                    },
+                }
+            ],
+            "remarks": {"remarks": []},
+        },
+    }
+    times = {
+        offset: (scheduled + timedelta(minutes=offset)).strftime(TIME_FORMAT)
+        for offset in (-40, -30, -20, 0, 5, 25)
+    }
+    if arrival:
+        flight.update(
+            {
+                "estimatedLandingTime": times[0],
+                "actualLandingTime": times[5],
+                "expectedTimeOnBelt": times[25],
+                "baggageClaim": {"belts": rng.sample(BELTS, rng.choice((1, 2)))},
+            }
+        )
+        optional = ["estimatedLandingTime", "expectedTimeOnBelt", "baggageClaim"]
+    else:
+        flight.update(
+            {
+                "gate": rng.choice(GATES),
+                "expectedTimeGateOpen": times[-40],
+                "expectedTimeBoarding": times[-30],
+                "expectedTimeGateClosing": times[-20],
+                "actualOffBlockTime": times[5],
+            }
+        )
+        optional = ["gate", "expectedTimeBoarding", "actualOffBlockTime"]
+    optional += ["terminal", "prefixICAO"]
+    if rng.random() < missing_ratio:
+        del flight[rng.choice(optional)]
+    return flight
@@ -0,0 +1,76 @@
+import unittest
+from unittest import mock
+import pandas as pd
+from testing.synthetic import generate_flights
+from modules.data_processing import (
+    aggregate_flight_frame,
+    build_flight_frames,
+    filter_dataframe,
+    optimize_flight_frame,
+)
+
+LOOKUP = {"airlines": {}, "destinations": {}}
+
+
+class TestAggregation(unittest.TestCase):
+
+    def setUp(self):
+        df_arrivals, _, df_departures, _ = build_flight_frames(generate_flights(4000))
+        self.plain = (df_arrivals, df_departures)
+        self.compact = (
+            optimize_flight_frame(df_arrivals),
+            optimize_flight_frame(df_departures),
+        )
+
+    def _as_dict(self, counts):
+        return {key: int(count) for key, count in counts.items()}
+
+    def test_state_reports_match_per_report_counting(self):
+        for frames in (self.plain, self.compact):
+            for df, states in zip(frames, (("LND", "DIV"), ("DEL", "CNX"))):
+                aggregates = aggregate_flight_frame(df)
+                for state in states:
+                    expected = filter_dataframe(
+                        df, "state", state, "airline", 5, LOOKUP
+                    )
+                    result = filter_dataframe(
+                        df, "state", state, "airline", 5, LOOKUP, aggregates
+                    )
+                    self.assertEqual(
+                        result["count"].tolist(), expected["count"].tolist()
+                    )
+
+    def test_dimension_tables_match_value_counts(self):
+        for df_arrivals, df_departures in (self.plain, self.compact):
+            aggregates = aggregate_flight_frame(df_departures)
+            for column, table in (("terminal", "terminals"), ("gate", "gates")):
+                expected = df_departures[column].value_counts()
+                self.assertEqual(
+                    self._as_dict(aggregates[table]),
+                    self._as_dict(expected[expected > 0]),
+                )
+            self.assertEqual(
+                aggregates["airlines"].sum()
+                + aggregate_flight_frame(df_arrivals)["airlines"].sum(),
+                len(df_arrivals) + len(df_departures),
+            )
+
+    def test_large_combination_spaces_fall_back_to_groupby(self):
+        df = self.compact[1]
+        dense = aggregate_flight_frame(df)
+        with mock.patch("modules.data_processing.DENSE_AGGREGATE_CELLS", 0):
+            grouped = aggregate_flight_frame(df)
+        for table in ("states", "airlines", "terminals", "gates"):
+            self.assertEqual(
+                self._as_dict(grouped[table]), self._as_dict(dense[table]), table
+            )
+
+    def test_empty_frame(self):
+        df = pd.DataFrame([], columns=list(self.plain[1].columns))
+        aggregates = aggregate_flight_frame(df)
+        self.assertTrue(aggregates["states"].empty)
+        self.assertTrue(aggregates["gates"].empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+from unittest import mock
+from testing.stub_server import StubSchipholServer
+from modules import async_fetching
+from modules import etl_controller
+from modules.async_fetching import AsyncSchipholDataFetcher
+from modules.data_fetching import SchipholDataFetcher
+from modules.reference_cache import ReferenceCache
+from modules.reference_resolver import resolve_reference_data_async
+
+
+@unittest.skipIf(async_fetching.aiohttp is None, "aiohttp is not installed")
+class TestAsyncFetching(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubSchipholServer(num_pages=7, page_size=3, latency=0.01).start()
+        cache = mock.patch("modules.async_fetching.get_reference_cache")
+        cache.start().return_value = ReferenceCache(path="")
+        self.addCleanup(cache.stop)
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def _fetcher(self, concurrency=4):
+        fetcher = AsyncSchipholDataFetcher(concurrency=concurrency)
+        fetcher.base_url = self.stub.base_url
+        return fetcher
+
+    def test_pages_match_the_sync_fetcher(self):
+        async def fetch():
+            async with self._fetcher() as fetcher:
+                return await fetcher.fetch_flights_data(
+                    "2024-01-01T00:00:00", "2024-01-01T04:00:00"
+                )
+
+        sync_fetcher = SchipholDataFetcher(concurrency=1)
+        sync_fetcher.base_url = self.stub.base_url
+        expected = sync_fetcher.fetch_flights_data(
+            "2024-01-01T00:00:00", "2024-01-01T04:00:00"
+        )
+        self.assertEqual(asyncio.run(fetch()), expected)
+
+    def test_lookups_share_one_session(self):
+        async def resolve():
+            async with self._fetcher() as fetcher:
+                lookup = await resolve_reference_data_async(
+                    fetcher, ["KLM", "EZY", "KLM"], ["LHR", "CDG"]
+                )
+                return lookup, fetcher.stats
+
+        lookup, stats = asyncio.run(resolve())
+        self.assertEqual(lookup["airlines"]["EZY"], "Airline EZY")
+        self.assertEqual(lookup["destinations"]["CDG"], "City CDG")
+        self.assertEqual(stats["requests"], 4)
+
+    def test_controller_drives_one_event_loop(self):
+        controller = etl_controller.ETLController()
+        with mock.patch("modules.etl_controller.ASYNC_FETCHING", True), mock.patch(
+            "modules.async_fetching.AsyncSchipholDataFetcher",
+            lambda **kwargs: self._fetcher(),
+        ):
+            with controller._event_loop():
+                loop, fetcher = controller._async_client
+                flights, _ = loop.run_until_complete(
+                    async_fetching.fetch_flights_data(fetcher)
+                )
+                lookup = controller._lookup({"KLM"}, {"LHR"})
+                session = fetcher.session
+            self.assertIsNone(controller._async_client)
+        self.assertEqual(len(flights), 21)
+        self.assertEqual(lookup["airlines"], {"KLM": "Airline KLM"})
+        self.assertTrue(session.closed)
+        self.assertTrue(loop.is_closed())
+
+
+if __name__ == "__main__":
+    unittest.main()
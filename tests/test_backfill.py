@@ -0,0 +1,153 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+from modules import data_fetching
+from modules.backfill import BackfillLog, run_backfill, split_windows, window_id
+from modules.rate_limiter import RateLimiter
+from modules.scheduler import run_lock
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 2)
+FAILING_WINDOW = window_id(datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 12))
+
+
+def _run(start, end):
+    return {"flights": 1, "rate_limited": data_fetching._rate_limiter is not None}
+
+
+def _run_or_fail(start, end):
+    if window_id(start, end) == FAILING_WINDOW:
+        raise RuntimeError("API unavailable")
+    return _run(start, end)
+
+
+def _acquire(rate_limiter, count):
+    for _ in range(count):
+        rate_limiter.acquire()
+
+
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log = BackfillLog(os.path.join(self.tmp_dir.name, "backfill.jsonl"))
+        self.lock_path = os.path.join(self.tmp_dir.name, "etl.lock")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_split_windows(self):
+        windows = split_windows(START, datetime(2024, 1, 1, 10), 4)
+        self.assertEqual(
+            windows,
+            [
+                (START, datetime(2024, 1, 1, 4)),
+                (datetime(2024, 1, 1, 4), datetime(2024, 1, 1, 8)),
+                (datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 10)),
+            ],
+        )
+
+    def test_windows_run_in_worker_processes(self):
+        summary = run_backfill(
+            START,
+            END,
+            4,
+            workers=2,
+            rate_limit=100,
+            log=self.log,
+            runner=_run,
+            lock_path=self.lock_path,
+        )
+        self.assertEqual(len(summary["completed"]), 6)
+        self.assertEqual(self.log.completed(), set(summary["completed"]))
+        with open(self.log.path) as file:
+            entries = [json.loads(line) for line in file]
+        self.assertTrue(all(entry["rate_limited"] for entry in entries))
+
+    def test_failed_windows_are_resumed(self):
+        summary = run_backfill(
+            START,
+            END,
+            4,
+            workers=1,
+            log=self.log,
+            runner=_run_or_fail,
+            lock_path=self.lock_path,
+        )
+        self.assertEqual(list(summary["failed"]), [FAILING_WINDOW])
+        self.assertEqual(len(summary["completed"]), 5)
+
+        summary = run_backfill(
+            START,
+            END,
+            4,
+            workers=1,
+            log=self.log,
+            runner=_run,
+            lock_path=self.lock_path,
+        )
+        self.assertEqual(summary["completed"], [FAILING_WINDOW])
+        self.assertEqual(len(summary["skipped"]), 5)
+        self.assertIsNone(data_fetching._rate_limiter)
+
+    def test_backfill_waits_for_no_other_run(self):
+        with run_lock(self.lock_path):
+            with self.assertRaises(Exception):
+                run_backfill(
+                    START,
+                    END,
+                    4,
+                    workers=1,
+                    log=self.log,
+                    runner=_run,
+                    lock_path=self.lock_path,
+                )
+        self.assertEqual(self.log.completed(), set())
+
+    def test_backfill_needs_upsert_mode(self):
+        with mock.patch("modules.backfill.DB_LOAD_MODE", "replace"):
+            with self.assertRaises(Exception):
+                run_backfill(
+                    START,
+                    END,
+                    4,
+                    workers=1,
+                    log=self.log,
+                    runner=_run,
+                    lock_path=self.lock_path,
+                )
+        self.assertEqual(self.log.completed(), set())
+
+    def test_shared_fetchers_follow_the_process_limiter(self):
+        fetcher = data_fetching._get_flights_fetcher()
+        rate_limiter = RateLimiter(100)
+        data_fetching.set_rate_limiter(rate_limiter)
+        try:
+            self.assertIs(fetcher._request_limiter(), rate_limiter)
+        finally:
+            data_fetching.set_rate_limiter(None)
+        # Cleared once the backfill is done
+        self.assertIsNone(fetcher._request_limiter())
+
+    def test_rate_budget_is_shared_between_processes(self):
+        rate_limiter = RateLimiter(50)
+        processes = [
+            multiprocessing.Process(target=_acquire, args=(rate_limiter, 10))
+            for _ in range(2)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        # 20 requests at 50 per second take at least 19 intervals
+        self.assertGreaterEqual(time.perf_counter() - start, 19 / 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
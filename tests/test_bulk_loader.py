@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from sqlalchemy import create_engine, inspect
+from testing.synthetic import generate_flights
+from modules.bulk_loader import bulk_load_frame, insert_frame
+from modules.data_processing import build_flight_frames, optimize_flight_frame
+from modules.database_handler import FLIGHT_KEY_COLUMNS, create_tables
+
+
+class TestBulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp_dir.name, "test.sqlite")
+        self.engine = create_engine(f"sqlite:///{path}")
+        df_arrivals, _, _, _ = build_flight_frames(generate_flights(500))
+        self.df_arrivals = optimize_flight_frame(df_arrivals)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def _read(self, table_name):
+        return pd.read_sql(f'SELECT * FROM "{table_name}"', self.engine)
+
+    def test_replaces_the_rows(self):
+        create_tables(self.engine)
+        bulk_load_frame(self.engine, "ARRIVALS", self.df_arrivals.iloc[::2])
+        stats = bulk_load_frame(self.engine, "ARRIVALS", self.df_arrivals)
+
+        stored = self._read("ARRIVALS")
+        self.assertEqual(stats["rows"], len(self.df_arrivals))
+        self.assertEqual(len(stored), len(self.df_arrivals))
+        self.assertEqual(
+            set(stored["flight_name"]), set(self.df_arrivals["flight_name"])
+        )
+        belts = self.df_arrivals["baggageClaimBelts"].iloc[0]
+        self.assertIn(
+            "{" + ",".join(str(belt) for belt in belts) + "}",
+            set(stored["baggageClaimBelts"]),
+        )
+
+    def test_keeps_the_schema(self):
+        create_tables(self.engine)
+        before = inspect(self.engine)
+        indexes = before.get_indexes("ARRIVALS")
+        bulk_load_frame(self.engine, "ARRIVALS", self.df_arrivals)
+
+        after = inspect(self.engine)
+        self.assertEqual(
+            after.get_pk_constraint("ARRIVALS")["constrained_columns"],
+            list(FLIGHT_KEY_COLUMNS),
+        )
+        self.assertEqual(after.get_indexes("ARRIVALS"), indexes)
+        self.assertFalse(after.has_table("ARRIVALS_staging"))
+
+    def test_to_sql_method_keeps_the_schema(self):
+        create_tables(self.engine)
+        indexes = inspect(self.engine).get_indexes("ARRIVALS")
+        insert_frame(self.engine, "ARRIVALS", self.df_arrivals.iloc[::2])
+        stats = insert_frame(self.engine, "ARRIVALS", self.df_arrivals)
+
+        self.assertEqual(stats["rows"], len(self._read("ARRIVALS")))
+        after = inspect(self.engine)
+        self.assertEqual(
+            after.get_pk_constraint("ARRIVALS")["constrained_columns"],
+            list(FLIGHT_KEY_COLUMNS),
+        )
+        self.assertEqual(after.get_indexes("ARRIVALS"), indexes)
+
+    def test_creates_missing_tables(self):
+        stats = bulk_load_frame(self.engine, "ARRIVALS", self.df_arrivals)
+        stored = self._read("ARRIVALS")
+        self.assertEqual(stats["rows"], len(stored))
+        self.assertEqual(list(stored.columns), list(self.df_arrivals.columns))
+
+    def test_failed_load_keeps_the_previous_rows(self):
+        create_tables(self.engine)
+        bulk_load_frame(self.engine, "ARRIVALS", self.df_arrivals.iloc[:10])
+        with mock.patch.object(
+            pd.DataFrame, "to_sql", side_effect=RuntimeError("load failed")
+        ):
+            with self.assertRaises(RuntimeError):
+                bulk_load_frame(self.engine, "ARRIVALS", self.df_arrivals)
+        self.assertEqual(len(self._read("ARRIVALS")), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
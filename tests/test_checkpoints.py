@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from testing.synthetic import generate_flights
+from modules.etl_controller import ETLController
+from modules.reference_cache import ReferenceCache
+from modules.stage_files import RunCheckpoint
+
+WINDOW = "2024-01-01T06:00:00_2024-01-01T10:00:00"
+
+
+def _airline(code):
+    return {"publicName": f"Airline {code}"}
+
+
+def _destination(iata):
+    return {"city": f"City {iata}"}
+
+
+@mock.patch("modules.reference_resolver.fetch_destination", side_effect=_destination)
+@mock.patch("modules.reference_resolver.fetch_airline", side_effect=_airline)
+class TestCheckpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_dir = os.path.join(self.tmp_dir.name, "checkpoints")
+        for target, value in (
+            ("modules.etl_controller.CHECKPOINT_DIR", self.checkpoint_dir),
+            ("modules.etl_controller.RESPONSE_CACHE_PATH", ""),
+            (
+                "modules.metrics.METRICS_JSON_PATH",
+                os.path.join(self.tmp_dir.name, "m.jsonl"),
+            ),
+            # The runs report the stats of the process reference cache
+            ("modules.data_fetching._reference_cache", ReferenceCache("")),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.flights = generate_flights(500)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _controller(self, load_result=True, upload_error=None):
+        controller = ETLController()
+
+        def extract_data():
+            controller.windowStr = WINDOW
+            return self.flights
+
+        controller.extract_data = mock.Mock(side_effect=extract_data)
+        controller.load_data = mock.Mock(return_value=load_result)
+        controller.aws_upload = mock.Mock(side_effect=upload_error, return_value={})
+        return controller
+
+    def _run_ids(self):
+        if not os.path.exists(self.checkpoint_dir):
+            return []
+        return os.listdir(self.checkpoint_dir)
+
+    def test_resume_skips_the_completed_stages(self, *_):
+        failed = self._controller(upload_error=Exception("S3 unavailable"))
+        with self.assertRaises(Exception):
+            failed.run_etl_process()
+        (run_id,) = self._run_ids()
+        self.assertEqual(
+            RunCheckpoint(run_id, self.checkpoint_dir).completed,
+            ["extract", "process", "load"],
+        )
+
+        resumed = self._controller()
+        resumed.run_etl_process(resume=run_id)
+        resumed.extract_data.assert_not_called()
+        resumed.load_data.assert_not_called()
+        self.assertEqual(resumed.windowStr, WINDOW)
+        self.assertEqual(resumed.metrics.run_id, run_id)
+        self.assertEqual(resumed.metrics.counters["resumed_stages"], 3)
+        # The reports are read back from the checkpoint as they were
+        expected = failed.aws_upload.call_args.args[0]
+        uploaded = resumed.aws_upload.call_args.args[0]
+        self.assertEqual(list(uploaded), list(expected))
+        for name, df in expected.items():
+            self.assertTrue(uploaded[name].equals(df), name)
+        # A completed run leaves no checkpoint behind
+        self.assertEqual(self._run_ids(), [])
+
+    def test_tables_not_stored_keep_the_checkpoint(self, *_):
+        controller = self._controller(load_result=False)
+        controller.run_etl_process()
+        (run_id,) = self._run_ids()
+        self.assertEqual(
+            RunCheckpoint(run_id, self.checkpoint_dir).completed,
+            ["extract", "process", "upload"],
+        )
+
+        resumed = self._controller()
+        resumed.run_etl_process(resume=run_id)
+        resumed.load_data.assert_called_once()
+        resumed.aws_upload.assert_not_called()
+        self.assertEqual(self._run_ids(), [])
+
+    def test_unknown_run_cannot_be_resumed(self, *_):
+        controller = self._controller()
+        with self.assertRaises(Exception):
+            controller.run_etl_process(resume="0" * 32)
+        controller.extract_data.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from testing.synthetic import generate_flights
+from modules.etl_controller import ETLController
+from modules.flight_records import project_flights
+from modules.stage_files import (
+    load_processed,
+    load_raw_flights,
+    save_processed,
+    save_raw_flights,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Dependencies only the stages that use them may import
+HEAVY_MODULES = {"pandas", "sqlalchemy", "boto3", "aiohttp", "pyarrow"}
+# Import time budget of the CLI entry point (it takes about 25 ms)
+IMPORT_BUDGET_SECONDS = 0.25
+WINDOW = "2024-01-01T06:00:00_2024-01-01T10:00:00"
+LOOKUP = {"airlines": {}, "destinations": {}}
+
+PROBE = """
+import json, logging, sys, time
+path = list(sys.path)
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "modules": sorted(sys.modules),
+    "handlers": len(logging.getLogger().handlers),
+    "path": [entry for entry in sys.path if entry not in path],
+}}))
+"""
+
+
+class TestColdStart(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _probe_import(self, module: str) -> dict:
+        # A fresh interpreter, in an empty working directory
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            cwd=self.tmp_dir.name,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        probe = json.loads(result.stdout)
+        probe["stderr"] = result.stderr
+        return probe
+
+    def test_cli_imports_within_budget(self):
+        probe = self._probe_import("main")
+        self.assertLess(probe["seconds"], IMPORT_BUDGET_SECONDS)
+        self.assertFalse(HEAVY_MODULES & set(probe["modules"]))
+
+    def test_controller_imports_no_stage_dependencies(self):
+        probe = self._probe_import("modules.etl_controller")
+        self.assertFalse(HEAVY_MODULES & set(probe["modules"]))
+
+    def test_imports_have_no_side_effects(self):
+        for module in ("main", "modules.etl_controller"):
+            probe = self._probe_import(module)
+            # No log directory, no handlers and nothing logged
+            self.assertEqual(os.listdir(self.tmp_dir.name), [])
+            self.assertEqual((probe["handlers"], probe["stderr"]), (0, ""))
+            self.assertEqual(probe["path"], [])
+
+    def test_controller_leaves_the_logging_to_the_entry_point(self):
+        self._probe_import(
+            "modules.etl_controller; modules.etl_controller.ETLController()"
+        )
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_stages_hand_over_through_files(self):
+        flights = generate_flights(300, missing_ratio=0.3)
+        save_raw_flights(flights, WINDOW, self.tmp_dir.name)
+        with mock.patch("modules.stage_files.COMPACT_FLIGHT_RECORDS", True):
+            extracted, window = load_raw_flights(self.tmp_dir.name)
+        self.assertEqual((extracted, window), (project_flights(flights), WINDOW))
+
+        controller = ETLController()
+        controller.windowStr = window
+        with mock.patch(
+            "modules.reference_resolver.resolve_reference_data", return_value=LOOKUP
+        ):
+            processed = controller.process_data(extracted)
+        save_processed(processed, window, self.tmp_dir.name)
+
+        stored, stored_window = load_processed(self.tmp_dir.name)
+        self.assertEqual(stored_window, WINDOW)
+        self.assertEqual(list(stored), list(processed))
+        for key in list(processed)[:-1]:
+            self.assertTrue(stored[key].equals(processed[key]), key)
+        for group, reports in processed["reports"].items():
+            for name, df in reports.items():
+                self.assertTrue(stored["reports"][group][name].equals(df), name)
+
+        reports, _ = load_processed(self.tmp_dir.name, reports_only=True)
+        self.assertEqual(list(reports), ["reports"])
+
+
+if __name__ == "__main__":
+    unittest.main()
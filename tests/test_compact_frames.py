@@ -0,0 +1,69 @@
+import unittest
+import pandas as pd
+from testing.synthetic import generate_flights
+from modules.data_processing import (
+    build_flight_frames,
+    filter_dataframe,
+    find_busiest_facilities,
+    optimize_flight_frame,
+    to_storage_frame,
+)
+
+LOOKUP = {"airlines": {}, "destinations": {}}
+
+
+class TestCompactFrames(unittest.TestCase):
+
+    def setUp(self):
+        df_arrivals, _, df_departures, _ = build_flight_frames(generate_flights(4000))
+        self.plain = (df_arrivals, df_departures)
+        self.compact = (
+            optimize_flight_frame(df_arrivals),
+            optimize_flight_frame(df_departures),
+        )
+
+    def test_dtypes(self):
+        df_arrivals, df_departures = self.compact
+        self.assertIsInstance(df_departures["gate"].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(df_arrivals["state"].dtype, pd.CategoricalDtype)
+        self.assertTrue(
+            pd.api.types.is_datetime64_any_dtype(df_arrivals["actualLandingTime"])
+        )
+        self.assertIsInstance(df_arrivals["baggageClaimBelts"].dtype, pd.ArrowDtype)
+        for plain, compact in zip(self.plain, self.compact):
+            self.assertLess(
+                compact.memory_usage(deep=True).sum(),
+                plain.memory_usage(deep=True).sum(),
+            )
+
+    def test_reports_are_unchanged(self):
+        plain = find_busiest_facilities(*self.plain, 10, "window", LOOKUP)
+        compact = find_busiest_facilities(*self.compact, 10, "window", LOOKUP)
+        for name, expected in plain.items():
+            result = compact[name]
+            self.assertEqual(result["count"].tolist(), expected["count"].tolist(), name)
+        self.assertEqual(
+            compact["busy_belts"]["beltID"].tolist(),
+            [int(belt) for belt in plain["busy_belts"]["beltID"]],
+        )
+
+        for state in ("LND", "DIV"):
+            expected = filter_dataframe(
+                self.plain[0], "state", state, "airline", 5, LOOKUP
+            )
+            result = filter_dataframe(
+                self.compact[0], "state", state, "airline", 5, LOOKUP
+            )
+            self.assertEqual(result["count"].tolist(), expected["count"].tolist())
+
+    def test_storage_frame_has_python_lists(self):
+        stored = to_storage_frame(self.compact[0])
+        self.assertIsInstance(stored["baggageClaimBelts"].iloc[0], list)
+        self.assertEqual(
+            stored["baggageClaimBelts"].tolist(),
+            [[int(belt) for belt in row] for row in self.plain[0]["baggageClaimBelts"]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest import mock
+from testing.stub_server import StubSchipholServer
+from modules.data_fetching import SchipholDataFetcher
+
+
+class TestConcurrentPageFetching(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubSchipholServer(num_pages=7, page_size=3, latency=0.01).start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def _fetch(self, concurrency):
+        fetcher = SchipholDataFetcher(concurrency=concurrency)
+        fetcher.base_url = self.stub.base_url
+        return fetcher.fetch_flights_data("2024-01-01T00:00:00", "2024-01-01T04:00:00")
+
+    def test_pages_are_returned_in_order(self):
+        flights = self._fetch(concurrency=4)
+        expected = [f for page in range(7) for f in self.stub.flights_page(page)]
+        self.assertEqual(flights, expected)
+
+    def test_matches_serial_fetching(self):
+        self.assertEqual(self._fetch(concurrency=3), self._fetch(concurrency=1))
+
+    def test_stops_at_first_empty_page(self):
+        self._fetch(concurrency=4)
+        # 7 pages plus at most one pool's worth of requests past the end
+        self.assertLessEqual(self.stub.request_count, 7 + 4)
+
+    def test_page_cap_is_reported(self):
+        for concurrency in (1, 4):
+            with mock.patch("modules.data_fetching.MAX_PAGE", 3), self.assertLogs(
+                level="WARNING"
+            ) as logs:
+                flights = self._fetch(concurrency)
+            self.assertEqual(len(flights), 4 * 3)
+            self.assertIn("page cap (3)", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from testing.synthetic import generate_flights
+from modules.data_processing import build_flight_frames
+from modules.flight_records import (
+    FlightRecord,
+    decode_flights_response,
+    project_flights,
+)
+from modules.incremental_state import IncrementalState, flight_key, flight_schedule
+
+
+class TestFlightRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = generate_flights(500, missing_ratio=0.3)
+        self.records = project_flights(self.flights)
+
+    def test_records_answer_the_raw_flight_lookups(self):
+        for flight, record in zip(self.flights, self.records):
+            self.assertEqual(flight_key(record), flight_key(flight))
+            self.assertEqual(flight_schedule(record), flight_schedule(flight))
+            self.assertEqual("gate" in record, "gate" in flight)
+            self.assertEqual(record.get("terminal", ""), flight.get("terminal", ""))
+            self.assertEqual(record["route"], flight["route"])
+            self.assertEqual(
+                record.to_dict(),
+                {key: flight[key] for key in FlightRecord._fields if key in flight},
+            )
+
+    def test_frames_match_the_raw_flights(self):
+        mixed = self.flights[:250] + self.records[250:]
+        expected = build_flight_frames(self.flights)
+        for flights in (self.records, mixed):
+            for frame, expected_frame in zip(build_flight_frames(flights), expected):
+                self.assertTrue(frame.equals(expected_frame))
+
+    def test_null_fields_are_kept_like_the_raw_flights(self):
+        nullable = ["terminal", "gate", "estimatedLandingTime", "baggageClaim"]
+        flights = [
+            (
+                dict(flight, **{nullable[i % len(nullable)]: None})
+                if i % 3 == 0
+                else flight
+            )
+            for i, flight in enumerate(self.flights)
+        ]
+        records = project_flights(flights)
+        for flight, record in zip(flights, records):
+            self.assertEqual(
+                record.keys(), [key for key in FlightRecord._fields if key in flight]
+            )
+            self.assertEqual(record.get("gate", ""), flight.get("gate", ""))
+        expected = build_flight_frames(flights)
+        for frame, expected_frame in zip(build_flight_frames(records), expected):
+            self.assertTrue(frame.equals(expected_frame))
+        self.assertTrue(expected[0]["terminal"].isna().any())
+
+    def test_only_flights_pages_are_projected(self):
+        page = decode_flights_response(json.dumps({"flights": self.flights}).encode())
+        self.assertEqual(page["flights"], self.records)
+        airline = {"icao": "KLM", "publicName": "KLM"}
+        self.assertEqual(decode_flights_response(json.dumps(airline).encode()), airline)
+
+    def test_incremental_state_stores_records_as_dicts(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = IncrementalState(os.path.join(tmp_dir, "state.json.gz"))
+            start = datetime(2024, 1, 1, 6)
+            state.merge(self.records, start, datetime(2024, 1, 1, 10), 4)
+            state.save()
+            stored = IncrementalState(state.path).flights
+        self.assertEqual(stored, [record.to_dict() for record in state.flights])
+
+
+if __name__ == "__main__":
+    unittest.main()
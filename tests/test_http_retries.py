@@ -0,0 +1,53 @@
+import unittest
+from testing.stub_server import StubSchipholServer
+from modules.data_fetching import SchipholAPIError, SchipholDataFetcher
+
+
+class TestHttpRetries(unittest.TestCase):
+
+    def _fetcher(self, stub, max_retries):
+        fetcher = SchipholDataFetcher(
+            concurrency=2, max_retries=max_retries, backoff_base=0.01
+        )
+        fetcher.base_url = stub.base_url
+        return fetcher
+
+    def test_transient_errors_are_retried(self):
+        with StubSchipholServer(
+            num_pages=3, latency=0, flaky_status=429, flaky_count=2
+        ) as stub:
+            fetcher = self._fetcher(stub, max_retries=3)
+            flights = fetcher.fetch_flights_data("2024-01-01T00:00", "2024-01-01T04:00")
+
+        self.assertEqual(len(flights), 3 * stub.page_size)
+        self.assertGreater(fetcher.stats["retries"], 0)
+        self.assertEqual(fetcher.stats["rate_limited"], fetcher.stats["retries"])
+        self.assertEqual(fetcher.stats["failures"], 0)
+
+    def test_exhausted_retries_are_not_end_of_data(self):
+        with StubSchipholServer(num_pages=3, latency=0, flaky_count=5) as stub:
+            fetcher = self._fetcher(stub, max_retries=1)
+            with self.assertRaises(SchipholAPIError):
+                fetcher.fetch_flights_data("2024-01-01T00:00", "2024-01-01T04:00")
+        self.assertGreater(fetcher.stats["failures"], 0)
+
+    def test_client_errors_are_not_retried(self):
+        with StubSchipholServer(latency=0) as stub:
+            fetcher = self._fetcher(stub, max_retries=3)
+            self.assertIsNone(fetcher._fetch_data_from_api("unknown"))
+        self.assertEqual(fetcher.stats["retries"], 0)
+        self.assertEqual(stub.request_count, 1)
+
+    def test_rejected_requests_are_not_end_of_data(self):
+        with StubSchipholServer(
+            num_pages=3, latency=0, flaky_status=401, flaky_count=1
+        ) as stub:
+            fetcher = self._fetcher(stub, max_retries=3)
+            with self.assertRaises(SchipholAPIError):
+                fetcher.fetch_flights_data("2024-01-01T00:00", "2024-01-01T04:00")
+        self.assertEqual(fetcher.stats["retries"], 0)
+        self.assertGreater(fetcher.stats["failures"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
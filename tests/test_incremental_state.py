@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from testing.synthetic import generate_flights
+from modules.data_fetching import fetch_flights_incremental
+from modules.incremental_state import IncrementalState, flight_schedule
+
+
+class TestIncrementalState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "state.json.gz")
+        self.flights = generate_flights(600, start=datetime(2024, 1, 1, 6))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _between(self, start, end):
+        return [f for f in self.flights if start <= flight_schedule(f) <= end]
+
+    def _updated_between(self, start, end):
+        return [
+            f
+            for f in self.flights
+            if start
+            <= datetime.fromisoformat(f["lastUpdatedAt"]).replace(tzinfo=None)
+            <= end
+        ]
+
+    def _run(self, now, full_refresh=False):
+        state = IncrementalState(self.path)
+        calls = []
+        self.updated_from = None
+
+        def fetch(start, end, search_field=None):
+            if search_field == "lastUpdatedAt":
+                self.updated_from = start
+                return self._updated_between(start, end)
+            calls.append(start)
+            return self._between(start, end)
+
+        with mock.patch(
+            "modules.data_fetching._fetch_flights_between", fetch
+        ), mock.patch("modules.data_fetching.datetime") as fake_datetime:
+            fake_datetime.now.return_value = now
+            flights, _ = fetch_flights_incremental(state, 2, full_refresh)
+        state.save()
+        return flights, calls[0]
+
+    def test_delta_runs_match_a_full_window(self):
+        self._run(datetime(2024, 1, 1, 8))
+        flights, requested_from = self._run(datetime(2024, 1, 1, 8, 15))
+
+        # The default overlap re-reads the last hour before the watermark
+        self.assertEqual(requested_from, datetime(2024, 1, 1, 7))
+        expected = self._between(
+            datetime(2024, 1, 1, 6, 15), datetime(2024, 1, 1, 8, 15)
+        )
+        self.assertEqual(flights, expected)
+
+    def test_updates_of_earlier_flights_are_picked_up(self):
+        self._run(datetime(2024, 1, 1, 8))
+        # A flight scheduled long before the watermark changes after the run
+        index = next(
+            i
+            for i, flight in enumerate(self.flights)
+            if flight_schedule(flight) >= datetime(2024, 1, 1, 6, 30)
+        )
+        self.flights[index] = dict(
+            self.flights[index],
+            lastUpdatedAt="2024-01-01T08:10:00.000+01:00",
+            gate="Z99",
+        )
+        flights, requested_from = self._run(datetime(2024, 1, 1, 8, 15))
+
+        self.assertEqual(requested_from, datetime(2024, 1, 1, 7))
+        self.assertIn(self.flights[index], flights)
+        expected = self._between(
+            datetime(2024, 1, 1, 6, 15), datetime(2024, 1, 1, 8, 15)
+        )
+        self.assertEqual(flights, expected)
+
+    def test_updates_are_requested_from_the_last_one_seen(self):
+        self._run(datetime(2024, 1, 1, 8))
+        last_updated_at = IncrementalState(self.path).last_updated_at
+        self.assertEqual(last_updated_at, "2024-01-01T07:30:00.000+01:00")
+        self._run(datetime(2024, 1, 1, 8, 15))
+        # Minus the default overlap of an hour
+        self.assertEqual(self.updated_from, datetime(2024, 1, 1, 6, 30))
+
+    def test_newer_updates_replace_stored_flights(self):
+        state = IncrementalState(self.path)
+        window_start = datetime(2024, 1, 1, 6)
+        state.merge(self.flights[:10], window_start, window_start, 4)
+        updated = dict(self.flights[3], lastUpdatedAt="2099-01-01T00:00:00.000+01:00")
+        merged = state.merge([updated], window_start, window_start, 4)
+        self.assertEqual(len(merged), 10)
+        self.assertIn(updated, merged)
+
+    def test_full_refresh_on_demand(self):
+        self._run(datetime(2024, 1, 1, 8))
+        _, requested_from = self._run(datetime(2024, 1, 1, 8, 15), full_refresh=True)
+        self.assertEqual(requested_from, datetime(2024, 1, 1, 6, 15))
+
+    def test_stale_state_falls_back_to_full_refresh(self):
+        self._run(datetime(2024, 1, 1, 6, 30))
+        now = datetime(2024, 1, 1, 9)
+        _, requested_from = self._run(now)
+        self.assertEqual(requested_from, now - timedelta(hours=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from testing.stub_server import StubSchipholServer
+from modules.data_fetching import SchipholDataFetcher
+from modules.metrics import RunMetrics
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_fetcher_reports_http_calls_and_pages(self):
+        metrics = RunMetrics()
+        with StubSchipholServer(num_pages=5, page_size=3, latency=0.01) as stub:
+            fetcher = SchipholDataFetcher(concurrency=1, metrics=metrics)
+            fetcher.base_url = stub.base_url
+            with metrics.stage("extract"):
+                fetcher.fetch_flights_data("2024-01-01T00:00:00", "2024-01-01T04:00:00")
+            fetcher.close()
+
+        flights = metrics.to_dict()["http"]["flights"]
+        # 5 pages and the 204 that ends them
+        self.assertEqual(flights["calls"], 6)
+        self.assertGreaterEqual(flights["max_seconds"], 0.01)
+        self.assertEqual(metrics.counters["pages"], 5)
+        self.assertEqual(metrics.counters["bytes_downloaded"], fetcher.stats["bytes"])
+        self.assertGreater(metrics.to_dict()["throughput"]["pages_per_second"], 0)
+
+    def test_stage_is_timed_when_it_fails(self):
+        metrics = RunMetrics()
+        with self.assertRaises(RuntimeError):
+            with metrics.stage("load"):
+                raise RuntimeError("database down")
+        self.assertIn("load", metrics.stages)
+
+    def test_emit_json_and_prometheus(self):
+        metrics = RunMetrics()
+        with metrics.stage("process"):
+            metrics.add("rows", 120)
+        metrics.observe_http("airlines", 0.25, 200, 512)
+        metrics.observe_table("ARRIVALS", 80, 0.5)
+        json_path = os.path.join(self.tmp_dir.name, "metrics.jsonl")
+        prometheus_path = os.path.join(self.tmp_dir.name, "etl.prom")
+        metrics.emit(json_path, prometheus_path)
+        metrics.emit(json_path, prometheus_path)
+
+        with open(json_path) as file:
+            runs = [json.loads(line) for line in file]
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(runs[0]["counters"]["rows"], 120)
+        self.assertEqual(runs[0]["http"]["airlines"]["bytes"], 512)
+        self.assertEqual(runs[0]["tables"]["ARRIVALS"], {"rows": 80, "seconds": 0.5})
+
+        with open(prometheus_path) as file:
+            text = file.read()
+        self.assertIn('schiphol_etl_stage_seconds{stage="process"}', text)
+        self.assertIn('schiphol_etl_http_calls{endpoint="airlines"} 1', text)
+        self.assertIn('schiphol_etl_count{name="rows"} 120', text)
+        self.assertIn('schiphol_etl_table_rows{table="ARRIVALS"} 80', text)
+
+    def test_emit_reads_the_configured_paths(self):
+        json_path = os.path.join(self.tmp_dir.name, "metrics.jsonl")
+        with mock.patch("modules.metrics.METRICS_JSON_PATH", json_path), mock.patch(
+            "modules.metrics.METRICS_PROMETHEUS_PATH", ""
+        ):
+            RunMetrics().emit()
+        self.assertTrue(os.path.exists(json_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import pandas as pd
+from sqlalchemy import inspect
+from testing.synthetic import generate_flights
+from modules import database_handler
+from modules.database_handler import FLIGHT_KEY_COLUMNS
+from modules.etl_controller import ETLController
+
+WINDOW = "2024-01-01T10:00:00_2024-01-01T06:00:00"
+LOOKUP = {"airlines": {}, "destinations": {}}
+DB_SETTINGS = {
+    "DB_PREFIX": "sqlite",
+    "DB_IP_ADDRESS": "",
+    "DB_USER": "",
+    "DB_PASSWORD": "",
+    "DB_NAME": "",
+}
+
+
+class TestParallelLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp_dir.name, "test.sqlite")
+        patches = {
+            f"modules.etl_controller.{name}": value
+            for name, value in DB_SETTINGS.items()
+        }
+        patches["modules.database_handler.DB_URI"] = f"sqlite:///{path}"
+        for target, value in patches.items():
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(database_handler.dispose_engine)
+
+        self.controller = ETLController()
+        self.controller.windowStr = WINDOW
+        with mock.patch(
+            "modules.reference_resolver.resolve_reference_data", return_value=LOOKUP
+        ):
+            self.processed = self.controller.process_data(generate_flights(1000))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_one_engine_and_schema_setup_per_process(self):
+        with mock.patch.object(
+            database_handler.metadata,
+            "create_all",
+            wraps=database_handler.metadata.create_all,
+        ) as create_all:
+            for _ in range(3):
+                controller = ETLController()
+                controller._prepare_database()
+                self.assertIs(controller.engine, database_handler.get_engine())
+        create_all.assert_called_once()
+
+    def test_tables_are_reported_one_by_one(self):
+        self.assertTrue(self.controller.load_data(self.processed))
+        tables = self.controller.metrics.to_dict()["tables"]
+        self.assertEqual(list(tables), ["ARRIVALS", "DEPARTURES", "DESTINATIONS"])
+        self.assertEqual(tables["ARRIVALS"]["rows"], len(self.processed["df_arrivals"]))
+        stored = pd.read_sql(
+            'SELECT COUNT(*) AS n FROM "DESTINATIONS"', self.controller.engine
+        )
+        self.assertEqual(stored["n"].iloc[0], tables["DESTINATIONS"]["rows"])
+
+    def test_to_sql_load_method_keeps_the_tables(self):
+        with mock.patch("modules.etl_controller.DB_LOAD_MODE", "replace"), mock.patch(
+            "modules.etl_controller.DB_LOAD_METHOD", "to_sql"
+        ):
+            self.assertTrue(self.controller.load_data(self.processed))
+            self.assertTrue(self.controller.load_data(self.processed))
+        keys = inspect(self.controller.engine).get_pk_constraint("ARRIVALS")
+        self.assertEqual(keys["constrained_columns"], list(FLIGHT_KEY_COLUMNS))
+        stored = pd.read_sql(
+            'SELECT COUNT(*) AS n FROM "ARRIVALS"', self.controller.engine
+        )
+        self.assertEqual(stored["n"].iloc[0], len(self.processed["df_arrivals"]))
+
+    def test_tables_load_concurrently(self):
+        # Every table load waits until all of them have started
+        started = threading.Barrier(3, timeout=5)
+
+        def load_table(table_name, key, df):
+            started.wait()
+            return {"rows": len(df), "seconds": 0.0}
+
+        engine = mock.Mock()
+        engine.dialect.name = "postgresql"
+        self.controller.engine = engine
+        with mock.patch.object(
+            self.controller, "_load_table", side_effect=load_table
+        ), mock.patch.object(
+            self.controller, "update_rolling_analytics", return_value=True
+        ):
+            self.assertTrue(self.controller.load_data(self.processed))
+        self.assertEqual(len(self.controller.metrics.tables), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from modules.reference_cache import ReferenceCache
+
+
+class TestReferenceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "reference.sqlite")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_fetches_once_per_code(self):
+        cache = ReferenceCache(self.path)
+        fetch = mock.Mock(return_value={"publicName": "KLM"})
+        for _ in range(3):
+            self.assertEqual(
+                cache.get_or_fetch("airline", "KLM", fetch), {"publicName": "KLM"}
+            )
+        fetch.assert_called_once_with("KLM")
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["memory_hits"], 2)
+
+    def test_persists_between_instances(self):
+        ReferenceCache(self.path).put("destination", "AMS", {"city": "Amsterdam"})
+        cache = ReferenceCache(self.path)
+        self.assertEqual(cache.get("destination", "AMS"), {"city": "Amsterdam"})
+        self.assertEqual(cache.stats["disk_hits"], 1)
+
+    def test_expired_entries_are_refetched(self):
+        cache = ReferenceCache(self.path, ttl_hours=1)
+        cache.put("airline", "KLM", {"publicName": "KLM"})
+        two_hours_later = time.time() + 2 * 3600
+        with mock.patch("time.time", return_value=two_hours_later):
+            self.assertIsNone(cache.get("airline", "KLM"))
+        self.assertEqual(cache.stats["expired"], 2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ReferenceCache(self.path, max_entries=2)
+        cache.put("airline", "A", {})
+        cache.put("airline", "B", {})
+        cache.get("airline", "A")
+        cache.put("airline", "C", {})
+        fresh = ReferenceCache(self.path, max_entries=2)
+        self.assertIsNone(fresh.get("airline", "B"))
+        self.assertIsNotNone(fresh.get("airline", "A"))
+        self.assertIsNotNone(fresh.get("airline", "C"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest import mock
+from testing.synthetic import generate_flights
+from modules.etl_controller import ETLController
+from modules.data_fetching import SchipholAPIError, fetch_airline, fetch_destination
+from modules.reference_cache import ReferenceCache
+from modules.reference_resolver import resolve_reference_data
+
+
+def _airline(code):
+    return {"icao": code, "publicName": f"Airline {code}"}
+
+
+def _destination(iata):
+    return {"iata": iata, "city": f"City {iata}"}
+
+
+class TestReferenceResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = ETLController()
+        self.controller.windowStr = "2024-01-01T10:00:00_2024-01-01T06:00:00"
+        self.raw_flights = generate_flights(2000)
+
+    @mock.patch(
+        "modules.reference_resolver.fetch_destination", side_effect=_destination
+    )
+    @mock.patch("modules.reference_resolver.fetch_airline", side_effect=_airline)
+    def test_each_code_is_resolved_once(self, fetch_airline, fetch_destination):
+        results = self.controller.process_data(self.raw_flights)
+
+        airline_codes = [call.args[0] for call in fetch_airline.call_args_list]
+        iata_codes = [call.args[0] for call in fetch_destination.call_args_list]
+        self.assertEqual(len(airline_codes), len(set(airline_codes)))
+        self.assertEqual(len(iata_codes), len(set(iata_codes)))
+
+        reports = results["reports"]
+        for report in (
+            reports["arrivals"]["most_landed"],
+            reports["departures"]["most_canceled"],
+            reports["facilities"]["busiest_airlines"],
+        ):
+            self.assertTrue(report["airline"].str.startswith("Airline ").all())
+        destinations = reports["arrivals"]["most_popular_destinations"]
+        self.assertTrue(destinations["destination"].str.startswith("City ").all())
+
+    @mock.patch("modules.reference_resolver.fetch_destination", return_value=None)
+    @mock.patch("modules.reference_resolver.fetch_airline", return_value=None)
+    def test_failed_lookups_keep_the_code(self, fetch_airline, fetch_destination):
+        results = self.controller.process_data(self.raw_flights)
+        top = results["reports"]["arrivals"]["most_landed"]
+        self.assertTrue(top["airline"].str.len().eq(3).all())
+
+    def test_api_errors_keep_the_code(self):
+        api_fetcher = mock.Mock()
+        api_fetcher.fetch_airlines_data.side_effect = SchipholAPIError("Http Error")
+        api_fetcher.fetch_destinations_data.side_effect = SchipholAPIError("Http Error")
+        with mock.patch(
+            "modules.data_fetching._get_reference_fetcher", return_value=api_fetcher
+        ), mock.patch(
+            "modules.data_fetching.get_reference_cache", return_value=ReferenceCache("")
+        ):
+            lookup = resolve_reference_data(["KLM"], ["AMS", "JFK"])
+            self.assertIsNone(fetch_airline("KLM"))
+            self.assertIsNone(fetch_destination("AMS"))
+        self.assertEqual(
+            lookup,
+            {"airlines": {"KLM": "KLM"}, "destinations": {"AMS": "AMS", "JFK": "JFK"}},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
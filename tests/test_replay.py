@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from testing.api_fixture import ApiFixture, RecordingFetcher
+from testing.stub_server import StubSchipholServer
+from modules.data_fetching import SchipholDataFetcher
+
+
+class TestApiReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fixture = ApiFixture.synthetic(250, page_size=20)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _fetcher(self, stub, cls=SchipholDataFetcher):
+        fetcher = cls(concurrency=4)
+        fetcher.base_url = stub.base_url
+        return fetcher
+
+    def test_replays_the_fixture(self):
+        with StubSchipholServer(latency=0, fixture=self.fixture) as stub:
+            fetcher = self._fetcher(stub)
+            flights = fetcher.fetch_flights_data(
+                "2024-01-01T06:00:00", "2024-01-01T10:00:00"
+            )
+            airline = fetcher.fetch_airlines_data("KLM")
+            missing = fetcher.fetch_destinations_data("XXX")
+            fetcher.close()
+
+        self.assertEqual(flights, self.fixture.flights)
+        self.assertEqual(len(self.fixture.flight_pages), 13)
+        self.assertEqual(airline["publicName"], "Airline KLM")
+        self.assertIsNone(missing)
+
+    def test_recorded_fixture_round_trips(self):
+        with StubSchipholServer(latency=0, fixture=self.fixture) as stub:
+            fetcher = self._fetcher(stub, RecordingFetcher)
+            fetcher.fetch_flights_data("2024-01-01T06:00:00", "2024-01-01T10:00:00")
+            fetcher.fetch_airlines_data("KLM")
+            fetcher.fetch_destinations_data("LHR")
+            fetcher.close()
+
+        path = os.path.join(self.tmp_dir.name, "fixture.json.gz")
+        fetcher.fixture.save(path)
+        recorded = ApiFixture.load(path)
+        self.assertEqual(recorded.flights, self.fixture.flights)
+        self.assertEqual(recorded.airlines, {"KLM": self.fixture.airlines["KLM"]})
+        self.assertEqual(recorded.response("destinations/LHR")[0], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
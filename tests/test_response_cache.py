@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+from testing.stub_server import StubSchipholServer
+from modules import data_fetching
+from modules.data_fetching import SchipholAPIError, SchipholDataFetcher
+from modules.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "responses.sqlite")
+        self.stub = StubSchipholServer(
+            num_pages=5, page_size=3, latency=0, etags=True
+        ).start()
+
+    def tearDown(self):
+        self.stub.stop()
+        self.tmp_dir.cleanup()
+
+    def _fetch(self, cache):
+        fetcher = SchipholDataFetcher(concurrency=2, response_cache=cache)
+        fetcher.base_url = self.stub.base_url
+        return fetcher.fetch_flights_data("2024-01-01T00:00:00", "2024-01-01T04:00:00")
+
+    def test_unchanged_pages_are_revalidated(self):
+        flights = self._fetch(ResponseCache(self.path))
+        cache = ResponseCache(self.path)
+        self.assertEqual(self._fetch(cache), flights)
+
+        self.assertEqual(self.stub.not_modified_count, 5)
+        self.assertEqual(cache.stats["revalidated"], 5)
+        self.assertEqual(cache.stats["stored"], 0)
+        self.assertGreater(cache.stats["bytes_served"], 0)
+
+    def test_replay_sends_no_request(self):
+        flights = self._fetch(ResponseCache(self.path))
+        requests_sent = self.stub.request_count
+
+        cache = ResponseCache(self.path, replay=True)
+        self.assertEqual(self._fetch(cache), flights)
+        self.assertEqual(self.stub.request_count, requests_sent)
+        self.assertEqual(cache.stats["hits"], 5)
+
+    def test_replay_knows_the_last_window(self):
+        self._fetch(ResponseCache(self.path))
+        start, end = ResponseCache(self.path, replay=True).latest_window()
+        self.assertEqual(start.isoformat(), "2024-01-01T00:00:00")
+        self.assertEqual(end.isoformat(), "2024-01-01T04:00:00")
+
+    def test_replay_keeps_expired_responses(self):
+        flights = self._fetch(ResponseCache(self.path, ttl_hours=1))
+        two_hours_later = time.time() + 2 * 3600
+        with mock.patch("time.time", return_value=two_hours_later):
+            cache = ResponseCache(self.path, ttl_hours=1, replay=True)
+        self.assertEqual(self._fetch(cache), flights)
+        self.assertEqual(cache.stats["hits"], 5)
+
+    def test_replay_of_an_uncached_window_fails(self):
+        cache = ResponseCache(self.path, replay=True)
+        with self.assertRaises(SchipholAPIError):
+            self._fetch(cache)
+        data_fetching.set_response_cache(cache)
+        self.addCleanup(data_fetching.set_response_cache, None)
+        with self.assertRaises(Exception):
+            data_fetching.trailing_window()
+
+    def test_runs_of_one_slot_request_the_same_window(self):
+        data_fetching.set_response_cache(ResponseCache(self.path))
+        self.addCleanup(data_fetching.set_response_cache, None)
+        windows = set()
+        for moment in ("10:00:00", "10:07:31", "10:14:59"):
+            now = datetime.fromisoformat(f"2024-01-01T{moment}")
+            with mock.patch.object(data_fetching, "datetime", wraps=datetime) as dt:
+                dt.now.return_value = now
+                windows.add(data_fetching.trailing_window(4))
+        self.assertEqual(windows, {(datetime(2024, 1, 1, 6), datetime(2024, 1, 1, 10))})
+
+
+if __name__ == "__main__":
+    unittest.main()
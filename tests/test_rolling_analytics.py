@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from sqlalchemy import create_engine
+from testing.synthetic import generate_flights
+from modules.bulk_loader import bulk_upsert_frame
+from modules.data_processing import build_flight_frames, optimize_flight_frame
+from modules.database_handler import FLIGHT_KEY_COLUMNS, create_tables
+from modules.rolling_analytics import RollingAnalytics, hourly_counts
+
+START = datetime(2024, 1, 1, 5, 30)
+SPANS = {"1h": 1, "3h": 3, "7d": 7 * 24}
+
+
+def _window(start: datetime, end: datetime) -> str:
+    # Window strings hold local times, the end first
+    def local(moment):
+        return moment.replace(tzinfo=timezone.utc).astimezone()
+
+    return f"{local(end):%Y-%m-%dT%H:%M:%S}_{local(start):%Y-%m-%dT%H:%M:%S}"
+
+
+class TestRollingAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp_dir.name, "test.sqlite")
+        self.engine = create_engine(f"sqlite:///{path}")
+        create_tables(self.engine)
+        self.analytics = RollingAnalytics(self.engine, SPANS)
+        # 20 hours of flights, scheduled from 04:30 UTC
+        df_arrivals, _, df_departures, _ = build_flight_frames(
+            generate_flights(3000, start=START, window_hours=20)
+        )
+        self.frames = {
+            "ARRIVALS": optimize_flight_frame(df_arrivals),
+            "DEPARTURES": optimize_flight_frame(df_departures),
+        }
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def _in(self, df, start, end):
+        moments = df["scheduleDateTime"]
+        return df[
+            (moments >= pd.Timestamp(start, tz="UTC"))
+            & (moments < pd.Timestamp(end, tz="UTC"))
+        ]
+
+    def _load(self, start: datetime, end: datetime) -> dict:
+        for table, df in self.frames.items():
+            bulk_upsert_frame(
+                self.engine, table, self._in(df, start, end), FLIGHT_KEY_COLUMNS
+            )
+        return self.analytics.update(_window(start, end))
+
+    def _stored(self) -> pd.DataFrame:
+        return pd.read_sql('SELECT * FROM "ROLLING_ANALYTICS"', self.engine)
+
+    def _assert_matches_recount(self, loaded: list, until: datetime):
+        # What a full recount of the loaded flights gives
+        counts = hourly_counts(
+            *(
+                pd.concat(
+                    [self._in(df, start, end) for start, end in loaded]
+                ).drop_duplicates(subset=list(FLIGHT_KEY_COLUMNS))
+                for df in self.frames.values()
+            )
+        )
+        anchor = pd.Timestamp(until, tz="UTC").floor("h")
+        stored = self._stored()
+        for span, hours in SPANS.items():
+            in_span = counts[
+                (counts["hour"] > anchor - pd.Timedelta(hours=hours))
+                & (counts["hour"] <= anchor)
+            ]
+            expected = in_span.groupby(["dimension", "value"])[
+                ["flights", "delayed", "canceled"]
+            ].sum()
+            result = stored[stored["span"] == span].set_index(["dimension", "value"])
+            self.assertEqual(
+                result[expected.columns].sort_index().to_dict("index"),
+                expected[expected["flights"] > 0].sort_index().to_dict("index"),
+                span,
+            )
+
+    def test_overlapping_windows_move_the_sums_forward(self):
+        loaded = []
+        for run in range(10):
+            # Runs every 100 minutes over the last 2 hours
+            start = START + timedelta(minutes=100 * run)
+            end = start + timedelta(minutes=120)
+            stats = self._load(start, end)
+            loaded.append((start, end))
+            # The 1h span moves past its hour on every run, the others are moved
+            expected = ["1h", "3h", "7d"] if run == 0 else ["1h"]
+            self.assertEqual(stats["rebuilt"], expected)
+        self._assert_matches_recount(loaded, end)
+
+        stored = self._stored()
+        rates = stored["delayed"] / stored["flights"]
+        self.assertTrue((stored["delay_rate"] == rates).all())
+        self.assertTrue((stored["flights"] > 0).all())
+
+    def test_backfilled_and_reloaded_windows_keep_the_sums_exact(self):
+        late = (START + timedelta(hours=8), START + timedelta(hours=10))
+        early = (START + timedelta(hours=7), START + timedelta(hours=8, minutes=30))
+        self._load(*late)
+        before = self._stored()
+        # Reloading the same window changes nothing
+        self._load(*late)
+        pd.testing.assert_frame_equal(self._stored(), before)
+        # An older window only updates the spans it falls in
+        self._load(*early)
+        self._assert_matches_recount([late, early], late[1])
+
+    def test_expired_hours_leave_the_spans(self):
+        first = (START, START + timedelta(hours=2))
+        self._load(*first)
+        later = (START + timedelta(hours=12), START + timedelta(hours=13))
+        stats = self._load(*later)
+        # Moved past the short spans, which are summed again from the counts
+        self.assertEqual(stats["rebuilt"], ["1h", "3h"])
+        self._assert_matches_recount([first, later], later[1])
+        stored = self._stored()
+        self.assertEqual(stored["window_end"].nunique(), 1)
+        self.assertGreater(
+            stored.loc[stored["span"] == "7d", "flights"].sum(),
+            stored.loc[stored["span"] == "3h", "flights"].sum(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from io import BytesIO
+import pandas as pd
+import pyarrow.parquet as pq
+from testing.fake_s3 import FakeS3Client
+from modules.aws_handler import S3Uploader
+
+
+class TestS3Uploader(unittest.TestCase):
+
+    def setUp(self):
+        self.reports = {
+            f"report_{i}": pd.DataFrame({"gate": ["D7", "B13"], "count": [i, 2 * i]})
+            for i in range(8)
+        }
+
+    def test_reports_are_uploaded_concurrently(self):
+        client = FakeS3Client(latency=0.05)
+        uploader = S3Uploader(
+            client=client, bucket="bucket", max_workers=8, report_format="csv"
+        )
+        timings = uploader.upload_reports(self.reports, "window")
+
+        self.assertEqual(set(timings), set(self.reports))
+        self.assertGreater(client.max_active, 1)
+        body = client.objects[("bucket", "report_3/window_window_report.csv")]
+        self.assertEqual(body, self.reports["report_3"].to_csv(index=False).encode())
+        for timing in timings.values():
+            self.assertEqual(timing["parts"], 1)
+            self.assertGreater(timing["seconds"], 0)
+
+    def test_parquet_reports_are_hive_partitioned(self):
+        client = FakeS3Client()
+        uploader = S3Uploader(client=client, bucket="bucket", report_format="parquet")
+        window = "2024-01-01T10:00:00_2024-01-01T06:00:00"
+        timings = uploader.upload_reports(self.reports, window)
+
+        key = timings["report_3"]["key"]
+        self.assertEqual(
+            key, f"report=report_3/date=2024-01-01/hour=10/{window}.parquet"
+        )
+        stored = pq.read_table(BytesIO(client.objects[("bucket", key)])).to_pandas()
+        pd.testing.assert_frame_equal(stored, self.reports["report_3"])
+
+    def test_large_objects_use_multipart_upload(self):
+        client = FakeS3Client()
+        uploader = S3Uploader(
+            client=client, bucket="bucket", multipart_threshold=100, part_size=64
+        )
+        body = b"x" * 1000
+        timing = uploader.upload_object("large.csv", body)
+
+        self.assertEqual(timing["parts"], 16)
+        self.assertEqual(client.objects[("bucket", "large.csv")], body)
+
+    def test_failed_multipart_upload_is_aborted(self):
+        client = FakeS3Client(fail_keys={"large.csv"})
+        uploader = S3Uploader(
+            client=client, bucket="bucket", multipart_threshold=100, part_size=64
+        )
+        with self.assertRaises(RuntimeError):
+            uploader.upload_object("large.csv", b"x" * 1000)
+        self.assertEqual(client.aborted, ["large.csv"])
+        self.assertEqual(client.uploads, {})
+
+    def test_one_failure_does_not_stop_the_other_uploads(self):
+        client = FakeS3Client(fail_keys={"report_0/window_window_report.csv"})
+        uploader = S3Uploader(client=client, bucket="bucket", report_format="csv")
+        with self.assertRaises(Exception):
+            uploader.upload_reports(self.reports, "window")
+        self.assertEqual(len(client.objects), len(self.reports) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
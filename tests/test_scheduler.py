@@ -0,0 +1,123 @@
+import contextlib
+import io
+import os
+import signal
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from main import parse_args
+from modules.scheduler import CronSchedule, Daemon, IntervalSchedule, run_lock
+
+
+class TestCronSchedule(unittest.TestCase):
+
+    def test_steps_lists_and_ranges(self):
+        schedule = CronSchedule("*/15 6-8 * * *")
+        self.assertEqual(
+            schedule.next_after(datetime(2024, 1, 1, 6, 7, 30)),
+            datetime(2024, 1, 1, 6, 15),
+        )
+        self.assertEqual(
+            schedule.next_after(datetime(2024, 1, 1, 8, 45)),
+            datetime(2024, 1, 2, 6, 0),
+        )
+
+    def test_weekdays(self):
+        # 2024-01-05 is a Friday
+        schedule = CronSchedule("30 6 * * 1-5")
+        self.assertEqual(
+            schedule.next_after(datetime(2024, 1, 5, 7)), datetime(2024, 1, 8, 6, 30)
+        )
+        # Restricted day of month and day of week match either of them
+        schedule = CronSchedule("0 0 10 * 0")
+        self.assertEqual(
+            schedule.next_after(datetime(2024, 1, 5)), datetime(2024, 1, 7)
+        )
+        self.assertEqual(
+            schedule.next_after(datetime(2024, 1, 7)), datetime(2024, 1, 10)
+        )
+
+    def test_invalid_expressions(self):
+        for expression in ("* * * *", "61 * * * *", "0 0 31 2 *"):
+            with self.assertRaises(Exception):
+                CronSchedule(expression).next_after(datetime(2024, 1, 1))
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.lock_path = os.path.join(self.tmp_dir.name, "etl.lock")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_runs_never_overlap(self):
+        active = []
+        overlaps = []
+
+        def job():
+            overlaps.append(len(active))
+            active.append(1)
+            time.sleep(0.05)
+            active.pop()
+            if len(overlaps) == 4:
+                daemon.stop()
+
+        # Slots are shorter than the runs
+        daemon = Daemon(job, IntervalSchedule(0.01), lock_path=self.lock_path)
+        runs = daemon.run()
+        self.assertEqual(runs["succeeded"], 4)
+        self.assertEqual(overlaps, [0, 0, 0, 0])
+
+    def test_failed_runs_do_not_stop_the_daemon(self):
+        calls = []
+
+        def job():
+            calls.append(1)
+            if len(calls) == 3:
+                daemon.stop()
+            raise Exception("boom")
+
+        daemon = Daemon(job, IntervalSchedule(0.01), lock_path=self.lock_path)
+        self.assertEqual(daemon.run()["failed"], 3)
+
+    def test_sigterm_lets_the_run_finish(self):
+        finished = []
+
+        def job():
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(0.05)
+            finished.append(1)
+
+        previous = signal.getsignal(signal.SIGTERM)
+        daemon = Daemon(job, IntervalSchedule(3600), lock_path=self.lock_path)
+        runs = daemon.run()
+        self.assertEqual((runs["succeeded"], finished), (1, [1]))
+        self.assertIs(signal.getsignal(signal.SIGTERM), previous)
+
+    def test_replay_is_rejected(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                parse_args(["--daemon", "--replay"])
+        self.assertTrue(parse_args(["--daemon"]).daemon)
+
+    def test_slot_is_skipped_while_another_run_holds_the_lock(self):
+        def job():
+            daemon.stop()
+
+        daemon = Daemon(job, IntervalSchedule(3600), lock_path=self.lock_path)
+        with run_lock(self.lock_path) as acquired:
+            self.assertTrue(acquired)
+            thread = threading.Thread(target=daemon.run)
+            thread.start()
+            time.sleep(0.1)
+            daemon.stop()
+            thread.join()
+        self.assertEqual(daemon.runs["skipped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from sqlalchemy import inspect
+from testing.synthetic import generate_flights
+from modules import database_handler
+from modules.etl_controller import ETLController
+from modules.reference_cache import ReferenceCache
+from modules.streaming import StreamingAggregator
+
+DB_SETTINGS = {
+    "DB_PREFIX": "sqlite",
+    "DB_IP_ADDRESS": "",
+    "DB_USER": "",
+    "DB_PASSWORD": "",
+    "DB_NAME": "",
+}
+
+
+def _airline(code):
+    return {"publicName": f"Airline {code}"}
+
+
+def _destination(iata):
+    return {"city": f"City {iata}"}
+
+
+@mock.patch("modules.reference_resolver.fetch_destination", side_effect=_destination)
+@mock.patch("modules.reference_resolver.fetch_airline", side_effect=_airline)
+class TestStreamingAggregator(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = generate_flights(3000)
+        self.pages = [self.flights[i : i + 100] for i in range(0, 3000, 100)]
+        self.controller = ETLController()
+        self.controller.windowStr = "window"
+
+    def _stream(self):
+        aggregator = StreamingAggregator()
+        for page in self.pages:
+            aggregator.fold(page)
+        return aggregator
+
+    def test_destinations_match_batch_processing(self, *_):
+        batch = self.controller.process_data(self.flights)
+        df_destinations_arr, df_destinations_dep = self._stream().destination_frames()
+        pd.testing.assert_frame_equal(df_destinations_arr, batch["df_destinations_arr"])
+        pd.testing.assert_frame_equal(df_destinations_dep, batch["df_destinations_dep"])
+
+    def test_reports_match_batch_processing(self, *_):
+        results = self.controller.process_data(self.flights)
+        batch = results["reports"]
+        aggregator = self._stream()
+        streamed = aggregator.reports(5, 10, 10, "window")
+
+        self.assertEqual(aggregator.rows["arrivals"], len(results["df_arrivals"]))
+        self.assertEqual(aggregator.rows["departures"], len(results["df_departures"]))
+        for section in ("arrivals", "departures", "facilities"):
+            for name, expected in batch[section].items():
+                result = streamed[section][name]
+                self.assertEqual(list(result.columns), list(expected.columns), name)
+                count = "flights" if "destinations" in name else "count"
+                self.assertEqual(
+                    sorted(result[count].tolist()),
+                    sorted(expected[count].tolist()),
+                    name,
+                )
+
+
+@mock.patch("modules.reference_resolver.fetch_destination", side_effect=_destination)
+@mock.patch("modules.reference_resolver.fetch_airline", side_effect=_airline)
+class TestStreamingRun(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        path = os.path.join(self.tmp_dir.name, "test.sqlite")
+        patches = {
+            f"modules.etl_controller.{name}": value
+            for name, value in DB_SETTINGS.items()
+        }
+        patches.update(
+            {
+                "modules.database_handler.DB_URI": f"sqlite:///{path}",
+                "modules.etl_controller.DB_LOAD_MODE": "replace",
+                "modules.metrics.METRICS_JSON_PATH": "",
+                "modules.data_fetching._reference_cache": ReferenceCache(""),
+            }
+        )
+        for target, value in patches.items():
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(database_handler.dispose_engine)
+        self.flights = generate_flights(1000)
+
+    def _run(self):
+        pages = [self.flights[i : i + 100] for i in range(0, 1000, 100)]
+        controller = ETLController()
+        controller._check_api_credentials = mock.Mock()
+        controller.aws_upload = mock.Mock(return_value={})
+        with mock.patch(
+            "modules.etl_controller.iter_flights_pages",
+            return_value=(iter(pages), "2024-01-01T10:00:00_2024-01-01T06:00:00"),
+        ):
+            controller.run_streaming_etl_process()
+        return controller
+
+    def test_replace_mode_keeps_the_table_schema(self, *_):
+        controller = self._run()
+        # Every page is stored, the second run replaces the first one
+        controller = self._run()
+        stored = pd.read_sql('SELECT COUNT(*) AS n FROM "ARRIVALS"', controller.engine)
+        rows = controller.metrics.to_dict()["counters"]["rows"]
+        departures = pd.read_sql(
+            'SELECT COUNT(*) AS n FROM "DEPARTURES"', controller.engine
+        )
+        self.assertEqual(stored["n"].iloc[0] + departures["n"].iloc[0], rows)
+        keys = inspect(controller.engine).get_pk_constraint("ARRIVALS")
+        self.assertEqual(
+            keys["constrained_columns"], ["flight_name", "scheduleDateTime"]
+        )
+
+    def test_failed_pages_fail_the_run(self, *_):
+        with mock.patch.object(ETLController, "_upsert_table", return_value=None):
+            with self.assertRaisesRegex(Exception, "Couldn't store page 2"):
+                self._run()
+
+
+if __name__ == "__main__":
+    unittest.main()
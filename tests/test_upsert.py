@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import create_engine, inspect
+from testing.synthetic import generate_flights
+from modules.bulk_loader import bulk_upsert_frame
+from modules.data_processing import (
+    build_flight_frames,
+    destination_rows,
+    optimize_flight_frame,
+)
+from modules.database_handler import (
+    DESTINATION_KEY_COLUMNS,
+    FLIGHT_KEY_COLUMNS,
+    create_tables,
+)
+
+
+class TestUpsert(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp_dir.name, "test.sqlite")
+        self.engine = create_engine(f"sqlite:///{path}")
+        create_tables(self.engine)
+        self.flights = generate_flights(1000, start=datetime(2024, 1, 1, 6))
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def _upsert(self, flights):
+        df_arrivals, _, _, _ = build_flight_frames(flights)
+        df_arrivals = optimize_flight_frame(df_arrivals)
+        bulk_upsert_frame(self.engine, "ARRIVALS", df_arrivals, FLIGHT_KEY_COLUMNS)
+        return df_arrivals
+
+    def _stored(self):
+        return pd.read_sql('SELECT * FROM "ARRIVALS"', self.engine)
+
+    def test_reloading_a_window_is_idempotent(self):
+        df_arrivals = self._upsert(self.flights)
+        self._upsert(self.flights)
+        self.assertEqual(len(self._stored()), len(df_arrivals))
+
+    def test_overlapping_windows_keep_one_row_per_flight(self):
+        first = self._upsert(self.flights[:600])
+        second = self._upsert(self.flights[400:])
+        keys = pd.concat([first, second])[list(FLIGHT_KEY_COLUMNS)]
+        self.assertEqual(len(self._stored()), len(keys.drop_duplicates()))
+
+    def test_newer_rows_update_stored_flights(self):
+        df_arrivals = self._upsert(self.flights)
+        flight_name = df_arrivals["flight_name"].iloc[0]
+        updated = [
+            (
+                dict(flight, publicFlightState={"flightStates": ["DIV"]})
+                if flight["flightName"] == flight_name
+                else flight
+            )
+            for flight in self.flights
+        ]
+        self._upsert(updated)
+
+        stored = self._stored()
+        self.assertEqual(len(stored), len(df_arrivals))
+        self.assertEqual(
+            stored.loc[stored["flight_name"] == flight_name, "state"].tolist(), ["DIV"]
+        )
+
+    def test_destinations_keep_one_row_per_window(self):
+        _, df_arr, _, df_dep = build_flight_frames(self.flights)
+        windows = ["2024-01-01T10:00:00_2024-01-01T06:00:00"] * 2 + [
+            "2024-01-01T11:00:00_2024-01-01T07:00:00"
+        ]
+        for window in windows:
+            bulk_upsert_frame(
+                self.engine,
+                "DESTINATIONS",
+                destination_rows(df_arr, df_dep, window),
+                DESTINATION_KEY_COLUMNS,
+            )
+
+        stored = pd.read_sql('SELECT * FROM "DESTINATIONS"', self.engine)
+        self.assertEqual(len(stored), 2 * (len(df_arr) + len(df_dep)))
+        latest = stored[
+            (stored["window"] == windows[-1]) & (stored["direction"] == "A")
+        ]
+        self.assertEqual(
+            dict(zip(latest["destination"], latest["flights"])),
+            dict(zip(df_arr["destination"], df_arr["flights"])),
+        )
+
+    def test_rows_made_of_keys_are_inserted_once(self):
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                'CREATE TABLE "VISITS" (window TEXT, destination TEXT, '
+                "PRIMARY KEY (window, destination))"
+            )
+        df = pd.DataFrame({"window": ["w1", "w1", "w2"], "destination": list("ABA")})
+        for _ in range(2):
+            bulk_upsert_frame(self.engine, "VISITS", df, ("window", "destination"))
+        stored = pd.read_sql('SELECT * FROM "VISITS"', self.engine)
+        self.assertEqual(len(stored), 3)
+
+    def test_tables_of_previous_versions_are_migrated(self):
+        path = os.path.join(self.tmp_dir.name, "legacy.sqlite")
+        engine = create_engine(f"sqlite:///{path}")
+        self.addCleanup(engine.dispose)
+        # Written by DataFrame.to_sql(replace), without keys
+        legacy = pd.DataFrame({"flight_name": ["KL 1001"], "airline": ["KLM"]})
+        legacy.to_sql("ARRIVALS", engine, index=False)
+        pd.DataFrame({"LHR": [3]}).to_sql("DESTINATIONS_ARRIVALS", engine, index=False)
+        create_tables(engine)
+
+        tables = inspect(engine).get_table_names()
+        self.assertIn("ARRIVALS_legacy", tables)
+        self.assertNotIn("DESTINATIONS_ARRIVALS", tables)
+        self.assertEqual(
+            inspect(engine).get_pk_constraint("ARRIVALS")["constrained_columns"],
+            list(FLIGHT_KEY_COLUMNS),
+        )
+        df_arrivals, _, _, _ = build_flight_frames(self.flights)
+        bulk_upsert_frame(
+            engine, "ARRIVALS", optimize_flight_frame(df_arrivals), FLIGHT_KEY_COLUMNS
+        )
+        stored = pd.read_sql('SELECT * FROM "ARRIVALS_legacy"', engine)
+        self.assertEqual(stored["flight_name"].tolist(), ["KL 1001"])
+
+
+if __name__ == "__main__":
+    unittest.main()
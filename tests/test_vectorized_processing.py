@@ -0,0 +1,68 @@
+import unittest
+from collections import Counter
+import pandas as pd
+from testing.synthetic import generate_flights
+from modules.data_processing import (
+    analyse_arrivals,
+    analyse_departures,
+    build_flight_frames,
+    cleanup_flight_data,
+    top_destination_counts,
+)
+
+
+class TestBuildFlightFrames(unittest.TestCase):
+
+    def _row_by_row(self, flights):
+        arrivals, departures = cleanup_flight_data(flights)
+        df_arrivals, df_destinations_arr = analyse_arrivals(arrivals)
+        df_departures, df_destinations_dep = analyse_departures(departures)
+        return df_arrivals, df_destinations_arr, df_departures, df_destinations_dep
+
+    def test_matches_row_by_row_processing(self):
+        flights = generate_flights(3000, missing_ratio=0.3)
+        for expected, result in zip(
+            self._row_by_row(flights), build_flight_frames(flights)
+        ):
+            pd.testing.assert_frame_equal(result, expected)
+
+    def test_empty_payload(self):
+        for expected, result in zip(self._row_by_row([]), build_flight_frames([])):
+            pd.testing.assert_frame_equal(result, expected)
+            self.assertTrue(result.empty)
+
+    def test_destinations_are_long_rows(self):
+        # No incomplete flights, every route is counted
+        flights = generate_flights(3000, missing_ratio=0)
+        expected = Counter(
+            destination
+            for flight in flights
+            if flight["flightDirection"] == "A"
+            for destination in flight["route"]["destinations"]
+        )
+        _, df_destinations_arr, _, df_destinations_dep = build_flight_frames(flights)
+        self.assertEqual(
+            list(df_destinations_arr.columns), ["destination", "direction", "flights"]
+        )
+        self.assertEqual(set(df_destinations_arr["direction"]), {"A"})
+        self.assertEqual(set(df_destinations_dep["direction"]), {"D"})
+        self.assertEqual(
+            dict(
+                zip(df_destinations_arr["destination"], df_destinations_arr["flights"])
+            ),
+            dict(expected),
+        )
+        top = top_destination_counts(df_destinations_arr, 3)
+        self.assertEqual(
+            list(zip(top["destination"], top["flights"])), expected.most_common(3)
+        )
+
+    def test_schema_change_is_rejected(self):
+        flights = generate_flights(10)
+        flights[4]["schemaVersion"] = "5"
+        with self.assertRaises(Exception):
+            build_flight_frames(flights)
+
+
+if __name__ == "__main__":
+    unittest.main()